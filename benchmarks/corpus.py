@@ -0,0 +1,86 @@
+"""
+corpus.py
+
+Synthetic source corpora for the benchmark suite. Each corpus is generated
+deterministically so that runs on different machines measure the same input.
+"""
+
+import os
+from typing import Dict, List
+
+def _function(name: str, indent: str, docstring_lines: int, code_lines: int) -> List[str]:
+    lines = [f"{indent}def {name}(self, value, *args, **kwargs):"]
+    if docstring_lines:
+        lines.append(f'{indent}    """')
+        lines.append(f"{indent}    Summary line for {name}.")
+        for i in range(docstring_lines):
+            lines.append(f"{indent}    Detail {i}: explains argument handling and return values "
+                         f"for {name}.")
+        lines.append(f'{indent}    """')
+    for i in range(code_lines):
+        lines.append(f"{indent}    value = value + {i}  # step {i}")
+    lines.append(f"{indent}    return value")
+    lines.append("")
+    return lines
+
+def _module(classes: int, methods: int, docstring_lines: int, code_lines: int) -> str:
+    lines = ['"""Synthetic benchmark module."""', "", "import os", ""]
+    for c in range(classes):
+        lines.append(f"class Class{c}:")
+        lines.append(f'    """Class {c} docstring."""')
+        lines.append("")
+        for m in range(methods):
+            lines.extend(_function(f"method_{m}", "    ", docstring_lines, code_lines))
+    return "\n".join(lines) + "\n"
+
+def _nested_module(depth: int) -> str:
+    lines = ['"""Deeply nested benchmark module."""', ""]
+    for level in range(depth):
+        indent = "    " * level
+        keyword = "class" if level % 2 == 0 else "def"
+        signature = f"Level{level}:" if keyword == "class" else f"level_{level}(self):"
+        lines.append(f"{indent}{keyword} {signature}")
+        lines.append(f'{indent}    """Docstring at depth {level}."""')
+        lines.append(f"{indent}    marker_{level} = {level}")
+    return "\n".join(lines) + "\n"
+
+# name -> (file count, source generator), at scale 1.0
+CORPORA: Dict[str, tuple] = {
+    'many_small': (2000, lambda: _module(classes=1, methods=3, docstring_lines=2, code_lines=3)),
+    'few_huge': (3, lambda: _module(classes=400, methods=25, docstring_lines=3, code_lines=4)),
+    'deep_nesting': (200, lambda: _nested_module(depth=40)),
+    'docstring_heavy': (300, lambda: _module(classes=10, methods=10, docstring_lines=25,
+                                             code_lines=1)),
+    'code_heavy': (300, lambda: _module(classes=10, methods=10, docstring_lines=0, code_lines=30)),
+}
+
+def generate(name: str, directory: str, scale: float = 1.0) -> List[str]:
+    """
+    Write a corpus of Python files into ``directory``.
+
+    Args:
+        name (str): Name of the corpus in :data:`CORPORA`.
+        directory (str): Directory to write the files to (created if needed).
+        scale (float): Multiplier applied to the number of files.
+
+    Returns:
+        List[str]: Paths of the generated files.
+    """
+    count, make_source = CORPORA[name]
+    count = max(1, int(count * scale))
+    source = make_source()
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"{name}_{i}.py")
+        with open(path, 'w', encoding='utf-8') as f:
+            # A distinct first line keeps every file's content unique, so caches keyed
+            # by content hash do not turn the corpus into a single repeated file.
+            f.write(f"# {name} #{i}\n")
+            f.write(source)
+        paths.append(path)
+    return paths
+
+def corpus_names() -> List[str]:
+    """Return the names of all corpora, in definition order."""
+    return list(CORPORA)
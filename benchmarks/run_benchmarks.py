@@ -0,0 +1,245 @@
+"""
+run_benchmarks.py
+
+Benchmark suite for splitter and combiner throughput.
+
+Generates synthetic corpora (see ``corpus.py``) and measures, for each one:
+
+- ``split``: ``split_file`` over every file, in-process.
+- ``combine``: ``combine_files`` over every split pair, in-process.
+- ``split_lowmem`` / ``combine_lowmem``: the same with ``low_memory=True``.
+- ``split_warm``: ``split`` with a parse cache already holding every file.
+- ``merge_legacy``: ``_merge_docstrings`` with a legacy name-keyed sidecar.
+- ``cli_split`` / ``cli_combine``: the CLI directory walkers, including the worker pool.
+
+Each benchmark reports wall time (best of ``--repeat``), files/sec, MB/sec of
+input and peak traced memory. Results can be saved as a named baseline and later
+runs compared against it; a slowdown beyond ``--tolerance`` exits non-zero.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--scale 0.1] [--corpus few_huge] \
+        [--save-baseline ci] [--compare ci --tolerance 0.25]
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from corpus import corpus_names, generate
+from segmented_docstring.cli import main as cli_main
+from segmented_docstring.combiner import (combine_files, docstring_path_for, output_path,
+                                          _merge_docstrings)
+from segmented_docstring.config import DEFAULT_CONFIG
+from segmented_docstring.parsecache import ParseCache, set_shared_cache
+from segmented_docstring.splitter import split_file, output_paths
+from segmented_docstring.spans import find_docstring_spans, strip_docstrings
+
+BASELINE_DIR = Path(__file__).resolve().parent / 'baselines'
+LOGGER_NAMES = ('cli', 'splitter', 'combiner', 'config', 'cache', 'gitfilter', 'watcher', 'writer',
+                'lowmem', 'parsecache', 'profiling', 'verify', 'discovery')
+
+def _measure(func: Callable[[], None], repeat: int, trace_memory: bool) -> Dict[str, float]:
+    """Time ``func`` (best of ``repeat``) and optionally trace its peak memory in one extra run."""
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    peak_mb = 0.0
+    if trace_memory:
+        gc.collect()
+        tracemalloc.start()
+        func()
+        peak_mb = tracemalloc.get_traced_memory()[1] / (1 << 20)
+        tracemalloc.stop()
+    return {'seconds': min(timings), 'peak_mb': peak_mb}
+
+def run_corpus(name: str, workdir: str, scale: float, repeat: int,
+               jobs: Optional[int]) -> Dict[str, dict]:
+    """
+    Run every benchmark against one corpus.
+
+    Args:
+        name (str): Corpus name.
+        workdir (str): Scratch directory.
+        scale (float): Corpus size multiplier.
+        repeat (int): Timed repetitions per benchmark.
+        jobs (Optional[int]): Worker count for the CLI benchmarks (CPU count if None).
+
+    Returns:
+        Dict[str, dict]: Metrics keyed by benchmark name.
+    """
+    source_dir = os.path.join(workdir, name, 'src')
+    split_dir = os.path.join(workdir, name, 'split')
+    combined_dir = os.path.join(workdir, name, 'combined')
+    for directory in (split_dir, combined_dir):
+        os.makedirs(directory, exist_ok=True)
+
+    files = generate(name, source_dir, scale)
+    input_bytes = sum(os.path.getsize(path) for path in files)
+    bare_ext = DEFAULT_CONFIG['barecode_extension']
+    doc_ext = DEFAULT_CONFIG['docstring_extension']
+
+    def split_all(low_memory: bool = False) -> None:
+        for path in files:
+            split_file(path, split_dir, bare_ext, doc_ext, low_memory=low_memory)
+
+    split_all()
+    barecode_files = [output_paths(path, split_dir, bare_ext, doc_ext)[0] for path in files]
+
+    warm_cache = ParseCache()
+
+    def split_warm() -> None:
+        set_shared_cache(warm_cache)
+        try:
+            split_all()
+        finally:
+            set_shared_cache(None)
+
+    # Untimed: fills the cache, so every timed run finds each file already parsed.
+    split_warm()
+
+    def combine_all(low_memory: bool = False) -> None:
+        for barecode in barecode_files:
+            combine_files(barecode, docstring_path_for(barecode, bare_ext, doc_ext),
+                          output_path(barecode, combined_dir, bare_ext), low_memory=low_memory)
+
+    sample = Path(files[0]).read_text(encoding='utf-8')
+    spans = find_docstring_spans(sample)
+    legacy_barecode = strip_docstrings(sample, spans)
+    legacy_docstrings = {span.name: span.docstring for span in spans if span.docstring}
+
+    def merge_all() -> None:
+        for _ in files:
+            _merge_docstrings(legacy_barecode, legacy_docstrings)
+
+    jobs_args = ['-j', str(jobs)] if jobs else []
+
+    def cli_split() -> None:
+        cli_main(['split', source_dir, '-o', split_dir, '--no-cache'] + jobs_args)
+
+    def cli_combine() -> None:
+        cli_main(['combine', split_dir, '-o', combined_dir, '--no-cache'] + jobs_args)
+
+    benchmarks = {
+        'split': (split_all, True),
+        'combine': (combine_all, True),
+        'split_lowmem': (lambda: split_all(low_memory=True), True),
+        'split_warm': (split_warm, False),
+        'combine_lowmem': (lambda: combine_all(low_memory=True), True),
+        'merge_legacy': (merge_all, True),
+        'cli_split': (cli_split, False),
+        'cli_combine': (cli_combine, False),
+    }
+
+    results = {}
+    for bench_name, (func, trace_memory) in benchmarks.items():
+        metrics = _measure(func, repeat, trace_memory)
+        metrics['files'] = len(files)
+        metrics['mb'] = input_bytes / (1 << 20)
+        metrics['files_per_sec'] = len(files) / metrics['seconds'] if metrics['seconds'] else 0.0
+        metrics['mb_per_sec'] = metrics['mb'] / metrics['seconds'] if metrics['seconds'] else 0.0
+        results[bench_name] = metrics
+    return results
+
+def compare(results: Dict[str, Dict[str, dict]], baseline: Dict[str, Dict[str, dict]],
+            tolerance: float) -> List[str]:
+    """
+    Find benchmarks that are slower than the baseline by more than ``tolerance``.
+
+    Args:
+        results: Current results, keyed by corpus then benchmark.
+        baseline: Baseline results in the same shape.
+        tolerance (float): Allowed relative slowdown, e.g. 0.2 for 20%.
+
+    Returns:
+        List[str]: A description of each regression.
+    """
+    regressions = []
+    for corpus, benches in results.items():
+        for bench, metrics in benches.items():
+            previous = baseline.get(corpus, {}).get(bench)
+            if not previous or not previous['seconds']:
+                continue
+            change = metrics['seconds'] / previous['seconds'] - 1
+            if change > tolerance:
+                regressions.append(f"{corpus}/{bench}: {previous['seconds']:.4f}s -> "
+                                   f"{metrics['seconds']:.4f}s (+{change:.0%})")
+    return regressions
+
+def print_table(results: Dict[str, Dict[str, dict]]) -> None:
+    print(f"{'corpus':<16} {'benchmark':<15} {'files':>6} {'seconds':>9} {'files/s':>10} "
+          f"{'MB/s':>8} {'peak MB':>8}")
+    for corpus, benches in results.items():
+        for bench, m in benches.items():
+            peak = f"{m['peak_mb']:.1f}" if m['peak_mb'] else '-'
+            print(f"{corpus:<16} {bench:<15} {m['files']:>6} {m['seconds']:>9.4f} "
+                  f"{m['files_per_sec']:>10.1f} {m['mb_per_sec']:>8.2f} {peak:>8}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Segmented Docstring benchmarks")
+    parser.add_argument('--corpus', action='append', choices=corpus_names(),
+                        help="Corpus to run (repeatable; defaults to all)")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="Multiplier for the number of files")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed repetitions per benchmark")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="Workers for the CLI benchmarks")
+    parser.add_argument('--save-baseline', metavar='NAME', help="Save results as a named baseline")
+    parser.add_argument('--compare', metavar='NAME',
+                        help="Compare results against a named baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Allowed slowdown before failing")
+    parser.add_argument('--json', metavar='PATH', help="Also write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    for name in LOGGER_NAMES:
+        logging.getLogger(name).setLevel(logging.ERROR)
+    # Measure parsing itself; repeated runs over the same corpus would otherwise hit the cache.
+    set_shared_cache(None)
+
+    workdir = tempfile.mkdtemp(prefix='segmented-bench-')
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)  # Keep any .segmentedrc in the caller's directory out of the measurements.
+    try:
+        results = {name: run_corpus(name, workdir, args.scale, args.repeat, args.jobs)
+                   for name in (args.corpus or corpus_names())}
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_table(results)
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding='utf-8')
+    if args.save_baseline:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        path = BASELINE_DIR / f"{args.save_baseline}.json"
+        path.write_text(json.dumps(results, indent=2), encoding='utf-8')
+        print(f"Baseline saved to {path}")
+    if args.compare:
+        path = BASELINE_DIR / f"{args.compare}.json"
+        regressions = compare(results, json.loads(path.read_text(encoding='utf-8')), args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"No regressions against {path.name} (tolerance {args.tolerance:.0%})")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
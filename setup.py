@@ -18,4 +18,7 @@ setup(
         'colored_custom_logger',
         'toml',
     ],    
+    extras_require={
+        'watch': ['watchdog'],
+    },
 )
@@ -6,9 +6,41 @@ into separate files containing bare code and docstrings, and combining
 them back into a single file.
 """
 
-from .splitter import split_file
-from .combiner import combine_files
-from .cli import main as cli_main
+import importlib
+
+# Submodules are imported on first attribute access so that importing the
+# package (or just its CLI for `--help`) stays cheap.
+_LAZY_ATTRIBUTES = {
+    'split_file': ('.splitter', 'split_file'),
+    'split_source': ('.splitter', 'split_source'),
+    'split_bytes': ('.splitter', 'split_bytes'),
+    'split_many': ('.splitter', 'split_many'),
+    'combine_files': ('.combiner', 'combine_files'),
+    'combine_source': ('.combiner', 'combine_source'),
+    'combine_bytes': ('.combiner', 'combine_bytes'),
+    'combine_many': ('.combiner', 'combine_many'),
+    'async_split_file': ('.aio', 'async_split_file'),
+    'async_combine_files': ('.aio', 'async_combine_files'),
+    'async_split_directory': ('.aio', 'async_split_directory'),
+    'async_combine_directory': ('.aio', 'async_combine_directory'),
+    'cli_main': ('.cli', 'main'),
+}
+
+__all__ = ['split_file', 'split_source', 'split_bytes', 'split_many',
+           'combine_files', 'combine_source', 'combine_bytes', 'combine_many',
+           'async_split_file', 'async_combine_files',
+           'async_split_directory', 'async_combine_directory',
+           'cli_main']
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attribute = _LAZY_ATTRIBUTES[name]
+    value = getattr(importlib.import_module(module_name, __name__), attribute)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
 
-__all__ = ['split_file', 'combine_files', 'cli_main']
 __version__ = '0.4.33'
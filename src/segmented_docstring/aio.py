@@ -0,0 +1,198 @@
+"""
+aio.py
+
+This module provides asyncio wrappers around the splitter and combiner for
+services that must not block their event loop.
+
+Reading, parsing and writing run in an executor: the event loop's default thread
+pool unless another executor is given. Passing a ``ProcessPoolExecutor`` also
+spreads parsing over several cores. The directory variants create the output
+directory if needed and process files concurrently, at most ``limit`` at a time.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import Executor
+from typing import List, Optional, Tuple
+
+from colored_custom_logger import CustomLogger
+from .combiner import combine_files, output_path, CombinerError
+from .config import DEFAULT_CONFIG
+from .discovery import find_pairs, find_sources
+from .report import FileStats
+from .splitter import split_file, SplitterError
+from .writer import make_directories
+
+logger = CustomLogger.get_logger("aio")
+
+DEFAULT_CONCURRENCY = 8
+
+async def async_split_file(input_file_path: str, output_directory: str, barecode_extension: str,
+                           docstring_extension: str, low_memory: bool = False,
+                           executor: Optional[Executor] = None) -> Optional[FileStats]:
+    """
+    Split a Python file without blocking the event loop.
+
+    Args:
+        input_file_path (str): Path to the input Python file.
+        output_directory (str): Directory to save the output files.
+        barecode_extension (str): File extension for the bare code file.
+        docstring_extension (str): File extension for the docstring file.
+        low_memory (bool): Use the low-memory engine (see
+            :func:`~segmented_docstring.splitter.split_file`).
+        executor (Optional[Executor]): Executor to run in; the loop's default executor if None.
+
+    Returns:
+        Optional[FileStats]: What was done, as returned by ``split_file``.
+
+    Raises:
+        SplitterError: If the file cannot be split, as raised by ``split_file``.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(
+        split_file, input_file_path, output_directory, barecode_extension, docstring_extension,
+        low_memory=low_memory))
+
+async def async_combine_files(barecode_file_path: str, docstring_file_path: str,
+                              output_file_path: str, low_memory: bool = False,
+                              executor: Optional[Executor] = None) -> Optional[FileStats]:
+    """
+    Combine bare code and docstring files without blocking the event loop.
+
+    Args:
+        barecode_file_path (str): Path to the file containing the bare code.
+        docstring_file_path (str): Path to the file containing the docstrings.
+        output_file_path (str): Path to write the combined output file.
+        low_memory (bool): Use the low-memory engine (see
+            :func:`~segmented_docstring.combiner.combine_files`).
+        executor (Optional[Executor]): Executor to run in; the loop's default executor if None.
+
+    Returns:
+        Optional[FileStats]: What was done, as returned by ``combine_files``.
+
+    Raises:
+        CombinerError: If the files cannot be combined, as raised by ``combine_files``.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(
+        combine_files, barecode_file_path, docstring_file_path, output_file_path,
+        low_memory=low_memory))
+
+async def async_split_directory(
+        directory: str, output_directory: str, config: Optional[dict] = None,
+        recursive: bool = False, limit: int = DEFAULT_CONCURRENCY, low_memory: bool = False,
+        executor: Optional[Executor] = None) -> List[Tuple[str, Optional[SplitterError]]]:
+    """
+    Split every Python file in a directory concurrently.
+
+    A failing file does not stop the others; its error is returned instead.
+
+    Args:
+        directory (str): Directory containing the Python files.
+        output_directory (str): Directory to save the output files; created if needed.
+        config (Optional[dict]): Configuration dictionary, for the output extensions.
+            Defaults to the default configuration.
+        recursive (bool): Whether to include subdirectories.
+        limit (int): Maximum number of files processed at once.
+        low_memory (bool): Use the low-memory engine.
+        executor (Optional[Executor]): Executor to run in; the loop's default executor if None.
+
+    Returns:
+        List[Tuple[str, Optional[SplitterError]]]: Each input path with its error, or None
+            if it was split, in discovery order.
+
+    Raises:
+        ValueError: If ``limit`` is less than 1.
+        OSError: If ``output_directory`` cannot be created.
+    """
+    _check_limit(limit)
+    config = config or DEFAULT_CONFIG
+    # Directory scans are blocking I/O too; they always run in the default thread pool.
+    loop = asyncio.get_running_loop()
+    files = await loop.run_in_executor(None, _find_sources, directory, config, recursive)
+    await loop.run_in_executor(None, make_directories, [output_directory])
+    semaphore = asyncio.Semaphore(limit)
+
+    async def split_one(path: str) -> Tuple[str, Optional[SplitterError]]:
+        async with semaphore:
+            try:
+                await async_split_file(path, output_directory, config['barecode_extension'],
+                                       config['docstring_extension'], low_memory=low_memory,
+                                       executor=executor)
+            except SplitterError as e:
+                logger.error("Error splitting file %s: %s", path, e)
+                return path, e
+            return path, None
+
+    return list(await asyncio.gather(*(split_one(path) for path in files)))
+
+async def async_combine_directory(
+        directory: str, output_directory: str, config: Optional[dict] = None,
+        recursive: bool = False, limit: int = DEFAULT_CONCURRENCY, low_memory: bool = False,
+        executor: Optional[Executor] = None) -> List[Tuple[str, Optional[CombinerError]]]:
+    """
+    Combine every bare code/docstring pair in a directory concurrently.
+
+    Bare code files without a docstring file are skipped with a warning. A failing
+    pair does not stop the others; its error is returned instead.
+
+    Args:
+        directory (str): Directory containing the bare code and docstring files.
+        output_directory (str): Directory to save the combined files; created if needed.
+        config (Optional[dict]): Configuration dictionary, for the file extensions.
+            Defaults to the default configuration.
+        recursive (bool): Whether to include subdirectories.
+        limit (int): Maximum number of pairs processed at once.
+        low_memory (bool): Use the low-memory engine.
+        executor (Optional[Executor]): Executor to run in; the loop's default executor if None.
+
+    Returns:
+        List[Tuple[str, Optional[CombinerError]]]: Each bare code path with its error, or
+            None if it was combined, in discovery order.
+
+    Raises:
+        ValueError: If ``limit`` is less than 1.
+        OSError: If ``output_directory`` cannot be created.
+    """
+    _check_limit(limit)
+    config = config or DEFAULT_CONFIG
+    barecode_extension = config['barecode_extension']
+    loop = asyncio.get_running_loop()
+    pairs = await loop.run_in_executor(None, _find_pairs, directory, config, recursive)
+    await loop.run_in_executor(None, make_directories, [output_directory])
+    semaphore = asyncio.Semaphore(limit)
+
+    async def combine_one(barecode_file: str,
+                          docstring_file: str) -> Tuple[str, Optional[CombinerError]]:
+        output_file = output_path(barecode_file, output_directory, barecode_extension)
+        async with semaphore:
+            try:
+                await async_combine_files(barecode_file, docstring_file, output_file,
+                                          low_memory=low_memory, executor=executor)
+            except CombinerError as e:
+                logger.error("Error combining files %s and %s: %s",
+                             barecode_file, docstring_file, e)
+                return barecode_file, e
+            return barecode_file, None
+
+    return list(await asyncio.gather(*(combine_one(*pair) for pair in pairs)))
+
+def _find_sources(directory: str, config: dict, recursive: bool) -> List[str]:
+    """Return the Python files in ``directory``, skipping excluded paths and earlier outputs."""
+    return list(find_sources(directory, config, recursive))
+
+def _find_pairs(directory: str, config: dict, recursive: bool) -> List[Tuple[str, str]]:
+    """Return the bare code files in ``directory`` paired with their docstring files."""
+    pairs = []
+    for barecode_file, docstring_file in find_pairs(directory, config, recursive):
+        if docstring_file is not None:
+            pairs.append((barecode_file, docstring_file))
+        else:
+            logger.warning("Docstring file not found for: %s", barecode_file)
+    return pairs
+
+def _check_limit(limit: int) -> None:
+    if limit < 1:
+        raise ValueError(f"Concurrency limit must be at least 1, got {limit}")
+
+__version__ = '0.1.0'
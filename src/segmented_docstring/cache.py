@@ -0,0 +1,185 @@
+"""
+cache.py
+
+This module provides a persistent manifest of processed files so that repeated
+split and combine runs can skip inputs that have not changed since the last run.
+
+The manifest also records the package and sidecar format versions that
+produced the outputs, so that an upgrade regenerates every output once.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Sequence
+
+from colored_custom_logger import CustomLogger
+from . import __version__ as PACKAGE_VERSION
+from .sidecar import SIDECAR_VERSION
+
+logger = CustomLogger.get_logger("cache")
+
+CACHE_FILE_NAME = '.segmented-cache'
+MANIFEST_VERSION = 2
+# What produced the recorded outputs; entries made by anything else are stale.
+GENERATOR = {'package': PACKAGE_VERSION, 'sidecar': SIDECAR_VERSION}
+
+def file_digest(path: str) -> str:
+    """
+    Compute the SHA-256 hex digest of a file's contents.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        str: The hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ManifestCache:
+    """
+    A manifest of input fingerprints and the outputs produced from them.
+
+    Inputs are fingerprinted by mtime, size and content hash. A cheap ``stat``
+    is enough to confirm an unchanged input; the content hash is only computed
+    when the stat differs, so touched-but-identical files are still skipped.
+    Outputs are fingerprinted by mtime and size so that deleted or hand-edited
+    outputs are regenerated.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Load the manifest stored in ``directory``, if any.
+
+        Args:
+            directory (str): Directory holding the ``.segmented-cache`` file.
+        """
+        self.path = Path(directory) / CACHE_FILE_NAME
+        self.entries: Dict[str, dict] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable cache manifest %s: %s", self.path, e)
+            return
+        if not isinstance(data, dict) or data.get('version') != MANIFEST_VERSION:
+            logger.warning("Ignoring cache manifest with unsupported format: %s", self.path)
+            return
+        if data.get('generator') != GENERATOR:
+            logger.info("Cache manifest %s was written by another version; "
+                        "regenerating all outputs", self.path)
+            self._dirty = True
+            return
+        self.entries = data.get('entries', {})
+        logger.debug("Loaded %d cache entries from %s", len(self.entries), self.path)
+
+    @staticmethod
+    def _key(inputs: Sequence[str]) -> str:
+        return os.path.abspath(inputs[0])
+
+    def is_fresh(self, inputs: Sequence[str], outputs: Sequence[str]) -> bool:
+        """
+        Check whether ``outputs`` are up to date with respect to ``inputs``.
+
+        Args:
+            inputs (Sequence[str]): Input file paths; the first one keys the entry.
+            outputs (Sequence[str]): Output file paths produced from the inputs.
+
+        Returns:
+            bool: True if the inputs are unchanged and the outputs are intact.
+        """
+        entry = self.entries.get(self._key(inputs))
+        if entry is None:
+            return False
+
+        recorded_inputs = entry.get('inputs', {})
+        recorded_outputs = entry.get('outputs', {})
+        if sorted(recorded_inputs) != sorted(os.path.abspath(p) for p in inputs):
+            return False
+        if sorted(recorded_outputs) != sorted(os.path.abspath(p) for p in outputs):
+            return False
+
+        for path in outputs:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return False
+            if [st.st_mtime_ns, st.st_size] != recorded_outputs[os.path.abspath(path)]:
+                return False
+
+        for path in inputs:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return False
+            mtime_ns, size, digest = recorded_inputs[os.path.abspath(path)]
+            if st.st_size != size:
+                return False
+            if st.st_mtime_ns != mtime_ns:
+                if file_digest(path) != digest:
+                    return False
+                # Touched but identical: refresh the stat so the next check is cheap.
+                recorded_inputs[os.path.abspath(path)] = [st.st_mtime_ns, size, digest]
+                self._dirty = True
+        return True
+
+    def record(self, inputs: Sequence[str], outputs: Sequence[str]) -> None:
+        """
+        Record that ``outputs`` were produced from the current ``inputs``.
+
+        Args:
+            inputs (Sequence[str]): Input file paths; the first one keys the entry.
+            outputs (Sequence[str]): Output file paths produced from the inputs.
+        """
+        try:
+            recorded_inputs = {}
+            for path in inputs:
+                st = os.stat(path)
+                recorded_inputs[os.path.abspath(path)] = [st.st_mtime_ns, st.st_size,
+                                                          file_digest(path)]
+            recorded_outputs = {}
+            for path in outputs:
+                st = os.stat(path)
+                recorded_outputs[os.path.abspath(path)] = [st.st_mtime_ns, st.st_size]
+        except OSError as e:
+            logger.warning("Unable to record cache entry for %s: %s", inputs[0], e)
+            return
+        self.entries[self._key(inputs)] = {'inputs': recorded_inputs, 'outputs': recorded_outputs}
+        self._dirty = True
+
+    def save(self) -> None:
+        """
+        Write the manifest back to disk if it has changed.
+
+        The manifest is written to a temporary file and renamed into place so
+        an interrupted run never leaves a truncated manifest behind.
+        """
+        if not self._dirty:
+            return
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': MANIFEST_VERSION, 'generator': GENERATOR,
+                           'entries': self.entries}, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+            logger.debug("Cache manifest saved to: %s", self.path)
+        except OSError as e:
+            logger.warning("Unable to save cache manifest %s: %s", self.path, e)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+__version__ = '0.1.0'
@@ -5,21 +5,77 @@ This module implements the command-line interface for the segmented_docstring pa
 """
 
 import argparse
+import importlib
+import os
 import sys
+import time
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
 
-from colored_custom_logger import CustomLogger
-from .splitter import split_file, SplitterError
-from .combiner import combine_files, CombinerError
-from .config import read_config, ConfigError
+# The modules behind the commands (and the logger) are imported on first use, so
+# that `--help`, argument errors and hooks that exit early do not pay for them.
+# Each name is bound into this module's namespace when first needed, where it
+# can be patched like an ordinary import.
+_LAZY_IMPORTS = {
+    'ManifestCache': ('.cache', 'ManifestCache'),
+    'split_file': ('.splitter', 'split_file'),
+    'split_bytes': ('.splitter', 'split_bytes'),
+    'output_paths': ('.splitter', 'output_paths'),
+    'SplitterError': ('.splitter', 'SplitterError'),
+    'combine_files': ('.combiner', 'combine_files'),
+    'combine_bytes': ('.combiner', 'combine_bytes'),
+    'output_path': ('.combiner', 'output_path'),
+    'CombinerError': ('.combiner', 'CombinerError'),
+    'read_config': ('.config', 'read_config'),
+    'ConfigError': ('.config', 'ConfigError'),
+    'get_profiler': ('.profiling', 'get_profiler'),
+    'profile_phase': ('.profiling', 'profile_phase'),
+    'verify_file': ('.verify', 'verify_file'),
+    'find_sources': ('.discovery', 'find_sources'),
+    'find_pairs': ('.discovery', 'find_pairs'),
+    'output_directory_for': ('.discovery', 'output_directory_for'),
+    'make_directories': ('.writer', 'make_directories'),
+    'VerifyError': ('.verify', 'VerifyError'),
+}
 
-logger = CustomLogger.get_logger("cli")
+def __getattr__(name: str) -> Any:
+    if name == 'logger':
+        from colored_custom_logger import CustomLogger
+        value = CustomLogger.get_logger("cli")
+    elif name in _LAZY_IMPORTS:
+        module_name, attribute = _LAZY_IMPORTS[name]
+        value = getattr(importlib.import_module(module_name, __package__), attribute)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+def _bind_lazy_imports() -> None:
+    """Bind every lazily imported name that is not bound (or patched) yet."""
+    namespace = globals()
+    for name in ('logger', *_LAZY_IMPORTS):
+        if name not in namespace:
+            __getattr__(name)
+
+# Commands that hold on to the process, or to its standard streams, for their
+# whole run and therefore always run in the calling process.
+LOCAL_COMMANDS = ('serve', 'watch', 'git-filter')
+SOCKET_ENV = 'SEGMENTED_SOCKET'
+
+# Below this many files the cost of starting worker processes outweighs the
+# work itself, so batches this small are processed in the calling process.
+PARALLEL_THRESHOLD = 8
 
 class CLIError(Exception):
     """Base exception for CLI-related errors."""
     pass
 
+class TaskResult(NamedTuple):
+    """The outcome of one file processed by a split or combine task."""
+    error: Optional[str]
+    stats: Optional['FileStats']
+    seconds: float
+
 def create_parser() -> argparse.ArgumentParser:
     """
     Create and return the argument parser for the CLI.
@@ -29,28 +85,181 @@ def create_parser() -> argparse.ArgumentParser:
     """
     parser = argparse.ArgumentParser(description="Segmented Docstring CLI")
     parser.add_argument('-v', '--verbose', action='store_true', help="Enable verbose output")
+    parser.add_argument('--via-daemon', action='store_true',
+                        help="Run the command in a running 'serve' daemon; runs here "
+                             "if none answers")
+    parser.add_argument('--socket', type=str,
+                        help=f"Socket of the daemon (defaults to ${SOCKET_ENV} or a per-user path)")
     
     subparsers = parser.add_subparsers(dest='command', required=True)
 
     # Common arguments for all subcommands
     common_parser = argparse.ArgumentParser(add_help=False)
     common_parser.add_argument('-o', '--output', type=str, help="Output directory")
-    common_parser.add_argument('-r', '--recursive', action='store_true', help="Process directories recursively")
-    common_parser.add_argument('--dry-run', action='store_true', help="Perform a dry run without making changes")
+    common_parser.add_argument('-r', '--recursive', action='store_true',
+                               help="Process directories recursively")
+    common_parser.add_argument('--exclude', action='append', default=[], metavar='PATTERN',
+                               help="Skip paths matching a .gitignore-style pattern (repeatable)")
+    common_parser.add_argument('--layout', choices=('flat', 'mirror'),
+                               help="Write all outputs to the output directory (flat, the default) "
+                                    "or mirror the source tree under it")
+    common_parser.add_argument('--dry-run', action='store_true',
+                               help="Perform a dry run without making changes")
+    common_parser.add_argument('-j', '--jobs', type=int, default=None,
+                               help="Number of worker processes for directories "
+                                    "(defaults to CPU count)")
+    common_parser.add_argument('--no-cache', action='store_true',
+                               help="Process every file, ignoring the .segmented-cache manifest")
+    common_parser.add_argument('--low-memory', action='store_true',
+                               help="Memory-map inputs and stream outputs, for very large files")
+    common_parser.add_argument('--report', choices=('json', 'ndjson'),
+                               help="Write a JSON record per file and a summary to stdout, "
+                                    "as one document or one line per record")
+    common_parser.add_argument('--log-files', action='store_true',
+                               help="Log every processed file at INFO level")
+    common_parser.add_argument('--no-progress', action='store_true',
+                               help="Do not show a progress bar, even on a terminal")
+    common_parser.add_argument('--profile', action='store_true',
+                               help="Time each phase of every file and print a summary "
+                                    "(also enabled by SEGMENTED_PROFILE)")
+    common_parser.add_argument('--profile-output', type=str,
+                               help="Also save the profile to this file (implies --profile)")
+    common_parser.add_argument('--profile-format', choices=('json', 'chrome'), default='json',
+                               help="Format of --profile-output: totals and records, "
+                                    "or a Chrome trace")
 
     # Split command
-    split_parser = subparsers.add_parser('split', help="Split Python files into bare code and docstrings", parents=[common_parser])
-    split_parser.add_argument('source', type=str, help="Source file or directory")
+    split_parser = subparsers.add_parser('split', parents=[common_parser],
+                                         help="Split Python files into bare code and docstrings")
+    split_parser.add_argument('source', type=str,
+                              help="Source file or directory, or '-' to read from stdin")
+    split_parser.add_argument('--barecode-out', type=str, default='-',
+                              help="With '-' as source: where to write bare code "
+                                   "('-', a path or fd:N)")
+    split_parser.add_argument('--docstring-out', type=str,
+                              help="With '-' as source: where to write docstrings "
+                                   "('-', a path or fd:N)")
 
     # Combine command
-    combine_parser = subparsers.add_parser('combine', help="Combine bare code and docstring files", parents=[common_parser])
-    combine_parser.add_argument('source', type=str, help="Source directory containing bare code and docstring files")
+    combine_parser = subparsers.add_parser('combine', parents=[common_parser],
+                                           help="Combine bare code and docstring files")
+    combine_parser.add_argument('source', type=str,
+                                help="Source directory containing bare code and docstring files, "
+                                     "or '-' to read bare code from stdin")
+    combine_parser.add_argument('--docstrings', type=str,
+                                help="With '-' as source: where to read docstrings from "
+                                     "(a path or fd:N)")
+
+    # Watch command
+    watch_parser = subparsers.add_parser('watch',
+                                         help="Watch a directory and split or combine files "
+                                              "as they change")
+    watch_parser.add_argument('source', type=str, help="Directory to watch")
+    watch_parser.add_argument('-o', '--output', type=str, help="Output directory")
+    watch_parser.add_argument('-r', '--recursive', action='store_true',
+                              help="Watch subdirectories too")
+    watch_parser.add_argument('--exclude', action='append', default=[], metavar='PATTERN',
+                              help="Ignore paths matching a .gitignore-style pattern (repeatable)")
+    watch_parser.add_argument('--layout', choices=('flat', 'mirror'),
+                              help="Write all outputs to the output directory (flat, the default) "
+                                   "or mirror the source tree under it")
+    watch_parser.add_argument('--mode', choices=('split', 'combine'), default='split',
+                              help="Split changed Python files or combine "
+                                   "changed bare code/docstring pairs")
+    watch_parser.add_argument('--debounce', type=float, default=0.2,
+                              help="Seconds to wait for further changes before processing")
+    watch_parser.add_argument('--poll-interval', type=float, default=1.0,
+                              help="Seconds between scans when filesystem notifications "
+                                   "are unavailable")
+    watch_parser.add_argument('--no-cache', action='store_true',
+                              help="Process every change, ignoring the .segmented-cache manifest")
+
+    # Verify command
+    verify_parser = subparsers.add_parser('verify',
+                                          help="Check that splitting and combining files "
+                                               "loses nothing")
+    verify_parser.add_argument('source', type=str, help="Source file or directory")
+    verify_parser.add_argument('-r', '--recursive', action='store_true',
+                               help="Process directories recursively")
+    verify_parser.add_argument('--exclude', action='append', default=[], metavar='PATTERN',
+                               help="Skip paths matching a .gitignore-style pattern (repeatable)")
+    verify_parser.add_argument('-j', '--jobs', type=int, default=None,
+                               help="Number of worker processes for directories "
+                                    "(defaults to CPU count)")
+    verify_parser.add_argument('--legacy', action='store_true',
+                               help="Round-trip through the legacy name-keyed docstring "
+                                    "format instead")
+    verify_parser.add_argument('--exact', action='store_true',
+                               help="Also require files to come back identical, "
+                                    "formatting included")
+    verify_parser.add_argument('--low-memory', action='store_true',
+                               help="Round-trip files with the low-memory engine "
+                                    "used by --low-memory")
+
+    # Serve command
+    serve_parser = subparsers.add_parser('serve',
+                                         help="Run a daemon that serves --via-daemon invocations")
+    serve_parser.add_argument('--idle-timeout', type=float, default=None,
+                              help="Stop after this many seconds without a request")
+
+    # Index command
+    index_parser = subparsers.add_parser('index',
+                                         help="Build or update the search index of docstring files")
+    index_parser.add_argument('source', type=str,
+                              help="Directory containing bare code and docstring files")
+    index_parser.add_argument('-r', '--recursive', action='store_true',
+                              help="Index subdirectories too")
+    index_parser.add_argument('--index', type=str,
+                              help="Index file (defaults to .segmented-index "
+                                   "in the source directory)")
+    index_parser.add_argument('--exclude', action='append', default=[], metavar='PATTERN',
+                              help="Skip paths matching a .gitignore-style pattern (repeatable)")
+    index_parser.add_argument('-j', '--jobs', type=int, default=None,
+                              help="Number of worker processes (defaults to CPU count)")
+
+    # Search command
+    search_parser = subparsers.add_parser('search', help="Search the docstring index")
+    search_parser.add_argument('query', nargs='+',
+                               help="A qualified name, or words the docstrings must contain")
+    search_parser.add_argument('--index', type=str, default='.segmented-index',
+                               help="Index file (defaults to .segmented-index)")
+    search_parser.add_argument('--names', action='store_true', help="Only look up qualified names")
+    search_parser.add_argument('--limit', type=int, default=20,
+                               help="Maximum number of results (0 for all)")
+    search_parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+
+    # Stats command
+    stats_parser = subparsers.add_parser('stats',
+                                         help="Report docstring coverage and sizes as JSON")
+    stats_parser.add_argument('source', type=str, help="Source file or directory")
+    stats_parser.add_argument('-r', '--recursive', action='store_true',
+                              help="Process directories recursively")
+    stats_parser.add_argument('--exclude', action='append', default=[], metavar='PATTERN',
+                              help="Skip paths matching a .gitignore-style pattern (repeatable)")
+    stats_parser.add_argument('-j', '--jobs', type=int, default=None,
+                              help="Number of worker processes for directories "
+                                   "(defaults to CPU count)")
+    stats_parser.add_argument('--largest', type=int, default=10,
+                              help="Number of largest docstrings to list")
+    stats_parser.add_argument('--fail-under', type=float, default=None, metavar='PERCENT',
+                              help="Exit with an error if docstring coverage is below PERCENT")
+
+    # Git filter command
+    subparsers.add_parser('git-filter',
+                          help="Run as a long-running git filter process (filter.<driver>.process)")
 
     return parser
 
 def main(argv: Optional[List[str]] = None) -> None:
     parser = create_parser()
     args = parser.parse_args(argv)
+    if args.via_daemon and daemon_can_run(args):
+        status = _forward_to_daemon(args, list(sys.argv[1:] if argv is None else argv))
+        if status is not None:
+            if status:
+                sys.exit(status)
+            return
+    _bind_lazy_imports()
     
     try:
         config = read_config()
@@ -60,15 +269,31 @@ def main(argv: Optional[List[str]] = None) -> None:
 
     if args.verbose:
         logger.setLevel("DEBUG")
-        print("Verbose mode enabled")  # Keep this print statement for backward compatibility
+        # Kept for backward compatibility, on stderr so it never mixes with JSON or source output.
+        print("Verbose mode enabled", file=sys.stderr)
         logger.debug("Verbose mode enabled")
         logger.debug("Configuration: %s", config)
 
+    profiler, profile_output = _start_profiling(args)
     try:
         if args.command == 'split':
             process_split(args, config)
         elif args.command == 'combine':
             process_combine(args, config)
+        elif args.command == 'watch':
+            process_watch(args, config)
+        elif args.command == 'verify':
+            process_verify(args, config)
+        elif args.command == 'git-filter':
+            process_git_filter(args, config)
+        elif args.command == 'serve':
+            process_serve(args, config)
+        elif args.command == 'index':
+            process_index(args, config)
+        elif args.command == 'search':
+            process_search(args, config)
+        elif args.command == 'stats':
+            process_stats(args, config)
     except CLIError as e:
         print(f"Error: {e}", file=sys.stderr)  # Print to stderr for backward compatibility
         logger.error("CLI error: %s", e)
@@ -77,6 +302,9 @@ def main(argv: Optional[List[str]] = None) -> None:
         print(f"An unexpected error occurred: {e}", file=sys.stderr)  # Print to stderr for backward compatibility
         logger.error("An unexpected error occurred: %s", e)
         sys.exit(1)
+    finally:
+        if profiler is not None:
+            _report_profile(profiler, profile_output, getattr(args, 'profile_format', 'json'))
 
 def process_split(args: argparse.Namespace, config: dict) -> None:
     """
@@ -89,29 +317,68 @@ def process_split(args: argparse.Namespace, config: dict) -> None:
     Raises:
         CLIError: If there's an error processing the split command.
     """
+    if args.source == '-':
+        _split_stream(args)
+        return
+
     source = Path(args.source)
     output = Path(args.output) if args.output else Path(config['output_folder'])
+    cache = _open_cache(args, output)
     
     if source.is_file():
-        logger.info("Splitting file: %s", source)
+        logger.debug("Splitting file: %s", source)
+        run = _RunReporter(args, 'split', 1)
         if not args.dry_run:
+            started = time.perf_counter()
             try:
-                split_file(str(source), str(output), config['barecode_extension'], config['docstring_extension'])
+                stats = split_file(str(source), str(output), config['barecode_extension'],
+                                   config['docstring_extension'], cache=cache,
+                                   low_memory=args.low_memory)
             except SplitterError as e:
+                run.file_done(str(source), TaskResult(str(e), None, time.perf_counter() - started))
+                run.finish()
                 raise CLIError(f"Error splitting file {source}: {e}")
+            finally:
+                if cache is not None:
+                    cache.save()
+            run.file_done(str(source), TaskResult(None, stats, time.perf_counter() - started))
+        run.finish()
     elif source.is_dir():
-        if args.recursive:
-            files = source.rglob('*.py')
+        layout = _resolve_layout(args, config)
+        tasks = []
+        task_outputs = []
+        skipped = []
+        claimed: Dict[str, str] = {}
+        with profile_phase('walk'):
+            for python_file in find_sources(str(source), config, args.recursive, args.exclude):
+                output_directory = output_directory_for(python_file, str(source), str(output),
+                                                        layout)
+                outputs = output_paths(python_file, output_directory,
+                                       config['barecode_extension'], config['docstring_extension'])
+                _check_collision(claimed, python_file, outputs[0])
+                if cache is not None and cache.is_fresh([python_file], outputs):
+                    logger.debug("Skipping unchanged file: %s", python_file)
+                    skipped.append(python_file)
+                    continue
+                logger.debug("Splitting file: %s", python_file)
+                tasks.append((python_file, output_directory, config['barecode_extension'],
+                              config['docstring_extension'], args.low_memory))
+                task_outputs.append(outputs)
+
+        run = _RunReporter(args, 'split', len(tasks), skipped)
+        if not args.dry_run:
+            _make_output_directories(task[1] for task in tasks)
+            results = _run_tasks(_split_task, tasks, _resolve_jobs(args), run.task_done)
+            if cache is not None:
+                for task, outputs, result in zip(tasks, task_outputs, results):
+                    if not result.error:
+                        cache.record([task[0]], outputs)
+                cache.save()
+            run.finish()
+            _report_failures("split", [(task[0], result.error)
+                                       for task, result in zip(tasks, results) if result.error])
         else:
-            files = source.glob('*.py')
-        
-        for python_file in files:
-            logger.info("Splitting file: %s", python_file)
-            if not args.dry_run:
-                try:
-                    split_file(str(python_file), str(output), config['barecode_extension'], config['docstring_extension'])
-                except SplitterError as e:
-                    logger.error("Error splitting file %s: %s", python_file, e)
+            run.finish()
     else:
         raise CLIError(f"Error: {source} is not a valid file or directory")
 
@@ -126,32 +393,847 @@ def process_combine(args: argparse.Namespace, config: dict) -> None:
     Raises:
         CLIError: If there's an error processing the combine command.
     """
+    if args.source == '-':
+        _combine_stream(args)
+        return
+
     source = Path(args.source)
     output = Path(args.output) if args.output else Path(config['output_folder'])
     
     if not source.is_dir():
         raise CLIError(f"Error: {source} is not a valid directory")
 
-    def combine_pair(barecode_file: Path, docstring_file: Path) -> None:
-        logger.info("Combining files: %s and %s", barecode_file, docstring_file)
-        if not args.dry_run:
-            output_file = output / barecode_file.with_suffix('.py').name
-            try:
-                combine_files(str(barecode_file), str(docstring_file), str(output_file))
-            except CombinerError as e:
-                logger.error("Error combining files %s and %s: %s", barecode_file, docstring_file, e)
+    cache = _open_cache(args, output)
+    layout = _resolve_layout(args, config)
+
+    tasks = []
+    skipped = []
+    claimed: Dict[str, str] = {}
+    with profile_phase('walk'):
+        pairs = find_pairs(str(source), config, args.recursive, args.exclude)
+        for barecode_file, docstring_file in pairs:
+            if docstring_file is not None:
+                output_directory = output_directory_for(barecode_file, str(source), str(output),
+                                                        layout)
+                output_file = output_path(barecode_file, output_directory,
+                                          config['barecode_extension'])
+                _check_collision(claimed, barecode_file, output_file)
+                if cache is not None and cache.is_fresh([barecode_file, docstring_file],
+                                                        [output_file]):
+                    logger.debug("Skipping unchanged files: %s and %s", barecode_file,
+                                 docstring_file)
+                    skipped.append(barecode_file)
+                    continue
+                logger.debug("Combining files: %s and %s", barecode_file, docstring_file)
+                tasks.append((barecode_file, docstring_file, output_file, args.low_memory))
+            else:
+                logger.warning("Docstring file not found for: %s", barecode_file)
+
+    run = _RunReporter(args, 'combine', len(tasks), skipped)
+    if not args.dry_run:
+        _make_output_directories(os.path.dirname(task[2]) for task in tasks)
+        results = _run_tasks(_combine_task, tasks, _resolve_jobs(args), run.task_done)
+        if cache is not None:
+            for task, result in zip(tasks, results):
+                if not result.error:
+                    cache.record(task[:2], task[2:3])
+            cache.save()
+        run.finish()
+        _report_failures("combine", [(task[0], result.error) for task, result in zip(tasks, results)
+                                     if result.error])
+    else:
+        run.finish()
+
+def process_watch(args: argparse.Namespace, config: dict) -> None:
+    """
+    Process the watch command, running until interrupted.
+
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments.
+        config (dict): Configuration dictionary.
+
+    Raises:
+        CLIError: If the directory cannot be watched.
+    """
+    from .watcher import Watcher, WatchError
+
+    output = Path(args.output) if args.output else Path(config['output_folder'])
+    cache = None if args.no_cache else ManifestCache(str(output))
+    try:
+        watcher = Watcher(args.source, str(output), config, mode=args.mode,
+                          recursive=args.recursive, layout=_resolve_layout(args, config),
+                          excludes=args.exclude,
+                          debounce=args.debounce, poll_interval=args.poll_interval, cache=cache)
+        watcher.run()
+    except WatchError as e:
+        raise CLIError(str(e))
+    except KeyboardInterrupt:
+        logger.info("Stopped watching %s", args.source)
+
+def process_verify(args: argparse.Namespace, config: dict) -> None:
+    """
+    Process the verify command.
+
+    Each file is split and combined as raw bytes, by the low-memory engine with
+    ``--low-memory``, and the result is compared with the original as a syntax tree,
+    so formatting differences are ignored unless ``--exact`` is given.
+
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments.
+        config (dict): Configuration dictionary.
 
-    if args.recursive:
-        barecode_files = source.rglob(f"*{config['barecode_extension']}")
+    Raises:
+        CLIError: If the source is invalid or any file does not survive the round trip.
+    """
+    source = Path(args.source)
+    if source.is_file():
+        files = [source]
+    elif source.is_dir():
+        files = find_sources(str(source), config, args.recursive, args.exclude)
     else:
-        barecode_files = source.glob(f"*{config['barecode_extension']}")
+        raise CLIError(f"Error: {source} is not a valid file or directory")
+
+    tasks = [(str(python_file), args.legacy, args.exact, args.low_memory) for python_file in files]
+    results = _run_tasks(_verify_task, tasks, _resolve_jobs(args))
+    _report_failures("verify", [(task[0], error) for task, error in zip(tasks, results) if error])
+    logger.info("Verified %d file(s)", len(tasks))
 
-    for barecode_file in barecode_files:
-        docstring_file = barecode_file.with_suffix(config['docstring_extension'])
-        if docstring_file.exists():
-            combine_pair(barecode_file, docstring_file)
+def process_index(args: argparse.Namespace, config: dict) -> None:
+    """
+    Process the index command, bringing the index up to date with the docstring files.
+
+    Only docstring files that are new or changed since they were indexed are read,
+    in parallel for large batches.
+
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments.
+        config (dict): Configuration dictionary.
+
+    Raises:
+        CLIError: If the source is invalid, the index cannot be read or written, or any
+            docstring file cannot be indexed.
+    """
+    from .index import INDEX_FILE_NAME, DocstringIndex, SearchIndexError
+
+    source = Path(args.source)
+    if not source.is_dir():
+        raise CLIError(f"Error: {source} is not a valid directory")
+    index_path = args.index or str(source / INDEX_FILE_NAME)
+    try:
+        index = DocstringIndex.load(index_path)
+    except SearchIndexError as e:
+        raise CLIError(str(e))
+
+    with profile_phase('walk'):
+        found = find_pairs(str(source), config, args.recursive, args.exclude)
+        pairs = {docstring_file: barecode_file for barecode_file, docstring_file in found
+                 if docstring_file is not None}
+        changed, removed = index.changes(pairs)
+    results = _run_tasks(_index_task, [(path, pairs[path]) for path in changed],
+                         _resolve_jobs(args))
+    failures = []
+    for path, result in zip(changed, results):
+        if isinstance(result, str):
+            failures.append((path, result))
         else:
-            logger.warning("Docstring file not found for: %s", barecode_file)
+            index.add(result)
+    for key in removed:
+        index.remove(key)
+    try:
+        index.save()
+    except SearchIndexError as e:
+        raise CLIError(str(e))
+    logger.info("Indexed %d docstring(s) from %d file(s): %d updated, %d removed", len(index),
+                len(index.files), len(changed) - len(failures), len(removed))
+    _report_failures("index", failures)
+
+def process_search(args: argparse.Namespace, config: dict) -> None:
+    """
+    Process the search command, printing the matching docstrings.
+
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments.
+        config (dict): Configuration dictionary.
+
+    Raises:
+        CLIError: If the index cannot be read.
+    """
+    from .index import SearchIndexError, open_index
+
+    try:
+        index = open_index(args.index)
+    except SearchIndexError as e:
+        raise CLIError(f"{e}; build it with 'segmented-docstring index'")
+    results = index.search(' '.join(args.query), limit=args.limit or None, names_only=args.names)
+    if args.json:
+        import json
+        print(json.dumps([result._asdict() for result in results], indent=2, ensure_ascii=False))
+        return
+    for result in results:
+        location = f"{result.path}:{result.line}" if result.line else result.path
+        summary = result.docstring.strip().split('\n', 1)[0]
+        print(f"{location}: {result.qualname}: {summary}")
+
+def process_stats(args: argparse.Namespace, config: dict) -> None:
+    """
+    Process the stats command, printing a JSON report of docstring coverage and sizes.
+
+    Files are only parsed, never split, in parallel for large batches.
+
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments.
+        config (dict): Configuration dictionary.
+
+    Raises:
+        CLIError: If the source is invalid, any file cannot be measured, or coverage is
+            below ``--fail-under``.
+    """
+    import json
+    from .stats import summarize
+
+    if args.largest < 0:
+        raise CLIError(f"Invalid number of largest docstrings: {args.largest}")
+    source = Path(args.source)
+    if source.is_file():
+        files, root = [source], source.parent
+    elif source.is_dir():
+        with profile_phase('walk'):
+            files = list(find_sources(str(source), config, args.recursive, args.exclude))
+            root = source
+    else:
+        raise CLIError(f"Error: {source} is not a valid file or directory")
+
+    tasks = [(str(python_file), args.largest) for python_file in files]
+    results = _run_tasks(_stats_task, tasks, _resolve_jobs(args))
+    failures = [(task[0], result) for task, result in zip(tasks, results)
+                if isinstance(result, str)]
+    report = summarize([result for result in results if not isinstance(result, str)], str(root),
+                       args.largest, failures)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+    summary = report['summary']
+    logger.info("Documented %d of %d definition(s) in %d file(s) (%.2f%%); "
+                "docstrings are %.2f%% of the bytes", summary['documented'],
+                summary['definitions'], summary['files'], summary['coverage'],
+                summary['docstring_share'])
+    _report_failures("measure", failures)
+    if args.fail_under is not None and summary['coverage'] < args.fail_under:
+        raise CLIError(f"Docstring coverage {summary['coverage']:.2f}% "
+                       f"is below {args.fail_under:g}%")
+
+def process_git_filter(args: argparse.Namespace, config: dict) -> None:
+    """
+    Process the git-filter command, serving git until it closes the pipe.
+
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments.
+        config (dict): Configuration dictionary.
+
+    Raises:
+        CLIError: If git speaks an unsupported protocol.
+    """
+    from .gitfilter import run_git_filter, GitFilterError
+
+    try:
+        run_git_filter(config, sys.stdin.buffer, sys.stdout.buffer)
+    except GitFilterError as e:
+        raise CLIError(str(e))
+
+def process_serve(args: argparse.Namespace, config: dict) -> None:
+    """
+    Process the serve command, running the daemon until it stops.
+
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments.
+        config (dict): Configuration dictionary.
+
+    Raises:
+        CLIError: If the daemon cannot start.
+    """
+    from .daemon import Daemon, DaemonError
+
+    try:
+        Daemon(args.socket or default_socket_path(), idle_timeout=args.idle_timeout).serve()
+    except DaemonError as e:
+        raise CLIError(str(e))
+    except KeyboardInterrupt:
+        logger.info("Daemon stopped")
+
+def default_socket_path() -> str:
+    """
+    Return the socket the daemon listens on unless told otherwise.
+
+    Returns:
+        str: ``$SEGMENTED_SOCKET`` if set, else a path in ``$XDG_RUNTIME_DIR`` or in a
+            per-user directory of the temporary directory, which the daemon creates
+            with mode 0700.
+    """
+    configured = os.environ.get(SOCKET_ENV)
+    if configured:
+        return configured
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, 'segmented-docstring.sock')
+    import tempfile
+    return os.path.join(tempfile.gettempdir(), f"segmented-docstring-{os.getuid()}", 'daemon.sock')
+
+def socket_owner(client, path: str) -> Optional[int]:
+    """
+    Find out which user serves a connected daemon socket.
+
+    The peer's credentials are asked for where the platform provides them
+    (``SO_PEERCRED``); elsewhere the owner of the socket file is used, provided its
+    directory belongs to the same user (or to root, like a sticky ``/tmp``).
+
+    Args:
+        client (socket.socket): The connected socket.
+        path (str): The path it is connected to.
+
+    Returns:
+        Optional[int]: The user id of the daemon, or None if it cannot be trusted to be known.
+    """
+    import socket
+    import struct
+
+    if hasattr(socket, 'SO_PEERCRED'):
+        credentials = client.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED,
+                                        struct.calcsize('3i'))
+        return struct.unpack('3i', credentials)[1]
+    try:
+        owner = os.stat(path).st_uid
+        directory_owner = os.stat(os.path.dirname(os.path.abspath(path))).st_uid
+    except OSError:
+        return None
+    return owner if directory_owner in (owner, 0) else None
+
+def daemon_can_run(args: argparse.Namespace) -> bool:
+    """
+    Check whether an invocation can be forwarded to the daemon.
+
+    Long-running commands and streams named as ``fd:N`` (descriptors the daemon
+    cannot see) always run in the calling process.
+
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments.
+
+    Returns:
+        bool: True if the daemon can run the invocation.
+    """
+    if args.command in LOCAL_COMMANDS:
+        return False
+    streams = (getattr(args, name, None)
+               for name in ('barecode_out', 'docstring_out', 'docstrings'))
+    return not any(stream and stream.startswith('fd:') for stream in streams)
+
+def _forward_to_daemon(args: argparse.Namespace, argv: List[str]) -> Optional[int]:
+    """
+    Run an invocation in the daemon, replaying its output here.
+
+    Only the standard library is imported on this path, so that a forwarded call
+    starts as fast as the interpreter does.
+
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments.
+        argv (List[str]): The original arguments.
+
+    Returns:
+        Optional[int]: The exit status, or None if no daemon answered.
+    """
+    import base64
+    import json
+    import socket
+
+    path = args.socket or default_socket_path()
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(path)
+    except OSError as e:
+        client.close()
+        _bind_lazy_imports()
+        logger.debug("No daemon on %s (%s), running in this process", path, e)
+        return None
+    with client:
+        owner = socket_owner(client, path)
+        if owner != os.getuid():
+            # Anyone else could read the request and forge the response.
+            _bind_lazy_imports()
+            logger.warning("The daemon socket %s belongs to another user (%s), "
+                           "running in this process", path, 'unknown' if owner is None else owner)
+            return None
+        # stdin is only read once a daemon answered, so it is still there otherwise.
+        stdin = sys.stdin.buffer.read() if getattr(args, 'source', None) == '-' else None
+        request = {
+            'argv': _strip_daemon_options(argv, args.command),
+            'cwd': os.getcwd(),
+            'env': {name: value for name, value in os.environ.items()
+                    if name.startswith('SEGMENTED_')},
+            'stdin': None if stdin is None else base64.b64encode(stdin).decode('ascii'),
+        }
+        client.sendall(json.dumps(request).encode('utf-8'))
+        client.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    try:
+        response = json.loads(b''.join(chunks).decode('utf-8'))
+    except ValueError:
+        print(f"Error: no valid response from the daemon on {path}", file=sys.stderr)
+        return 1
+    # stdout carries raw bytes, e.g. bare code in the source's own encoding.
+    sys.stdout.flush()
+    sys.stdout.buffer.write(base64.b64decode(response.get('stdout') or ''))
+    sys.stdout.buffer.flush()
+    sys.stderr.write(response.get('stderr', ''))
+    sys.stderr.flush()
+    return int(response.get('status', 1))
+
+def _strip_daemon_options(argv: List[str], command: str) -> List[str]:
+    """Remove ``--via-daemon`` and ``--socket`` from the options before the command."""
+    stripped = []
+    tokens = iter(argv)
+    for token in tokens:
+        if token == command:
+            stripped.append(token)
+            break
+        if token == '--via-daemon' or token.startswith('--socket='):
+            continue
+        if token == '--socket':
+            next(tokens, None)
+            continue
+        stripped.append(token)
+    stripped.extend(tokens)
+    return stripped
+
+def _split_stream(args: argparse.Namespace) -> None:
+    """
+    Split source read from stdin, writing bare code and docstrings to streams.
+
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments.
+
+    Raises:
+        CLIError: If the outputs are missing or the source cannot be split.
+    """
+    if not args.docstring_out:
+        raise CLIError("--docstring-out is required when reading from stdin")
+    if args.report:
+        raise CLIError("--report cannot be used when reading from stdin")
+    if args.barecode_out == '-' and args.docstring_out == '-':
+        raise CLIError("Bare code and docstrings cannot both be written to stdout")
+
+    source = _read_stream('-', binary=True)
+    try:
+        barecode, docstrings = split_bytes(source)
+    except SplitterError as e:
+        raise CLIError(f"Error splitting stdin: {e}")
+    if not args.dry_run:
+        _write_stream(args.barecode_out, barecode)
+        _write_stream(args.docstring_out, docstrings)
+
+def _combine_stream(args: argparse.Namespace) -> None:
+    """
+    Combine bare code read from stdin with docstrings from a stream, writing to stdout.
+
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments.
+
+    Raises:
+        CLIError: If the docstrings are missing or the inputs cannot be combined.
+    """
+    if not args.docstrings or args.docstrings == '-':
+        raise CLIError("--docstrings must name a path or fd:N when reading bare code from stdin")
+    if args.report:
+        raise CLIError("--report cannot be used when reading from stdin")
+
+    bare_code = _read_stream('-', binary=True)
+    docstrings = _read_stream(args.docstrings)
+    try:
+        combined = combine_bytes(bare_code, docstrings)
+    except CombinerError as e:
+        raise CLIError(f"Error combining stdin: {e}")
+    if not args.dry_run:
+        _write_stream('-', combined)
+
+def _read_stream(target: str, binary: bool = False) -> Union[str, bytes]:
+    """
+    Read the whole of a stream named on the command line.
+
+    Args:
+        target (str): ``-`` for stdin, ``fd:N`` for an inherited file descriptor, or a file path.
+        binary (bool): Return the raw bytes, e.g. of Python source in its own encoding,
+            instead of UTF-8 text.
+
+    Returns:
+        Union[str, bytes]: The stream contents.
+
+    Raises:
+        CLIError: If the stream cannot be read.
+    """
+    try:
+        if target == '-':
+            return sys.stdin.buffer.read() if binary else sys.stdin.read()
+        with _open_stream(target, 'rb' if binary else 'r') as stream:
+            return stream.read()
+    except (OSError, ValueError) as e:
+        raise CLIError(f"Unable to read {target}: {e}")
+
+def _write_stream(target: str, content: Union[str, bytes]) -> None:
+    """
+    Write content to a stream named on the command line.
+
+    Args:
+        target (str): ``-`` for stdout, ``fd:N`` for an inherited file descriptor, or a file path.
+        content (Union[str, bytes]): The content to write; bytes are written unchanged,
+            text in UTF-8.
+
+    Raises:
+        CLIError: If the stream cannot be written.
+    """
+    binary = isinstance(content, bytes)
+    try:
+        if target == '-':
+            sys.stdout.flush()
+            stream = sys.stdout.buffer if binary else sys.stdout
+            stream.write(content)
+            stream.flush()
+            return
+        with _open_stream(target, 'wb' if binary else 'w') as stream:
+            stream.write(content)
+    except (OSError, ValueError) as e:
+        raise CLIError(f"Unable to write {target}: {e}")
+
+def _open_stream(target: str, mode: str):
+    """Open ``fd:N`` as an unowned descriptor, or any other target as a file path."""
+    encoding = None if 'b' in mode else 'utf-8'
+    if target.startswith('fd:'):
+        return os.fdopen(int(target[3:]), mode, encoding=encoding, closefd=False)
+    return open(target, mode, encoding=encoding)
+
+def _split_task(input_file_path: str, output_directory: str, barecode_extension: str,
+                docstring_extension: str, low_memory: bool = False) -> TaskResult:
+    """
+    Split a single file, returning its result or error message instead of raising.
+
+    This runs inside worker processes, so it must stay a module-level function.
+    """
+    _bind_lazy_imports()
+    started = time.perf_counter()
+    try:
+        stats = split_file(input_file_path, output_directory, barecode_extension,
+                           docstring_extension, low_memory=low_memory)
+    except SplitterError as e:
+        logger.error("Error splitting file %s: %s", input_file_path, e)
+        return TaskResult(str(e), None, time.perf_counter() - started)
+    return TaskResult(None, stats, time.perf_counter() - started)
+
+def _combine_task(barecode_file_path: str, docstring_file_path: str, output_file_path: str,
+                  low_memory: bool = False) -> TaskResult:
+    """
+    Combine a single file pair, returning its result or error message instead of raising.
+
+    This runs inside worker processes, so it must stay a module-level function.
+    """
+    _bind_lazy_imports()
+    started = time.perf_counter()
+    try:
+        stats = combine_files(barecode_file_path, docstring_file_path, output_file_path,
+                              low_memory=low_memory)
+    except CombinerError as e:
+        logger.error("Error combining files %s and %s: %s", barecode_file_path,
+                     docstring_file_path, e)
+        return TaskResult(str(e), None, time.perf_counter() - started)
+    return TaskResult(None, stats, time.perf_counter() - started)
+
+def _verify_task(input_file_path: str, legacy: bool = False, exact: bool = False,
+                 low_memory: bool = False) -> Optional[str]:
+    """
+    Verify a single file, returning a description of the difference or error instead of raising.
+
+    This runs inside worker processes, so it must stay a module-level function.
+    """
+    _bind_lazy_imports()
+    try:
+        return verify_file(input_file_path, legacy=legacy, exact=exact, low_memory=low_memory)
+    except VerifyError as e:
+        return str(e)
+
+def _index_task(sidecar_path: str, barecode_path: str) -> Union['IndexedFile', str]:
+    """
+    Read a docstring file for the index, returning the error message instead of raising.
+
+    This runs inside worker processes, so it must stay a module-level function.
+    """
+    from .index import SearchIndexError, read_sidecar
+
+    try:
+        return read_sidecar(sidecar_path, barecode_path)
+    except SearchIndexError as e:
+        return str(e)
+
+def _stats_task(input_file_path: str, largest: int) -> Union['FileCoverage', str]:
+    """
+    Measure a single file, returning the error message instead of raising.
+
+    This runs inside worker processes, so it must stay a module-level function.
+    """
+    from .stats import StatsError, file_coverage
+
+    try:
+        return file_coverage(input_file_path, largest)
+    except StatsError as e:
+        return str(e)
+
+class _RunReporter:
+    """
+    Passes per-file results of a split or combine run to its outputs: the ``--report``
+    stream, a progress bar on terminals, and per-file logging with ``--log-files``.
+    """
+
+    def __init__(self, args: argparse.Namespace, action: str, total: int,
+                 skipped: Sequence[str] = ()):
+        """
+        Args:
+            args (argparse.Namespace): Parsed command-line arguments.
+            action (str): ``'split'`` or ``'combine'``.
+            total (int): Number of files that will be processed.
+            skipped (Sequence[str]): Files skipped as unchanged, reported straight away.
+        """
+        from .report import ProgressBar, Reporter
+
+        self.action = action
+        self.log_files = args.log_files
+        self.reporter = Reporter(action, args.report, sys.stdout) if args.report else None
+        quiet = args.no_progress or args.verbose or args.log_files or args.dry_run
+        show_progress = total > 1 and not quiet
+        self.progress = ProgressBar(total, f"{action} ") if show_progress else None
+        for path in skipped:
+            self.file_done(path, None)
+
+    def task_done(self, task: Tuple, result: TaskResult) -> None:
+        """Record the result of a task run by :func:`_run_tasks`."""
+        self.file_done(task[0], result)
+        if self.progress is not None:
+            self.progress.update()
+
+    def file_done(self, path: str, result: Optional[TaskResult]) -> None:
+        """
+        Record the result of one file.
+
+        Args:
+            path (str): The input file.
+            result (Optional[TaskResult]): Its result, or None if it was skipped as unchanged.
+        """
+        if result is None or (result.error is None and result.stats is None):
+            status = 'skipped'
+        elif result.error is not None:
+            status = 'failed'
+        else:
+            status = 'ok' if result.stats.written else 'unchanged'
+        if self.log_files and status != 'failed':
+            if status == 'skipped':
+                logger.info("Skipped unchanged %s", path)
+            else:
+                logger.info("%s %s: %d docstring(s), %s", self.action.capitalize(), path,
+                            result.stats.docstrings, 'written' if status == 'ok' else 'unchanged')
+        if self.reporter is not None:
+            if result is None:
+                self.reporter.record(path, status)
+            else:
+                self.reporter.record(path, status, result.seconds, result.stats, result.error)
+
+    def finish(self) -> None:
+        """Close the progress bar and write the report's summary."""
+        if self.progress is not None:
+            self.progress.close()
+        if self.reporter is not None:
+            self.reporter.finish()
+
+def _resolve_layout(args: argparse.Namespace, config: dict) -> str:
+    """
+    Return the output layout from ``--layout`` or the ``layout`` configuration key.
+
+    Raises:
+        CLIError: If the configured layout is unknown.
+    """
+    layout = getattr(args, 'layout', None) or config.get('layout', 'flat')
+    if layout not in ('flat', 'mirror'):
+        raise CLIError(f"Error: unknown output layout {layout!r} in configuration "
+                       "(use 'flat' or 'mirror')")
+    return layout
+
+def _check_collision(claimed: Dict[str, str], input_path: str, output_file: str) -> None:
+    """Warn when two inputs of one run would write the same output file."""
+    previous = claimed.setdefault(output_file, input_path)
+    if previous != input_path:
+        logger.warning("%s and %s both write to %s; use --layout mirror to keep them apart",
+                       previous, input_path, output_file)
+
+def _make_output_directories(directories: Iterable[str]) -> None:
+    """
+    Create the output directories of a batch up front, once each.
+
+    Raises:
+        CLIError: If a directory cannot be created.
+    """
+    try:
+        make_directories(directory for directory in directories if directory)
+    except OSError as e:
+        raise CLIError(f"Error creating output directories: {e}")
+
+def _open_cache(args: argparse.Namespace, output: Path) -> Optional['ManifestCache']:
+    """
+    Open the manifest cache for an output directory, unless caching is disabled.
+
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments.
+        output (Path): The output directory holding the manifest.
+
+    Returns:
+        Optional[ManifestCache]: The manifest, or None for dry runs and ``--no-cache``.
+    """
+    if args.dry_run or getattr(args, 'no_cache', False):
+        return None
+    return ManifestCache(str(output))
+
+def _resolve_jobs(args: argparse.Namespace) -> int:
+    """
+    Determine the number of worker processes to use.
+
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments.
+
+    Returns:
+        int: The requested job count, or the CPU count when none was given.
+
+    Raises:
+        CLIError: If the requested job count is not a positive integer.
+    """
+    jobs = getattr(args, 'jobs', None)
+    if jobs is None:
+        return os.cpu_count() or 1
+    if jobs < 1:
+        raise CLIError(f"Invalid number of jobs: {jobs}")
+    return jobs
+
+def _run_tasks(func: Callable[..., Any], tasks: Sequence[Tuple], jobs: int,
+               callback: Optional[Callable[[Tuple, Any], None]] = None) -> List[Any]:
+    """
+    Run a per-file function over a batch of argument tuples.
+
+    Large batches are dispatched to a process pool; small batches, or a single
+    job, run in the current process. Results are returned in task order.
+
+    Args:
+        func (Callable[..., Any]): Module-level function to call for each task.
+        tasks (Sequence[Tuple]): Positional arguments for each call.
+        jobs (int): Maximum number of worker processes.
+        callback (Optional[Callable[[Tuple, Any], None]]): Called in this process with each
+            task and its result, in task order, as soon as the result is available.
+
+    Returns:
+        List[Any]: The result of each call, in the same order as ``tasks``.
+    """
+    if jobs <= 1 or len(tasks) < PARALLEL_THRESHOLD:
+        return _collect(tasks, (func(*task) for task in tasks), callback)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = min(jobs, len(tasks))
+    chunksize = max(1, len(tasks) // (workers * 4))
+    logger.debug("Dispatching %d tasks to %d worker processes", len(tasks), workers)
+    profiler = get_profiler()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        if profiler is None:
+            return _collect(tasks, executor.map(func, *zip(*tasks), chunksize=chunksize), callback)
+
+        def profiled_results():
+            for result, records in executor.map(_profiled_task, [func] * len(tasks), tasks,
+                                                chunksize=chunksize):
+                profiler.extend(records)
+                yield result
+
+        return _collect(tasks, profiled_results(), callback)
+
+def _collect(tasks: Sequence[Tuple], results: Any,
+             callback: Optional[Callable[[Tuple, Any], None]]) -> List[Any]:
+    """Gather results lazily produced for ``tasks``, passing each to ``callback`` as it arrives."""
+    if callback is None:
+        return list(results)
+    collected = []
+    for task, result in zip(tasks, results):
+        callback(task, result)
+        collected.append(result)
+    return collected
+
+def _profiled_task(func: Callable[..., Any], task: Tuple) -> Tuple[Any, List[Tuple]]:
+    """
+    Run a task in a worker process under a fresh profiler.
+
+    Returns:
+        Tuple[Any, List[Tuple]]: The task's result and the phases it recorded.
+    """
+    from .profiling import Profiler, set_profiler
+
+    profiler = Profiler()
+    set_profiler(profiler)
+    try:
+        return func(*task), [tuple(record) for record in profiler.records]
+    finally:
+        set_profiler(None)
+
+def _start_profiling(args: argparse.Namespace) -> Tuple[Optional['Profiler'], Optional[str]]:
+    """
+    Activate a profiler if ``--profile``, ``--profile-output`` or ``SEGMENTED_PROFILE`` ask for one.
+
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments.
+
+    Returns:
+        Tuple[Optional[Profiler], Optional[str]]: The active profiler, or None, and the
+            file to save its report to, if any.
+    """
+    from .profiling import Profiler, profile_from_env, set_profiler
+
+    enabled, output = profile_from_env()
+    output = getattr(args, 'profile_output', None) or output
+    if not (enabled or output or getattr(args, 'profile', False)):
+        return None, None
+    profiler = Profiler()
+    set_profiler(profiler)
+    return profiler, output
+
+def _report_profile(profiler: 'Profiler', output: Optional[str], report_format: str) -> None:
+    """Print the profile summary to stderr and save the full report if requested."""
+    from .profiling import set_profiler
+
+    set_profiler(None)
+    print(profiler.summary(), file=sys.stderr)
+    if output:
+        try:
+            profiler.save(output, report_format)
+        except OSError as e:
+            logger.error("Unable to save profile %s: %s", output, e)
+
+def _report_failures(action: str, failures: List[Tuple[str, str]]) -> None:
+    """
+    Summarize per-file failures collected during a directory run.
+
+    Args:
+        action (str): Name of the operation, used in messages.
+        failures (List[Tuple[str, str]]): ``(path, error message)`` pairs in processing order.
+
+    Raises:
+        CLIError: If any file failed.
+    """
+    if not failures:
+        return
+    logger.error("%d file(s) failed to %s:", len(failures), action)
+    for path, error in failures:
+        logger.error("  %s: %s", path, error)
+    raise CLIError(f"{len(failures)} file(s) failed to {action}")
 
 def entry_point():
     """
@@ -4,13 +4,30 @@ combiner.py
 This module provides functionality for combining bare code and docstring files
 back into a single Python source file.
 
+Bare code files are combined as raw bytes: the docstrings are encoded in the
+file's own encoding and spliced in between byte ranges copied from the bare
+code, which is never decoded as a whole.
+
 Version: 1.1.0
 """
 
-import ast
+import io
+import os
+import tokenize
+from bisect import bisect_right
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
 from colored_custom_logger import CustomLogger
+from .cache import ManifestCache
+from .config import DEFAULT_CONFIG
+from .sidecar import (SidecarEntry, SidecarError, loads as load_sidecar, join_statement,
+                      render_docstring, source_newline)
+from .parsecache import get_shared_cache
+from .profiling import profile_file, profile_phase
+from .report import FileStats
+from .spans import (_char_column, decode_source, find_docstring_spans, has_lone_carriage_returns,
+                    line_offsets, source_encoding, universal_newlines)
+from .writer import file_size, write_file
 
 logger = CustomLogger.get_logger("combiner")
 
@@ -30,63 +47,378 @@ class DocstringMismatchError(CombinerError):
     """Raised when there's a mismatch between bare code and docstrings."""
     pass
 
-def combine_files(barecode_file_path: str, docstring_file_path: str, output_file_path: str) -> None:
+class CombineResult(NamedTuple):
+    """
+    The outcome of combining one pair with :func:`combine_many`.
+
+    ``source`` is bytes, in the bare code's encoding, for files and bytes bare code.
+    """
+    name: str
+    source: Optional[Union[str, bytes]]
+    error: Optional[CombinerError]
+
+def docstring_path_for(barecode_file_path: str, barecode_extension: str,
+                       docstring_extension: str) -> str:
+    """
+    Compute the docstring file path paired with a bare code file.
+
+    Args:
+        barecode_file_path (str): Path to the bare code file.
+        barecode_extension (str): File extension of bare code files.
+        docstring_extension (str): File extension of docstring files.
+
+    Returns:
+        str: The path of the matching docstring file.
+    """
+    return barecode_file_path[:-len(barecode_extension)] + docstring_extension
+
+def output_path(barecode_file_path: str, output_directory: str, barecode_extension: str) -> str:
+    """
+    Compute the combined output path for a bare code file.
+
+    Args:
+        barecode_file_path (str): Path to the bare code file.
+        output_directory (str): Directory to save the combined file.
+        barecode_extension (str): File extension of bare code files.
+
+    Returns:
+        str: The path of the combined ``.py`` file.
+    """
+    base_name = os.path.basename(barecode_file_path)[:-len(barecode_extension)]
+    return os.path.join(output_directory, f"{base_name}.py")
+
+def combine_source(bare_code: str, docstrings: str) -> str:
+    """
+    Combine bare code and docstring sidecar contents held in memory.
+
+    Bare code with lines ending in a lone carriage return is read as Python reads
+    it, so the combined source ends its lines with ``\\n``.
+
+    Args:
+        bare_code (str): The bare code.
+        docstrings (str): The docstring sidecar contents, in the current or legacy format.
+
+    Returns:
+        str: The combined Python source.
+
+    Raises:
+        FileReadError: If the docstring sidecar cannot be parsed.
+        DocstringMismatchError: If there's a mismatch between bare code and docstrings.
+    """
+    return _combine(bare_code, docstrings)[0]
+
+def combine_bytes(bare_code: bytes, docstrings: str) -> bytes:
+    """
+    Combine the raw bytes of a bare code file with docstring sidecar contents.
+
+    The docstrings are encoded in the encoding declared by the bare code's PEP 263
+    comment or byte order mark (UTF-8 otherwise), with its line endings, and spliced
+    in between bytes copied from ``bare_code``. Characters the encoding cannot
+    represent are written as escapes. Legacy sidecars, and bare code with lines
+    ending in a lone carriage return, are combined through the decoded text instead.
+
+    Args:
+        bare_code (bytes): The raw bare code.
+        docstrings (str): The docstring sidecar contents, in the current or legacy format.
+
+    Returns:
+        bytes: The combined Python source, in the encoding of ``bare_code``.
+
+    Raises:
+        FileReadError: If the bare code cannot be decoded or the sidecar cannot be parsed.
+        DocstringMismatchError: If there's a mismatch between bare code and docstrings.
+    """
+    return _combine(bare_code, docstrings)[0]
+
+def _combine(bare_code: Union[str, bytes], docstrings: str) -> Tuple[Union[str, bytes], int]:
+    """Combine text or raw bytes like :func:`combine_source`, also counting docstrings inserted."""
+    try:
+        with profile_phase('parse'):
+            entries = load_sidecar(docstrings)
+    except SidecarError as e:
+        logger.error("Error parsing docstring file: %s", e)
+        raise FileReadError(f"Error parsing docstring file: {e}") from e
+
+    try:
+        with profile_phase('splice'):
+            if isinstance(bare_code, bytes):
+                return _combine_bytes(bare_code, entries)
+            if has_lone_carriage_returns(bare_code):
+                bare_code = universal_newlines(bare_code)
+            if isinstance(entries, list):
+                return (_splice_docstrings(bare_code, entries),
+                        sum(1 for entry in entries if entry.docstring is not None))
+            return _merge(bare_code, entries)
+    except DocstringMismatchError as e:
+        logger.error("Error merging docstrings: %s", e)
+        raise
+
+def combine_files(barecode_file_path: str, docstring_file_path: str, output_file_path: str,
+                  cache: Optional[ManifestCache] = None,
+                  low_memory: bool = False) -> Optional[FileStats]:
     """
     Combine bare code and docstring files into a single Python source file.
 
     This function reads the bare code and docstring files, merges the docstrings
     back into the bare code while preserving the original structure and formatting,
-    and writes the combined content to the output file.
+    and writes the combined content to the output file. The bare code is combined
+    as raw bytes (see :func:`combine_bytes`), so it keeps its encoding and line
+    endings. Progress is logged at DEBUG.
 
     Args:
         barecode_file_path (str): Path to the file containing the bare code.
         docstring_file_path (str): Path to the file containing the docstrings.
         output_file_path (str): Path to write the combined output file.
+        cache (Optional[ManifestCache]): Manifest used to skip unchanged inputs. The caller
+            is responsible for saving it.
+        low_memory (bool): Memory-map the bare code and stream the combined output in
+            chunks instead of holding the whole file (see :mod:`segmented_docstring.lowmem`).
+
+    Returns:
+        Optional[FileStats]: What was done, with ``bytes_in`` covering both inputs, or None
+            if ``cache`` showed the output is up to date.
 
     Raises:
         FileReadError: If there's an error reading the input files.
         FileSaveError: If there's an error saving the output file.
         DocstringMismatchError: If there's a mismatch between bare code and docstrings.
     """
-    logger.info("Combining files: %s and %s", barecode_file_path, docstring_file_path)
+    inputs = [barecode_file_path, docstring_file_path]
+    if cache is not None and cache.is_fresh(inputs, [output_file_path]):
+        logger.debug("Skipping unchanged files: %s and %s", barecode_file_path, docstring_file_path)
+        return None
+
+    logger.debug("Combining files: %s and %s", barecode_file_path, docstring_file_path)
+
+    try:
+        with profile_file(barecode_file_path):
+            if low_memory:
+                from .lowmem import combine_files_streaming
+                combine = combine_files_streaming
+            else:
+                combine = _combine_in_memory
+            written, docstrings = combine(barecode_file_path, docstring_file_path, output_file_path)
+    except IOError as e:
+        logger.error("Error saving output file: %s", e)
+        raise FileSaveError(f"Error saving output file: {e}") from e
+    if written:
+        logger.debug("Combined code saved to: %s", output_file_path)
+
+    if cache is not None:
+        cache.record(inputs, [output_file_path])
+    logger.debug("Files combined successfully")
+    return FileStats(docstrings, file_size(*inputs), file_size(output_file_path), int(written))
 
+def _combine_in_memory(barecode_file_path: str, docstring_file_path: str,
+                       output_file_path: str) -> Tuple[bool, int]:
+    """Combine two files held in memory, returning whether the output was written and the count."""
     try:
-        with open(barecode_file_path, 'r', encoding='utf-8') as bare_file:
-            bare_code = bare_file.read()
-        logger.debug("Bare code file read successfully")
+        with profile_phase('read'):
+            with open(barecode_file_path, 'rb') as bare_file:
+                bare_code = bare_file.read()
+            logger.debug("Bare code file read successfully")
 
-        with open(docstring_file_path, 'r', encoding='utf-8') as docstring_file:
-            docstrings = ast.literal_eval(docstring_file.read())
-        logger.debug("Docstring file read successfully")
+            with open(docstring_file_path, 'r', encoding='utf-8') as docstring_file:
+                docstrings = docstring_file.read()
+            logger.debug("Docstring file read successfully")
     except IOError as e:
         logger.error("Error reading input files: %s", e)
         raise FileReadError(f"Error reading input files: {e}") from e
-    except SyntaxError as e:
-        logger.error("Error parsing docstring file: %s", e)
-        raise FileReadError(f"Error parsing docstring file: {e}") from e
 
-    try:
-        combined_code = _merge_docstrings(bare_code, docstrings)
-    except DocstringMismatchError as e:
-        logger.error("Error merging docstrings: %s", e)
-        raise
+    combined_code, count = _combine(bare_code, docstrings)
+    with profile_phase('write'):
+        return write_file(output_file_path, combined_code), count
 
+def combine_many(pairs: Iterable[Tuple[str, ...]], output_directory: Optional[str] = None,
+                 config: Optional[dict] = None) -> Iterator[CombineResult]:
+    """
+    Combine many bare code/docstring pairs in one call, yielding the results as they are produced.
+
+    Each item is either a ``(barecode_path, docstring_path)`` pair, read from disk and
+    combined like :func:`combine_bytes`, or a ``(name, bare_code, docstrings)`` triple
+    held in memory, with bare code as text or raw bytes, where ``name`` is the bare
+    code file name used to name the output. A failing item does not stop the batch: its
+    result carries the error instead. Per-item progress is logged at DEBUG and one
+    summary at INFO.
+
+    Args:
+        pairs (Iterable[Tuple[str, ...]]): Path pairs or ``(name, bare_code, docstrings)`` triples.
+        output_directory (Optional[str]): If given, the combined sources are also written
+            there (created if needed); otherwise results are only returned.
+        config (Optional[dict]): Configuration dictionary, for the bare code extension.
+            Defaults to the default configuration.
+
+    Yields:
+        CombineResult: The combined source, or the error, of each item in order.
+    """
+    barecode_extension = (config or DEFAULT_CONFIG)['barecode_extension']
+    if output_directory is not None:
+        os.makedirs(output_directory, exist_ok=True)
+
+    count = failed = 0
+    for item in pairs:
+        count += 1
+        if len(item) == 3:
+            name, bare_code, docstrings = item
+        else:
+            name, docstring_file_path = (os.fspath(path) for path in item)
+            bare_code = docstrings = None
+        logger.debug("Combining %s", name)
+        try:
+            if bare_code is None:
+                try:
+                    with open(name, 'rb') as bare_file:
+                        bare_code = bare_file.read()
+                    with open(docstring_file_path, 'r', encoding='utf-8') as docstring_file:
+                        docstrings = docstring_file.read()
+                except IOError as e:
+                    raise FileReadError(f"Error reading input files: {e}") from e
+            if isinstance(bare_code, bytes):
+                combined_code = combine_bytes(bare_code, docstrings)
+            else:
+                combined_code = combine_source(bare_code, docstrings)
+            if output_directory is not None:
+                if name.endswith(barecode_extension):
+                    target = output_path(name, output_directory, barecode_extension)
+                else:
+                    target = os.path.join(output_directory, os.path.basename(name))
+                try:
+                    write_file(target, combined_code)
+                except IOError as e:
+                    raise FileSaveError(f"Error saving output file: {e}") from e
+        except CombinerError as e:
+            failed += 1
+            logger.debug("Failed to combine %s: %s", name, e)
+            yield CombineResult(name, None, e)
+            continue
+        yield CombineResult(name, combined_code, None)
+
+    logger.info("Combined %d pair(s), %d failed", count, failed)
+
+def _splice_docstrings(bare_code: str, entries: List[SidecarEntry],
+                       encoding: Optional[str] = None) -> str:
+    """
+    Splice docstrings from a versioned sidecar back into the bare code.
+
+    Each entry is anchored to a line of the bare code, so the docstrings are
+    inserted by direct index in a single pass over the bare code.
+
+    Args:
+        bare_code (str): The bare code without docstrings.
+        entries (List[SidecarEntry]): Entries loaded from the sidecar.
+        encoding (Optional[str]): The encoding the combined code will be written in, if not UTF-8.
+
+    Returns:
+        str: The combined code with docstrings inserted.
+
+    Raises:
+        DocstringMismatchError: If an entry is anchored outside the bare code.
+    """
+    logger.debug("Splicing docstrings into bare code")
+
+    newline = source_newline(bare_code)
+    offsets = line_offsets(bare_code)
+    inserts = []
+    for entry in entries:
+        if entry.docstring is None:
+            continue
+        if not 1 <= entry.line <= len(offsets):
+            raise DocstringMismatchError(
+                f"Docstring for {entry.qualname} is anchored at line {entry.line}, "
+                f"but the bare code has {len(offsets) - 1} lines")
+        position = offsets[entry.line - 1] + entry.column
+        text = render_docstring(entry, newline, encoding)
+        if entry.column:
+            line_end = offsets[entry.line] if entry.line < len(offsets) else None
+            text = join_statement(text, bare_code[position:line_end])
+        inserts.append((position, text))
+    inserts.sort(key=lambda insert: insert[0])
+
+    combined_code = _apply_inserts(bare_code, inserts)
+    logger.debug("Docstrings spliced successfully")
+    return combined_code
+
+def _combine_bytes(bare_code: bytes,
+                   entries: Union[List[SidecarEntry], Dict[str, Any]]) -> Tuple[bytes, int]:
+    """Combine raw bare code with loaded sidecar entries, returning the source and the count."""
     try:
-        with open(output_file_path, 'w', encoding='utf-8') as output_file:
-            output_file.write(combined_code)
-        logger.info("Combined code saved to: %s", output_file_path)
-    except IOError as e:
-        logger.error("Error saving output file: %s", e)
-        raise FileSaveError(f"Error saving output file: {e}") from e
+        encoding = source_encoding(bare_code)
+        if isinstance(entries, list) and not has_lone_carriage_returns(bare_code):
+            return (_splice_docstring_bytes(bare_code, entries, encoding),
+                    sum(1 for entry in entries if entry.docstring is not None))
+        text = decode_source(bare_code)
+    except (SyntaxError, UnicodeDecodeError) as e:
+        raise FileReadError(f"Error decoding bare code: {e}") from e
+    if isinstance(entries, list):
+        combined_code = _splice_docstrings(text, entries, encoding)
+        count = sum(1 for entry in entries if entry.docstring is not None)
+    else:
+        combined_code, count = _merge(text, entries)
+    return combined_code.encode(encoding, 'backslashreplace'), count
 
-    logger.info("Files combined successfully")
+def _splice_docstring_bytes(bare_code: bytes, entries: List[SidecarEntry], encoding: str) -> bytes:
+    """
+    Splice docstrings from a versioned sidecar into raw bare code.
+
+    Like :func:`_splice_docstrings`, but only the docstrings are encoded, and only
+    the lines holding inline docstrings are decoded, to turn their character columns
+    into byte offsets.
+
+    Args:
+        bare_code (bytes): The raw bare code without docstrings.
+        entries (List[SidecarEntry]): Entries loaded from the sidecar.
+        encoding (str): The encoding of the bare code.
+
+    Returns:
+        bytes: The combined code with docstrings inserted.
+
+    Raises:
+        DocstringMismatchError: If an entry is anchored outside the bare code.
+        UnicodeDecodeError: If a line holding an inline docstring is not valid in ``encoding``.
+    """
+    # The byte order mark is already part of the bare code; do not add it to every docstring.
+    codec = 'utf-8' if encoding == 'utf-8-sig' else encoding
+    newline = source_newline(bare_code)
+    offsets = line_offsets(bare_code)
+    inserts = []
+    for entry in entries:
+        if entry.docstring is None:
+            continue
+        if not 1 <= entry.line <= len(offsets):
+            raise DocstringMismatchError(
+                f"Docstring for {entry.qualname} is anchored at line {entry.line}, "
+                f"but the bare code has {len(offsets) - 1} lines")
+        position = offsets[entry.line - 1]
+        text = render_docstring(entry, newline, codec)
+        if entry.column:
+            line = bare_code[position:offsets[entry.line]] if entry.line < len(offsets) else b''
+            prefix = len(line.decode(codec)[:entry.column].encode(codec))
+            position += prefix
+            text = join_statement(text, line[prefix:])
+        inserts.append((position, text.encode(codec, 'backslashreplace')))
+    inserts.sort(key=lambda insert: insert[0])
+    return _apply_inserts(bare_code, inserts)
+
+def _apply_inserts(bare_code: Union[str, bytes],
+                   inserts: List[Tuple[int, Any]]) -> Union[str, bytes]:
+    """Insert texts (or bytes) at sorted ``(offset, text)`` positions of the bare code at once."""
+    pieces = []
+    pos = 0
+    for position, text in inserts:
+        pieces.append(bare_code[pos:position])
+        pieces.append(text)
+        pos = position
+    pieces.append(bare_code[pos:])
+    return bare_code[:0].join(pieces)
 
 def _merge_docstrings(bare_code: str, docstrings: Dict[str, Any]) -> str:
     """
-    Merge docstrings back into the bare code.
+    Merge docstrings from a legacy name-keyed sidecar back into the bare code.
 
-    This function takes the bare code and a dictionary of docstrings, and
-    inserts the docstrings back into their original positions in the code.
+    The definitions of the bare code are located once with an insertion index (see
+    :func:`_definition_index`), so ``async def``, decorated and nested definitions
+    and multi-line signatures are all handled, and every docstring is inserted in a
+    single pass. A docstring is looked up by qualified name first, then by name.
 
     Args:
         bare_code (str): The bare code without docstrings.
@@ -96,40 +428,121 @@ def _merge_docstrings(bare_code: str, docstrings: Dict[str, Any]) -> str:
         str: The combined code with docstrings inserted.
 
     Raises:
-        DocstringMismatchError: If there's a mismatch between bare code and docstrings.
+        DocstringMismatchError: If the bare code cannot be tokenized.
     """
+    return _merge(bare_code, docstrings)[0]
+
+def _merge(bare_code: str, docstrings: Dict[str, Any]) -> Tuple[str, int]:
+    """Merge like :func:`_merge_docstrings`, also returning the number of docstrings inserted."""
     logger.debug("Merging docstrings into bare code")
 
-    output_lines = []
-
-    # Insert module docstring if present
-    if 'module' in docstrings:
-        output_lines.append(f'"""{docstrings["module"]}"""')
-        output_lines.append('')  # Add an extra newline after the module docstring
-        logger.debug("Module docstring inserted")
-
-    lines = bare_code.splitlines()
-
-    for line in lines:
-        stripped = line.strip()
-        if stripped.startswith(('def ', 'class ')):
-            name = stripped.split()[1].split('(')[0].strip(':')
-            indent = len(line) - len(line.lstrip())
-            output_lines.append(line)
-            if name in docstrings:
-                docstring = docstrings[name].strip()
-                formatted_docstring = f'{" " * (indent + 4)}"""{docstring}"""'
-                output_lines.append(formatted_docstring)
-                logger.debug("Docstring inserted for: %s", name)
-            else:
-                logger.warning("Docstring not found for: %s", name)
-        else:
-            output_lines.append(line)
+    offsets = line_offsets(bare_code)
+    inserts = []
+    for definition in _definition_index(bare_code):
+        if definition.has_docstring:
+            continue
+        docstring = docstrings.get(definition.qualname, docstrings.get(definition.name))
+        if docstring is None:
+            if definition.kind != 'Module':
+                logger.warning("Docstring not found for: %s", definition.name)
+            continue
+        inserts.append(_legacy_insert(bare_code, offsets, definition, str(docstring).strip()))
+        logger.debug("Docstring inserted for: %s", definition.qualname)
+    inserts.sort(key=lambda insert: insert[0])
 
-    # Join lines and ensure only one newline at the end
-    combined_code = '\n'.join(output_lines).rstrip() + '\n'
+    combined_code = _apply_inserts(bare_code, inserts)
+    if not combined_code.endswith('\n'):
+        combined_code += '\n'
     logger.debug("Docstrings merged successfully")
-    return combined_code
+    return combined_code, len(inserts)
+
+class _Definition(NamedTuple):
+    """
+    Where a definition's docstring belongs in bare code.
+
+    ``body_line`` (1-based) and ``body_column`` (in characters) locate the first
+    statement of the body, or its first decorator; a definition whose body is empty,
+    which happens when it held only a docstring, has ``body_column <= indent``.
+    """
+    kind: str
+    name: str
+    qualname: str
+    indent: int
+    body_line: int
+    body_column: int
+    has_docstring: bool
+
+def _definition_index(bare_code: str) -> List[_Definition]:
+    """
+    Locate every module, class and function of bare code, in source order.
+
+    The index is built from the syntax tree. Bare code whose definitions held only
+    a docstring has empty bodies and does not parse; it is indexed with the
+    tokenizer instead.
+
+    Args:
+        bare_code (str): The bare code.
+
+    Returns:
+        List[_Definition]: One entry per definition.
+
+    Raises:
+        DocstringMismatchError: If the bare code cannot be tokenized either.
+    """
+    cache = get_shared_cache()
+    try:
+        spans = cache.spans(bare_code) if cache is not None else find_docstring_spans(bare_code)
+    except SyntaxError:
+        pass
+    else:
+        offsets = line_offsets(bare_code)
+        index = []
+        for span in spans:
+            line = bisect_right(offsets, span.start)
+            text = bare_code[offsets[line - 1]:offsets[line]] if line < len(offsets) else ''
+            index.append(_Definition(span.kind, span.name, span.qualname, span.indent, line,
+                                     _char_column(text, span.body_indent),
+                                     span.docstring is not None))
+        return index
+
+    from .lowmem import scan_docstring_spans
+
+    try:
+        spans = scan_docstring_spans(io.StringIO(bare_code).readline)
+    except (tokenize.TokenError, SyntaxError) as e:
+        raise DocstringMismatchError(f"Bare code cannot be tokenized: {e}") from e
+    return [_Definition(span.kind, span.name, span.qualname, span.indent, span.start[0],
+                        span.body_indent, span.docstring is not None)
+            for span in spans]
+
+def _legacy_insert(bare_code: str, offsets: List[int], definition: _Definition,
+                   docstring: str) -> Tuple[int, str]:
+    """Compute the offset and text that insert a legacy docstring for one definition."""
+    line = definition.body_line
+    entry = SidecarEntry(definition.qualname, definition.kind, line, 0, definition.body_column,
+                         docstring)
+    if definition.kind == 'Module':
+        position = offsets[line - 1] if line <= len(offsets) else len(bare_code)
+        return position, render_docstring(entry) + '\n'
+
+    text = bare_code[offsets[line - 1]:offsets[line]] if line < len(offsets) else ''
+    if text[:definition.body_column].strip():
+        # The body shares a line with the header: ``def f(): return 1``.
+        position = offsets[line - 1] + definition.body_column
+        return position, render_docstring(entry._replace(column=definition.body_column)) + '; '
+
+    # Insert right after the header, ahead of any blank or comment lines before the body.
+    line -= 1
+    while line > 1:
+        stripped = bare_code[offsets[line - 1]:offsets[line]].strip()
+        if stripped and not stripped.startswith('#'):
+            break
+        line -= 1
+    if definition.body_column <= definition.indent:
+        entry = entry._replace(indent=definition.indent + 4)
+    position = offsets[line] if line < len(offsets) else len(bare_code)
+    prefix = '' if position == 0 or bare_code[position - 1] == '\n' else '\n'
+    return position, prefix + render_docstring(entry)
 
 if __name__ == "__main__":
     import sys
@@ -1,6 +1,5 @@
 # src/segmented_docstring/config.py
 
-import toml
 from pathlib import Path
 from typing import Dict, Any
 
@@ -14,7 +13,8 @@ DEFAULT_CONFIG = {
     'barecode_extension': '.barecode.py',
     'docstring_extension': '.docstring.py',
     'recursion': True,
-    'dry_run': False
+    'dry_run': False,
+    'exclude': []
 }
 
 class ConfigError(Exception):
@@ -49,6 +49,8 @@ def read_config(config_path: Path = None) -> Dict[str, Any]:
     config = DEFAULT_CONFIG.copy()
 
     if config_path.exists():
+        import toml  # Only needed when there is a file to parse.
+
         try:
             with open(config_path, 'r', encoding='utf-8') as f:
                 file_config = toml.load(f)
@@ -0,0 +1,366 @@
+"""
+daemon.py
+
+This module implements ``segmented-docstring serve``: a local server that runs
+CLI invocations forwarded by ``segmented-docstring --via-daemon ...``, so that
+frequent callers such as editor save hooks and pre-commit runs do not pay for
+interpreter startup and imports on every call.
+
+The daemon keeps every module imported, the configuration of each directory
+loaded (until its ``.segmentedrc`` changes) and the shared parse cache warm.
+It listens on a Unix domain socket, only accessible to its owner, in a
+directory no other user controls; clients check that the daemon runs as
+their own user before sending anything. Each connection carries one JSON
+request, with the raw bytes of stdin encoded in base64::
+
+    {"argv": [...], "cwd": "...", "env": {...}, "stdin": "<base64>" or null}
+
+and receives one JSON response once the command has finished, with stdout's
+bytes in base64 as well::
+
+    {"status": 0, "stdout": "<base64>", "stderr": "..."}
+
+Requests run one at a time: each one runs in the client's working directory
+with the client's ``SEGMENTED_*`` environment variables and its own standard
+streams, which are process-wide.
+"""
+
+import base64
+import binascii
+import contextlib
+import importlib
+import io
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import stat
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from colored_custom_logger import CustomLogger
+from . import cli
+from .config import read_config
+from .parsecache import enable_shared_cache
+
+logger = CustomLogger.get_logger("daemon")
+
+# Modules imported when the daemon starts instead of by its first request.
+PRELOAD = ('.cache', '.splitter', '.combiner', '.lowmem', '.verify', '.discovery', '.report',
+           '.profiling')
+# How often the serving loop checks whether it should stop.
+POLL_INTERVAL = 0.5
+
+class DaemonError(Exception):
+    """Raised when the daemon cannot start or serve."""
+    pass
+
+class ConfigCache:
+    """
+    Remembers the configuration read from each ``.segmentedrc`` file.
+
+    A file is read again only when its modification time or size changes.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Optional[Tuple[int, int]], Dict[str, Any]]] = {}
+
+    def read(self, config_path: Optional[Path] = None) -> Dict[str, Any]:
+        """
+        Return the configuration like :func:`~segmented_docstring.config.read_config`.
+
+        Args:
+            config_path (Optional[Path]): Path to the configuration file; ``.segmentedrc``
+                in the current directory if None.
+
+        Returns:
+            Dict[str, Any]: A copy of the configuration dictionary.
+
+        Raises:
+            ConfigError: If the file exists but cannot be read or parsed.
+        """
+        path = Path(config_path) if config_path is not None else Path.cwd() / '.segmentedrc'
+        try:
+            info = path.stat()
+            key: Optional[Tuple[int, int]] = (info.st_mtime_ns, info.st_size)
+        except OSError:
+            key = None
+        entry = self._entries.get(str(path))
+        if entry is None or entry[0] != key:
+            entry = (key, read_config(path))
+            self._entries[str(path)] = entry
+        return dict(entry[1])
+
+class Daemon:
+    """
+    Serves forwarded CLI invocations on a Unix domain socket.
+    """
+
+    def __init__(self, socket_path: str, idle_timeout: Optional[float] = None):
+        """
+        Args:
+            socket_path (str): Where to create the socket.
+            idle_timeout (Optional[float]): Stop after this many seconds without a request;
+                never if None.
+
+        Raises:
+            DaemonError: If Unix domain sockets are not available.
+        """
+        if not hasattr(socket, 'AF_UNIX'):
+            raise DaemonError("The daemon requires Unix domain sockets, which this platform lacks")
+        self.socket_path = socket_path
+        self.idle_timeout = idle_timeout
+        self.config_cache = ConfigCache()
+        self.requests = 0
+        self._server: Optional[socketserver.UnixStreamServer] = None
+        self._read_config = None
+
+    def start(self) -> None:
+        """
+        Preload the modules and bind the socket.
+
+        Raises:
+            DaemonError: If another daemon is serving the socket or it cannot be created.
+        """
+        _private_directory(os.path.dirname(os.path.abspath(self.socket_path)))
+        _remove_stale_socket(self.socket_path)
+        for module_name in PRELOAD:
+            importlib.import_module(module_name, __package__)
+        cli._bind_lazy_imports()
+        enable_shared_cache()
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                daemon._handle(self.rfile, self.wfile)
+
+        old_umask = os.umask(0o177)
+        try:
+            self._server = socketserver.UnixStreamServer(self.socket_path, Handler)
+        except OSError as e:
+            raise DaemonError(f"Unable to listen on {self.socket_path}: {e}") from e
+        finally:
+            os.umask(old_umask)
+        self._server.timeout = POLL_INTERVAL
+        # Commands run through the daemon read their configuration from the cache.
+        self._read_config = cli.read_config
+        cli.read_config = self.config_cache.read
+        logger.info("Listening on %s", self.socket_path)
+
+    def serve(self, stop_event: Optional[threading.Event] = None) -> None:
+        """
+        Start the daemon if needed and serve until stopped.
+
+        The daemon stops when ``stop_event`` is set, after ``idle_timeout`` seconds
+        without a request, or on SIGTERM; the socket is removed when it does.
+
+        Args:
+            stop_event (Optional[threading.Event]): Event that stops the daemon.
+
+        Raises:
+            DaemonError: If the daemon cannot start.
+        """
+        stop_event = stop_event or threading.Event()
+        if self._server is None:
+            self.start()
+        previous_handler = None
+        if threading.current_thread() is threading.main_thread():
+            previous_handler = signal.signal(signal.SIGTERM, _terminate)
+        try:
+            last_request = time.monotonic()
+            handled = self.requests
+            while not stop_event.is_set():
+                self._server.handle_request()
+                if self.requests != handled:
+                    handled = self.requests
+                    last_request = time.monotonic()
+                elif (self.idle_timeout is not None
+                      and time.monotonic() - last_request >= self.idle_timeout):
+                    logger.info("No request for %.0f seconds, stopping", self.idle_timeout)
+                    break
+        finally:
+            if previous_handler is not None:
+                signal.signal(signal.SIGTERM, previous_handler)
+            self.close()
+
+    def close(self) -> None:
+        """Stop listening and remove the socket."""
+        if self._server is None:
+            return
+        self._server.server_close()
+        self._server = None
+        cli.read_config = self._read_config
+        try:
+            os.remove(self.socket_path)
+        except OSError:
+            pass
+        logger.info("Stopped after %d request(s)", self.requests)
+
+    def execute(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run one forwarded invocation.
+
+        Args:
+            request (Dict[str, Any]): The request: ``argv``, and optionally ``cwd``,
+                ``env`` and ``stdin``.
+
+        Returns:
+            Dict[str, Any]: The exit ``status`` with the captured ``stdout`` (base64) and
+                ``stderr``.
+        """
+        argv = request.get('argv')
+        if not isinstance(argv, list) or not all(isinstance(arg, str) for arg in argv):
+            return {'status': 2, 'stdout': '', 'stderr': "Error: invalid request\n"}
+        try:
+            stdin = base64.b64decode(request.get('stdin') or '', validate=True)
+        except (binascii.Error, TypeError):
+            return {'status': 2, 'stdout': '', 'stderr': "Error: invalid request\n"}
+        status = 0
+        with _client_context(request, stdin) as (output, stderr):
+            try:
+                args = cli.create_parser().parse_args(argv)
+                if not cli.daemon_can_run(args):
+                    print(f"Error: {args.command} cannot run through the daemon", file=sys.stderr)
+                    status = 2
+                else:
+                    cli.main(argv)
+            except SystemExit as e:
+                status = _exit_status(e)
+            except Exception as e:
+                print(f"An unexpected error occurred: {e}", file=sys.stderr)
+                status = 1
+            output.flush()
+            stdout = output.buffer.getvalue()
+        return {'status': status, 'stdout': base64.b64encode(stdout).decode('ascii'),
+                'stderr': stderr.getvalue()}
+
+    def _handle(self, rfile, wfile) -> None:
+        data = rfile.read()
+        if not data:
+            # A connection closed without a request: another daemon checking the socket.
+            return
+        self.requests += 1
+        started = time.perf_counter()
+        request = None
+        try:
+            request = json.loads(data.decode('utf-8'))
+            if not isinstance(request, dict):
+                raise ValueError("request is not an object")
+        except ValueError as e:
+            logger.warning("Ignoring malformed request: %s", e)
+            response = {'status': 2, 'stdout': '', 'stderr': f"Error: malformed request: {e}\n"}
+        else:
+            response = self.execute(request)
+        try:
+            wfile.write(json.dumps(response).encode('utf-8'))
+        except OSError as e:
+            logger.warning("Client went away before the response: %s", e)
+        logger.debug("Request %d (%s) finished with status %d in %.3fs", self.requests,
+                     ' '.join(request.get('argv', [])) if isinstance(request, dict) else '?',
+                     response['status'], time.perf_counter() - started)
+
+@contextlib.contextmanager
+def _client_context(request: Dict[str, Any],
+                    stdin: bytes) -> Iterator[Tuple[io.TextIOWrapper, io.StringIO]]:
+    """
+    Run the block like a fresh process of the client would.
+
+    The working directory, ``SEGMENTED_*`` environment variables and standard
+    streams are the client's, stdin and stdout holding raw bytes; log output goes
+    to the captured stderr; logger levels changed by the command (e.g. by ``-v``)
+    are restored afterwards.
+    """
+    stdout, stderr = io.TextIOWrapper(io.BytesIO(), encoding='utf-8'), io.StringIO()
+    saved_streams = sys.stdin, sys.stdout, sys.stderr
+    saved_cwd = os.getcwd()
+    saved_env = {name: value for name, value in os.environ.items() if name.startswith('SEGMENTED_')}
+    loggers = [logging.getLogger()] + [item for item in logging.Logger.manager.loggerDict.values()
+                                       if isinstance(item, logging.Logger)]
+    saved_levels = [(item, item.level) for item in loggers]
+    saved_levels += [(handler, handler.level) for item in loggers for handler in item.handlers]
+    real_stderr = sys.stderr
+    try:
+        os.chdir(request.get('cwd') or saved_cwd)
+        for name in saved_env:
+            del os.environ[name]
+        os.environ.update({name: str(value) for name, value in (request.get('env') or {}).items()
+                           if name.startswith('SEGMENTED_')})
+        sys.stdin = io.TextIOWrapper(io.BytesIO(stdin), encoding='utf-8')
+        sys.stdout, sys.stderr = stdout, stderr
+        _redirect_log_handlers(real_stderr, stderr)
+        yield stdout, stderr
+    finally:
+        # Loggers created during the request picked up the captured stream too.
+        _redirect_log_handlers(stderr, real_stderr)
+        sys.stdin, sys.stdout, sys.stderr = saved_streams
+        for item, level in saved_levels:
+            item.setLevel(level)
+        for name in [name for name in os.environ if name.startswith('SEGMENTED_')]:
+            del os.environ[name]
+        os.environ.update(saved_env)
+        os.chdir(saved_cwd)
+
+def _redirect_log_handlers(old: Any, new: Any) -> None:
+    """Point every logging stream handler writing to ``old`` at ``new``."""
+    for item in [logging.getLogger()] + list(logging.Logger.manager.loggerDict.values()):
+        for handler in getattr(item, 'handlers', ()):
+            if isinstance(handler, logging.StreamHandler) and handler.stream is old:
+                handler.setStream(new)
+
+def _exit_status(exit: SystemExit) -> int:
+    if exit.code is None:
+        return 0
+    if isinstance(exit.code, int):
+        return exit.code
+    print(exit.code, file=sys.stderr)
+    return 1
+
+def _private_directory(directory: str) -> None:
+    """
+    Make sure no other user controls the directory the socket is created in.
+
+    A missing directory is created with mode 0700. An existing one must belong to
+    the current user, or to root (like a sticky ``/tmp`` given explicitly).
+
+    Raises:
+        DaemonError: If the directory cannot be created or belongs to another user.
+    """
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        owner = os.stat(directory).st_uid
+    except OSError as e:
+        raise DaemonError(f"Unable to create the socket directory {directory}: {e}") from e
+    if owner not in (os.getuid(), 0):
+        raise DaemonError(f"The socket directory {directory} belongs to another user")
+
+def _remove_stale_socket(path: str) -> None:
+    """
+    Remove a socket left behind by a daemon that is gone.
+
+    Raises:
+        DaemonError: If a daemon still answers on the socket, or the path is not a socket.
+    """
+    if not os.path.lexists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        pass
+    else:
+        raise DaemonError(f"A daemon is already listening on {path}")
+    finally:
+        probe.close()
+    if not stat.S_ISSOCK(os.lstat(path).st_mode):
+        raise DaemonError(f"{path} exists and is not a socket")
+    os.remove(path)
+
+def _terminate(signum, frame) -> None:
+    raise KeyboardInterrupt
+
+__version__ = '0.1.0'
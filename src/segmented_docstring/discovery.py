@@ -0,0 +1,393 @@
+"""
+discovery.py
+
+This module finds the files to split or combine in a directory tree.
+
+Directories are read with ``os.scandir``, one listing each: bare code files are
+paired with their docstring files from the same listing, without a ``stat`` per
+file. Version control, cache and virtual environment directories, and anything
+matched by a ``.gitignore`` file or a configured exclude pattern, are pruned
+before they are descended into. When splitting, the outputs of earlier splits
+are skipped, so they are never split again. :class:`IgnoreMatcher` applies the
+same rules to single paths, such as those of filesystem notifications.
+"""
+
+import os
+import re
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from colored_custom_logger import CustomLogger
+
+logger = CustomLogger.get_logger("discovery")
+
+# Directories that never hold sources to process.
+EXCLUDED_DIRECTORIES = frozenset((
+    '.git', '.hg', '.svn', '.tox', '.nox', '.venv', 'venv', 'node_modules', '__pycache__',
+    '.mypy_cache', '.pytest_cache', '.eggs',
+))
+# A directory holding this file is a virtual environment, whatever its name.
+VENV_MARKER = 'pyvenv.cfg'
+IGNORE_FILE = '.gitignore'
+# How outputs are placed under the output directory: all in the output directory
+# itself, or in the same relative directories as their inputs.
+LAYOUTS = ('flat', 'mirror')
+
+class IgnoreRules:
+    """
+    Patterns in ``.gitignore`` syntax, relative to one directory.
+
+    Supported: comments, ``!`` negation, a trailing ``/`` for directories only,
+    patterns anchored by a ``/``, ``*``, ``?``, ``[...]`` and ``**``.
+    """
+
+    def __init__(self, patterns: Iterable[str], base: str = ''):
+        """
+        Args:
+            patterns (Iterable[str]): Lines of a ``.gitignore`` file, or exclude patterns.
+            base (str): Directory the patterns are relative to, as a ``/``-separated path
+                relative to the root of the walk's rules ('' for the root itself).
+        """
+        self.base = base
+        self.rules: List[Tuple[re.Pattern, bool, bool, bool]] = []
+        for line in patterns:
+            rule = _compile_rule(line)
+            if rule is not None:
+                self.rules.append(rule)
+
+    @classmethod
+    def from_file(cls, path: str, base: str = '') -> 'IgnoreRules':
+        """Load the rules of an ignore file; an unreadable file yields no rules."""
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                return cls(f.read().splitlines(), base)
+        except OSError as e:
+            logger.warning("Unable to read %s: %s", path, e)
+            return cls((), base)
+
+    def match(self, path: str, is_dir: bool) -> Optional[bool]:
+        """
+        Check a path against the rules.
+
+        Args:
+            path (str): ``/``-separated path relative to the root of the walk's rules.
+            is_dir (bool): Whether the path is a directory.
+
+        Returns:
+            Optional[bool]: True if the last matching rule ignores the path, False if it
+                re-includes it, None if no rule matches.
+        """
+        if self.base:
+            if not path.startswith(self.base + '/'):
+                return None
+            path = path[len(self.base) + 1:]
+        name = path.rpartition('/')[2]
+        result = None
+        for regex, negated, directory_only, anchored in self.rules:
+            if directory_only and not is_dir:
+                continue
+            if regex.match(path if anchored else name):
+                result = not negated
+        return result
+
+class IgnoreMatcher:
+    """
+    Decide whether single paths under a directory are ignored, as a walk of it would.
+
+    The ``.gitignore`` files between the directory and a path are read on every
+    check, so edits to them take effect at once.
+    """
+
+    def __init__(self, directory: str, config: dict, excludes: Sequence[str] = ()):
+        """
+        Args:
+            directory (str): The directory the paths are under.
+            config (dict): Configuration dictionary, for the ``exclude`` patterns.
+            excludes (Sequence[str]): More patterns to exclude, in ``.gitignore`` syntax,
+                relative to ``directory``.
+        """
+        self.directory = os.path.abspath(directory)
+        self.prefix, self.rules = _ancestor_rules(directory)
+        self.exclude_rules = _exclude_rules(config, excludes, self.prefix)
+
+    def is_ignored(self, path: str, is_dir: bool = False) -> bool:
+        """
+        Check whether a path, or any directory above it, would be skipped by a walk.
+
+        Args:
+            path (str): The path to check; it need not exist.
+            is_dir (bool): Whether the path is a directory.
+
+        Returns:
+            bool: True if the path is ignored or lies outside the directory.
+        """
+        relative_path = os.path.relpath(os.path.abspath(path), self.directory)
+        if relative_path == os.curdir:
+            return False
+        parts = relative_path.split(os.sep)
+        if parts[0] == os.pardir:
+            return True
+        folder, relative, rules = self.directory, self.prefix, self.rules
+        for index, name in enumerate(parts):
+            entry_is_dir = is_dir or index < len(parts) - 1
+            rules = _with_ignore_file(rules, folder, relative)
+            if entry_is_dir and name in EXCLUDED_DIRECTORIES:
+                return True
+            relative = f"{relative}/{name}" if relative else name
+            active = rules + [self.exclude_rules] if self.exclude_rules is not None else rules
+            if _is_ignored(active, relative, entry_is_dir):
+                return True
+            folder = os.path.join(folder, name)
+            if entry_is_dir and os.path.exists(os.path.join(folder, VENV_MARKER)):
+                return True
+        return False
+
+def find_sources(directory: str, config: dict, recursive: bool = True,
+                 excludes: Sequence[str] = ()) -> Iterator[str]:
+    """
+    Find the Python files to split in a directory.
+
+    Files ending in the configured bare code or docstring extension are outputs
+    of earlier splits and are skipped.
+
+    Args:
+        directory (str): Directory to search.
+        config (dict): Configuration dictionary, for the output extensions and the
+            ``exclude`` patterns.
+        recursive (bool): Whether to search subdirectories.
+        excludes (Sequence[str]): More patterns to exclude, in ``.gitignore`` syntax,
+            relative to ``directory``.
+
+    Yields:
+        str: Paths of the Python files, directory by directory, sorted by name.
+    """
+    outputs = (config['barecode_extension'], config['docstring_extension'])
+    for _, names in _walk(directory, config, recursive, excludes):
+        for path, name in names:
+            if name.endswith('.py') and not name.endswith(outputs):
+                yield path
+
+def find_pairs(directory: str, config: dict, recursive: bool = True,
+               excludes: Sequence[str] = ()) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Find the bare code files to combine in a directory, paired with their docstring files.
+
+    Args:
+        directory (str): Directory to search.
+        config (dict): Configuration dictionary, for the file extensions and the
+            ``exclude`` patterns.
+        recursive (bool): Whether to search subdirectories.
+        excludes (Sequence[str]): More patterns to exclude, in ``.gitignore`` syntax,
+            relative to ``directory``.
+
+    Yields:
+        Tuple[str, Optional[str]]: Each bare code path with the path of its docstring
+            file, or None if there is none.
+    """
+    barecode_extension = config['barecode_extension']
+    docstring_extension = config['docstring_extension']
+    for folder, names in _walk(directory, config, recursive, excludes):
+        listed = {name for _, name in names}
+        for path, name in names:
+            if name.endswith(barecode_extension):
+                docstring_name = name[:-len(barecode_extension)] + docstring_extension
+                if docstring_name in listed:
+                    yield path, os.path.join(folder, docstring_name)
+                else:
+                    yield path, None
+
+def output_directory_for(path: str, source_directory: str, output_directory: str,
+                         layout: str = 'flat') -> str:
+    """
+    Return the directory the outputs of a file found under ``source_directory`` go to.
+
+    Args:
+        path (str): The input file.
+        source_directory (str): The directory that was searched.
+        output_directory (str): The output directory.
+        layout (str): ``'flat'`` to put every output in ``output_directory``, or
+            ``'mirror'`` to recreate the file's directory relative to ``source_directory``.
+
+    Returns:
+        str: The directory to write the outputs to.
+
+    Raises:
+        ValueError: If the layout is unknown.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown output layout: {layout}")
+    if layout == 'flat':
+        return output_directory
+    relative = os.path.relpath(os.path.dirname(path) or os.curdir, source_directory)
+    return output_directory if relative == os.curdir else os.path.join(output_directory, relative)
+
+def _walk(directory: str, config: dict, recursive: bool,
+          excludes: Sequence[str]) -> Iterator[Tuple[str, List[Tuple[str, str]]]]:
+    """
+    Yield each directory with its files that are not ignored, as ``(path, name)`` pairs.
+
+    Rules from ``.gitignore`` files above ``directory`` (up to the enclosing
+    repository's root) apply as well as those inside it.
+    """
+    prefix, rules = _ancestor_rules(directory)
+    exclude_rules = _exclude_rules(config, excludes, prefix)
+
+    pending = [(directory, prefix, rules)]
+    while pending:
+        folder, relative, rules = pending.pop()
+        try:
+            with os.scandir(folder) as listing:
+                entries = sorted(listing, key=lambda entry: entry.name)
+        except OSError as e:
+            logger.warning("Unable to list %s: %s", folder, e)
+            continue
+        names = {entry.name for entry in entries}
+        if VENV_MARKER in names and folder != directory:
+            logger.debug("Skipping virtual environment: %s", folder)
+            continue
+        if IGNORE_FILE in names:
+            rules = _with_ignore_file(rules, folder, relative)
+        active = rules + [exclude_rules] if exclude_rules is not None else rules
+
+        files = []
+        subdirectories = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if not is_dir and not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            if is_dir and (not recursive or entry.name in EXCLUDED_DIRECTORIES):
+                continue
+            path = f"{relative}/{entry.name}" if relative else entry.name
+            if _is_ignored(active, path, is_dir):
+                continue
+            if is_dir:
+                subdirectories.append((entry.path, path, rules))
+            else:
+                files.append((entry.path, entry.name))
+        yield folder, files
+        # Reversed so that subdirectories are visited in name order.
+        pending.extend(reversed(subdirectories))
+
+def _exclude_rules(config: dict, excludes: Sequence[str], prefix: str) -> Optional[IgnoreRules]:
+    """Return the configured and given exclude patterns as rules, or None if there are none."""
+    configured = config.get('exclude') or ()
+    if isinstance(configured, str):
+        configured = [configured]
+    patterns = list(configured) + list(excludes)
+    return IgnoreRules(patterns, prefix) if patterns else None
+
+def _with_ignore_file(rules: List[IgnoreRules], folder: str, relative: str) -> List[IgnoreRules]:
+    """Add the rules of ``folder``'s ignore file, if it has one, to those of its parents."""
+    ignore_file = os.path.join(folder, IGNORE_FILE)
+    if not os.path.isfile(ignore_file):
+        return rules
+    return rules + [IgnoreRules.from_file(ignore_file, relative)]
+
+def _is_ignored(rules: Sequence[IgnoreRules], path: str, is_dir: bool) -> bool:
+    """Apply rule sets in order; the last one that matches decides."""
+    ignored = False
+    for ruleset in rules:
+        result = ruleset.match(path, is_dir)
+        if result is not None:
+            ignored = result
+    return ignored
+
+def _ancestor_rules(directory: str) -> Tuple[str, List[IgnoreRules]]:
+    """
+    Load the ``.gitignore`` files of the directories above ``directory``.
+
+    Returns:
+        Tuple[str, List[IgnoreRules]]: The path of ``directory`` relative to the root of
+            the enclosing repository ('' when it is the root or not in a repository),
+            and the rules of the ancestors' ignore files, outermost first.
+    """
+    start = os.path.abspath(directory)
+    ancestors = []
+    current = start
+    while True:
+        if os.path.exists(os.path.join(current, '.git')):
+            break
+        parent = os.path.dirname(current)
+        if parent == current:
+            # Not in a repository: only ignore files inside the directory apply.
+            return '', []
+        ancestors.append(current)
+        current = parent
+    root = current
+    rules = []
+    for folder in [root] + ancestors[:0:-1]:
+        ignore_file = os.path.join(folder, IGNORE_FILE)
+        if os.path.isfile(ignore_file):
+            rules.append(IgnoreRules.from_file(ignore_file, _relative(folder, root)))
+    return _relative(start, root), rules
+
+def _relative(path: str, root: str) -> str:
+    relative = os.path.relpath(path, root)
+    return '' if relative == '.' else relative.replace(os.sep, '/')
+
+def _compile_rule(line: str) -> Optional[Tuple[re.Pattern, bool, bool, bool]]:
+    """Compile one ``.gitignore`` line into ``(regex, negated, directory_only, anchored)``."""
+    if line.endswith('\n'):
+        line = line[:-1]
+    # Trailing spaces are ignored unless escaped.
+    stripped = line.rstrip(' ')
+    if stripped.endswith('\\') and len(stripped) < len(line):
+        stripped += ' '
+    line = stripped
+    if not line or line.startswith('#'):
+        return None
+    negated = line.startswith('!')
+    if negated:
+        line = line[1:]
+    elif line.startswith('\\'):
+        line = line[1:]
+    directory_only = line.endswith('/')
+    line = line.rstrip('/')
+    if not line:
+        return None
+    anchored = '/' in line
+    line = line.lstrip('/')
+    return re.compile(_translate(line) + r'\Z', re.DOTALL), negated, directory_only, anchored
+
+def _translate(pattern: str) -> str:
+    """Translate a ``.gitignore`` glob into a regular expression."""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**/', i):
+                out.append('(?:.*/)?')
+                i += 3
+                continue
+            if pattern.startswith('**', i) and (i + 2 == n) and (i == 0 or pattern[i - 1] == '/'):
+                out.append('.*')
+                i += 2
+                continue
+            while i + 1 < n and pattern[i + 1] == '*':
+                i += 1
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            skip = 2 if pattern.startswith('[!', i) or pattern.startswith('[]', i) else 1
+            end = pattern.find(']', i + skip)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+__version__ = '0.1.0'
@@ -0,0 +1,284 @@
+"""
+gitfilter.py
+
+This module implements a git filter driver using git's long-running
+``filter.<driver>.process`` protocol, so that a single process splits and
+combines every file git checks out or stages.
+
+On ``clean`` (working tree to repository) the docstrings of a file are moved
+into its docstring sidecar next to it in the working tree and the bare code is
+handed to git. On ``smudge`` (repository to working tree) the bare code is
+combined with the sidecar so the working tree holds complete source files.
+"""
+
+import posixpath
+import subprocess
+from typing import BinaryIO, Dict, List, Optional
+
+from colored_custom_logger import CustomLogger
+from .combiner import combine_bytes, CombinerError
+from .parsecache import enable_shared_cache
+from .splitter import split_bytes, SplitterError
+from .writer import write_file
+
+logger = CustomLogger.get_logger("gitfilter")
+
+FLUSH = b'0000'
+MAX_PACKET_DATA = 65516
+
+class GitFilterError(Exception):
+    """Raised when the git filter protocol is violated."""
+    pass
+
+class PktLineStream:
+    """
+    Reader and writer for git's pkt-line framing.
+
+    Each packet is a four digit hex length (including those four bytes)
+    followed by the payload; ``0000`` is a flush packet that ends a list.
+    """
+
+    def __init__(self, reader: BinaryIO, writer: BinaryIO):
+        self.reader = reader
+        self.writer = writer
+
+    def read_packet(self) -> Optional[bytes]:
+        """
+        Read one packet.
+
+        Returns:
+            Optional[bytes]: The payload, or None for a flush packet.
+
+        Raises:
+            EOFError: If the stream ends before a packet starts.
+            GitFilterError: If the stream ends mid-packet or the header is invalid.
+        """
+        header = self.reader.read(4)
+        if not header:
+            raise EOFError("git closed the filter stream")
+        if len(header) != 4:
+            raise GitFilterError("Truncated pkt-line header")
+        try:
+            length = int(header, 16)
+        except ValueError as e:
+            raise GitFilterError(f"Invalid pkt-line header: {header!r}") from e
+        if length == 0:
+            return None
+        if length < 4:
+            raise GitFilterError(f"Invalid pkt-line length: {length}")
+        payload = self.reader.read(length - 4)
+        if len(payload) != length - 4:
+            raise GitFilterError("Truncated pkt-line payload")
+        return payload
+
+    def read_text_list(self) -> List[str]:
+        """Read text packets up to the next flush, without trailing newlines."""
+        lines = []
+        while True:
+            packet = self.read_packet()
+            if packet is None:
+                return lines
+            lines.append(packet.decode('utf-8').rstrip('\n'))
+
+    def read_content(self) -> bytes:
+        """Read binary packets up to the next flush and join them."""
+        chunks = []
+        while True:
+            packet = self.read_packet()
+            if packet is None:
+                return b''.join(chunks)
+            chunks.append(packet)
+
+    def write_packet(self, payload: bytes) -> None:
+        self.writer.write(b'%04x' % (len(payload) + 4))
+        self.writer.write(payload)
+
+    def write_text_list(self, lines: List[str]) -> None:
+        """Write text packets followed by a flush."""
+        for line in lines:
+            self.write_packet(f"{line}\n".encode('utf-8'))
+        self.write_flush()
+
+    def write_content(self, content: bytes) -> None:
+        """Write content as packets of the maximum size, followed by a flush."""
+        for start in range(0, len(content), MAX_PACKET_DATA):
+            self.write_packet(content[start:start + MAX_PACKET_DATA])
+        self.write_flush()
+
+    def write_flush(self) -> None:
+        self.writer.write(FLUSH)
+        self.writer.flush()
+
+class GitFilter:
+    """
+    A long-running git filter process that splits on clean and combines on smudge.
+    """
+
+    def __init__(self, config: dict, reader: BinaryIO, writer: BinaryIO):
+        """
+        Args:
+            config (dict): Configuration dictionary.
+            reader (BinaryIO): Stream git writes requests to (our stdin).
+            writer (BinaryIO): Stream git reads responses from (our stdout).
+        """
+        self.docstring_extension = config['docstring_extension']
+        self.stream = PktLineStream(reader, writer)
+        self._cat_file: Optional[subprocess.Popen] = None
+
+    def run(self) -> None:
+        """
+        Perform the protocol handshake and serve requests until git closes the stream.
+
+        Raises:
+            GitFilterError: If git speaks an unsupported protocol.
+        """
+        try:
+            self._handshake()
+            while True:
+                try:
+                    metadata = self._read_metadata()
+                except EOFError:
+                    return
+                self._handle(metadata)
+        finally:
+            if self._cat_file is not None:
+                self._cat_file.stdin.close()
+                self._cat_file.wait()
+
+    def _handshake(self) -> None:
+        welcome = self.stream.read_text_list()
+        if not welcome or welcome[0] != 'git-filter-client' or 'version=2' not in welcome[1:]:
+            raise GitFilterError(f"Unsupported git filter handshake: {welcome}")
+        self.stream.write_text_list(['git-filter-server', 'version=2'])
+
+        capabilities = self.stream.read_text_list()
+        supported = [c for c in ('capability=clean', 'capability=smudge') if c in capabilities]
+        self.stream.write_text_list(supported)
+        logger.debug("Git filter negotiated: %s", supported)
+
+    def _read_metadata(self) -> Dict[str, str]:
+        metadata = {}
+        for line in self.stream.read_text_list():
+            key, _, value = line.partition('=')
+            metadata[key] = value
+        return metadata
+
+    def _handle(self, metadata: Dict[str, str]) -> None:
+        command = metadata.get('command')
+        pathname = metadata.get('pathname', '')
+        content = self.stream.read_content()
+
+        try:
+            if pathname.endswith(self.docstring_extension):
+                result = content
+            elif command == 'clean':
+                result = self.clean(pathname, content)
+            elif command == 'smudge':
+                result = self.smudge(pathname, content, metadata)
+            else:
+                raise GitFilterError(f"Unsupported git filter command: {command}")
+        except (GitFilterError, SplitterError, CombinerError, OSError, UnicodeDecodeError) as e:
+            logger.error("Git filter %s failed for %s: %s", command, pathname, e)
+            self.stream.write_text_list(['status=error'])
+            return
+
+        self.stream.write_text_list(['status=success'])
+        self.stream.write_content(result)
+        # An empty list keeps the status reported above.
+        self.stream.write_flush()
+
+    def sidecar_path(self, pathname: str) -> str:
+        """
+        Return the repository path of the docstring sidecar for ``pathname``.
+
+        Args:
+            pathname (str): Repository-relative path of a Python file.
+
+        Returns:
+            str: Repository-relative path of its docstring sidecar.
+        """
+        stem = posixpath.splitext(pathname)[0]
+        return f"{stem}{self.docstring_extension}"
+
+    def clean(self, pathname: str, content: bytes) -> bytes:
+        """
+        Split a working tree file, storing its docstrings in the sidecar.
+
+        Args:
+            pathname (str): Repository-relative path of the file.
+            content (bytes): The complete source from the working tree.
+
+        Returns:
+            bytes: The bare code to store in the repository.
+        """
+        barecode, docstrings = split_bytes(content)
+        sidecar = self.sidecar_path(pathname)
+        if write_file(sidecar, docstrings):
+            logger.info("Docstrings saved to: %s", sidecar)
+        return barecode
+
+    def smudge(self, pathname: str, content: bytes, metadata: Dict[str, str]) -> bytes:
+        """
+        Combine bare code from the repository with its sidecar.
+
+        The sidecar is read from the working tree if it is already checked out,
+        and otherwise from the tree being checked out (or the index).
+
+        Args:
+            pathname (str): Repository-relative path of the file.
+            content (bytes): The bare code from the repository.
+            metadata (Dict[str, str]): Request metadata sent by git.
+
+        Returns:
+            bytes: The complete source for the working tree.
+        """
+        sidecar = self.sidecar_path(pathname)
+        try:
+            with open(sidecar, 'r', encoding='utf-8') as f:
+                docstrings = f.read()
+        except FileNotFoundError:
+            treeish = metadata.get('treeish', '')
+            blob = self._read_object(f"{treeish}:{sidecar}")
+            if blob is None:
+                logger.debug("No docstring sidecar for %s", pathname)
+                return content
+            docstrings = blob.decode('utf-8')
+        return combine_bytes(content, docstrings)
+
+    def _read_object(self, name: str) -> Optional[bytes]:
+        """
+        Read an object from the repository through one persistent ``git cat-file`` process.
+
+        Args:
+            name (str): An object name such as ``HEAD:path`` or ``:path``.
+
+        Returns:
+            Optional[bytes]: The object contents, or None if it does not exist.
+        """
+        if self._cat_file is None:
+            self._cat_file = subprocess.Popen(['git', 'cat-file', '--batch'],
+                                              stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        process = self._cat_file
+        process.stdin.write(name.encode('utf-8') + b'\n')
+        process.stdin.flush()
+        header = process.stdout.readline().split()
+        if len(header) != 3:
+            return None
+        size = int(header[2])
+        data = process.stdout.read(size)
+        process.stdout.read(1)  # Trailing newline after the object contents.
+        return data
+
+def run_git_filter(config: dict, reader: BinaryIO, writer: BinaryIO) -> None:
+    """
+    Serve git's long-running filter protocol until git closes the stream.
+
+    Args:
+        config (dict): Configuration dictionary.
+        reader (BinaryIO): Stream git writes requests to.
+        writer (BinaryIO): Stream git reads responses from.
+    """
+    enable_shared_cache()
+    GitFilter(config, reader, writer).run()
+
+__version__ = '0.1.0'
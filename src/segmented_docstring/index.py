@@ -0,0 +1,404 @@
+"""
+index.py
+
+This module maintains a search index of the docstrings held in docstring
+sidecars, so that docstrings can be looked up by qualified name or by the words
+they contain without reading every sidecar again.
+
+The index is one gzip-compressed JSON file holding a table of the indexed
+sidecars (with the ``stat`` fingerprint they were read at), a table of their
+docstrings, and an inverted index from each token to the docstrings containing
+it. Postings are stored as sorted, delta-encoded lists and only decoded for the
+tokens of a query. Updating the index re-reads only the sidecars whose
+fingerprint changed.
+"""
+
+import gzip
+import json
+import os
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from colored_custom_logger import CustomLogger
+from .sidecar import SidecarError, loads as load_sidecar
+
+logger = CustomLogger.get_logger("index")
+
+INDEX_FILE_NAME = '.segmented-index'
+INDEX_FORMAT = 'segmented-docstring-index'
+INDEX_VERSION = 1
+# Words are runs of letters and digits, so ``split_file`` and ``Client.fetch``
+# are found by each of their parts. Single characters are not indexed.
+TOKEN_PATTERN = re.compile(r'[^\W_]{2,}')
+
+class SearchIndexError(Exception):
+    """Raised when an index cannot be read or written."""
+    pass
+
+class IndexedDocstring(NamedTuple):
+    """One docstring in the index; ``line`` is where it belongs in the bare code file."""
+    path: str
+    qualname: str
+    kind: Optional[str]
+    line: Optional[int]
+    docstring: str
+
+class IndexedFile(NamedTuple):
+    """The docstrings read from one sidecar, with the fingerprint it was read at."""
+    sidecar: str
+    barecode: str
+    mtime_ns: int
+    size: int
+    entries: List[Tuple[str, Optional[str], Optional[int], str]]
+    tokens: List[List[str]]
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase index tokens.
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        List[str]: The tokens, in order of appearance, with repetitions.
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+def read_sidecar(sidecar_path: str, barecode_path: str) -> IndexedFile:
+    """
+    Read the docstrings of a sidecar and tokenize them for the index.
+
+    Definitions without a docstring are left out. Legacy sidecars, which do not
+    record line numbers or kinds, are indexed by name only.
+
+    Args:
+        sidecar_path (str): Path to the docstring sidecar.
+        barecode_path (str): Path to the matching bare code file, reported by searches.
+
+    Returns:
+        IndexedFile: The sidecar's docstrings and the tokens of each.
+
+    Raises:
+        SearchIndexError: If the sidecar cannot be read or parsed.
+    """
+    try:
+        info = os.stat(sidecar_path)
+        with open(sidecar_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        loaded = load_sidecar(text)
+    except (OSError, UnicodeDecodeError, SidecarError) as e:
+        raise SearchIndexError(f"Unable to index {sidecar_path}: {e}") from e
+
+    if isinstance(loaded, dict):
+        entries = [(str(name), None, None, docstring) for name, docstring in loaded.items()
+                   if isinstance(docstring, str)]
+    else:
+        entries = [(entry.qualname, entry.kind, entry.line, entry.docstring) for entry in loaded
+                   if entry.docstring is not None]
+    tokens = [sorted(set(tokenize(qualname)) | set(tokenize(docstring)))
+              for qualname, _, _, docstring in entries]
+    return IndexedFile(sidecar_path, barecode_path, info.st_mtime_ns, info.st_size, entries, tokens)
+
+class DocstringIndex:
+    """
+    An on-disk inverted index of docstrings, updated incrementally.
+
+    Paths are stored relative to the directory holding the index file, so an
+    index can be moved together with the tree it describes.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): The index file; it is only read by :meth:`load` and written by :meth:`save`.
+        """
+        self.path = path
+        self.root = os.path.dirname(os.path.abspath(path))
+        # Sidecar path -> [bare code path, mtime_ns, size, docstring ids].
+        self.files: Dict[str, list] = {}
+        self.docs: List[Optional[IndexedDocstring]] = []
+        self._encoded: Dict[str, List[int]] = {}
+        self._postings: Dict[str, List[int]] = {}
+        self._names: Optional[Dict[str, List[int]]] = None
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path: str) -> 'DocstringIndex':
+        """
+        Load an index file, or start an empty index if it does not exist.
+
+        Args:
+            path (str): The index file.
+
+        Returns:
+            DocstringIndex: The loaded index.
+
+        Raises:
+            SearchIndexError: If the file exists but is not a readable index.
+        """
+        index = cls(path)
+        if not os.path.exists(path):
+            return index
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, EOFError, ValueError) as e:
+            raise SearchIndexError(f"Unreadable index {path}: {e}") from e
+        if not isinstance(data, dict) or data.get('format') != INDEX_FORMAT:
+            raise SearchIndexError(f"{path} is not a docstring index")
+        if data.get('version') != INDEX_VERSION:
+            raise SearchIndexError(f"Unsupported index version in {path}: {data.get('version')}")
+
+        files = data['files']
+        for sidecar, barecode, mtime_ns, size in files:
+            index.files[sidecar] = [barecode, mtime_ns, size, []]
+        for doc_id, (file_id, qualname, kind, line, docstring) in enumerate(data['docs']):
+            sidecar, barecode = files[file_id][:2]
+            index.files[sidecar][3].append(doc_id)
+            index.docs.append(IndexedDocstring(barecode, qualname, kind, line, docstring))
+        index._encoded = data['tokens']
+        logger.debug("Loaded %d docstrings from %d files in %s",
+                     len(index.docs), len(index.files), path)
+        return index
+
+    def __len__(self) -> int:
+        return sum(1 for doc in self.docs if doc is not None)
+
+    def changes(self, sidecars: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """
+        Compare the sidecars found in a tree with the indexed ones.
+
+        Args:
+            sidecars (Iterable[str]): Paths of the sidecars that should be indexed.
+
+        Returns:
+            Tuple[List[str], List[str]]: The paths that are new or changed since they
+                were indexed, and the indexed sidecars that are no longer there.
+        """
+        changed = []
+        seen: Set[str] = set()
+        for path in sidecars:
+            key = self._relative(path)
+            seen.add(key)
+            entry = self.files.get(key)
+            if entry is not None:
+                try:
+                    info = os.stat(path)
+                except OSError:
+                    continue
+                if [info.st_mtime_ns, info.st_size] == entry[1:3]:
+                    continue
+            changed.append(path)
+        removed = [key for key in self.files if key not in seen]
+        return changed, removed
+
+    def add(self, indexed: IndexedFile) -> None:
+        """Index the docstrings of a sidecar, replacing what was indexed for it before."""
+        key = self._relative(indexed.sidecar)
+        self.remove(key)
+        barecode = self._relative(indexed.barecode)
+        doc_ids = []
+        for (qualname, kind, line, docstring), tokens in zip(indexed.entries, indexed.tokens):
+            doc_id = len(self.docs)
+            self.docs.append(IndexedDocstring(barecode, qualname, kind, line, docstring))
+            doc_ids.append(doc_id)
+            for token in tokens:
+                self._decoded(token).append(doc_id)
+        self.files[key] = [barecode, indexed.mtime_ns, indexed.size, doc_ids]
+        self._names = None
+        self._dirty = True
+
+    def remove(self, sidecar: str) -> None:
+        """
+        Drop a sidecar from the index.
+
+        Its docstrings are only marked as removed; their postings are compacted away
+        when the index is saved.
+
+        Args:
+            sidecar (str): The sidecar, relative to the index directory, as returned by
+                :meth:`changes`.
+        """
+        entry = self.files.pop(sidecar, None)
+        if entry is None:
+            return
+        for doc_id in entry[3]:
+            self.docs[doc_id] = None
+        self._names = None
+        self._dirty = True
+
+    def save(self) -> bool:
+        """
+        Write the index if it changed, compacting away removed docstrings.
+
+        The file is written to a temporary file and renamed into place.
+
+        Returns:
+            bool: True if the index was written.
+
+        Raises:
+            SearchIndexError: If the index cannot be written.
+        """
+        if not self._dirty:
+            return False
+        files = []
+        docs = []
+        remap = {}
+        compacted_files: Dict[str, list] = {}
+        compacted_docs: List[Optional[IndexedDocstring]] = []
+        for key, (barecode, mtime_ns, size, doc_ids) in sorted(self.files.items()):
+            new_ids = []
+            for doc_id in doc_ids:
+                doc = self.docs[doc_id]
+                remap[doc_id] = len(docs)
+                new_ids.append(len(docs))
+                docs.append([len(files), doc.qualname, doc.kind, doc.line, doc.docstring])
+                compacted_docs.append(doc)
+            compacted_files[key] = [barecode, mtime_ns, size, new_ids]
+            files.append([key, barecode, mtime_ns, size])
+        tokens = {}
+        for token in sorted(set(self._encoded) | set(self._postings)):
+            doc_ids = sorted(remap[doc_id] for doc_id in self._decoded(token) if doc_id in remap)
+            if doc_ids:
+                tokens[token] = _delta_encode(doc_ids)
+
+        data = json.dumps({'format': INDEX_FORMAT, 'version': INDEX_VERSION, 'files': files,
+                           'docs': docs, 'tokens': tokens},
+                          separators=(',', ':'), ensure_ascii=False)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(gzip.compress(data.encode('utf-8'), mtime=0))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise SearchIndexError(f"Unable to save index {self.path}: {e}") from e
+
+        # Continue from the compacted form, as if it had just been loaded.
+        self.files, self.docs, self._encoded = compacted_files, compacted_docs, tokens
+        self._postings = {}
+        self._names = None
+        self._dirty = False
+        logger.debug("Index saved to: %s", self.path)
+        return True
+
+    def search(self, query: str, limit: Optional[int] = 20,
+               names_only: bool = False) -> List[IndexedDocstring]:
+        """
+        Find docstrings by qualified name and by the words they contain.
+
+        Definitions whose qualified name, or its last part, equals the query come
+        first. Then come docstrings containing every word of the query (in their
+        text or in their qualified name), those with more of the words in their
+        qualified name first.
+
+        Args:
+            query (str): A qualified name, or words to look for.
+            limit (Optional[int]): Maximum number of results; all if None.
+            names_only (bool): Only look up qualified names.
+
+        Returns:
+            List[IndexedDocstring]: The matching docstrings, with paths relative to the
+                current directory.
+        """
+        needle = query.strip().lower()
+        found = list(self._name_matches(needle))
+        if not names_only:
+            words = sorted(set(tokenize(query)))
+            if words:
+                postings = sorted((self._decoded(word) for word in words), key=len)
+                candidates = set(postings[0]).intersection(*postings[1:])
+                seen = set(found)
+                ranked = sorted((doc_id for doc_id in candidates
+                                 if doc_id not in seen and self.docs[doc_id]),
+                                key=lambda doc_id: self._rank(doc_id, words))
+                found.extend(ranked)
+        if limit is not None:
+            found = found[:limit]
+        return [self._present(self.docs[doc_id]) for doc_id in found]
+
+    def _name_matches(self, needle: str) -> List[int]:
+        if self._names is None:
+            names: Dict[str, List[int]] = {}
+            for doc_id, doc in enumerate(self.docs):
+                if doc is None:
+                    continue
+                qualname = doc.qualname.lower()
+                names.setdefault(qualname, []).append(doc_id)
+                last = qualname.rpartition('.')[2]
+                if last != qualname:
+                    names.setdefault(last, []).append(doc_id)
+            self._names = names
+        return sorted(set(self._names.get(needle, ())),
+                      key=lambda doc_id: (self.docs[doc_id].path, self.docs[doc_id].line or 0))
+
+    def _rank(self, doc_id: int, words: Sequence[str]) -> Tuple[int, str, int]:
+        doc = self.docs[doc_id]
+        in_name = set(tokenize(doc.qualname))
+        return -sum(1 for word in words if word in in_name), doc.path, doc.line or 0
+
+    def _decoded(self, token: str) -> List[int]:
+        postings = self._postings.get(token)
+        if postings is None:
+            postings = self._postings[token] = _delta_decode(self._encoded.get(token, ()))
+        return postings
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, '/')
+
+    def _present(self, doc: IndexedDocstring) -> IndexedDocstring:
+        path = os.path.relpath(os.path.join(self.root, doc.path))
+        return doc._replace(path=path)
+
+_opened: Dict[str, Tuple[Tuple[int, int], DocstringIndex]] = {}
+
+def open_index(path: str) -> DocstringIndex:
+    """
+    Load an index for searching, reusing the one loaded before if the file has not changed.
+
+    Long-running processes such as the daemon answer repeated searches without
+    reading the index again.
+
+    Args:
+        path (str): The index file.
+
+    Returns:
+        DocstringIndex: The index. Treat it as read-only.
+
+    Raises:
+        SearchIndexError: If the index does not exist or cannot be read.
+    """
+    key = os.path.abspath(path)
+    try:
+        info = os.stat(key)
+    except OSError as e:
+        raise SearchIndexError(f"No index at {path}: {e.strerror}") from e
+    fingerprint = (info.st_mtime_ns, info.st_size)
+    cached = _opened.get(key)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+    index = DocstringIndex.load(key)
+    _opened.clear()
+    _opened[key] = (fingerprint, index)
+    return index
+
+def _delta_encode(values: Sequence[int]) -> List[int]:
+    previous = 0
+    encoded = []
+    for value in values:
+        encoded.append(value - previous)
+        previous = value
+    return encoded
+
+def _delta_decode(values: Iterable[int]) -> List[int]:
+    total = 0
+    decoded = []
+    for value in values:
+        total += value
+        decoded.append(total)
+    return decoded
+
+__version__ = '0.1.0'
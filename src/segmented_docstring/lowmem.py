@@ -0,0 +1,516 @@
+"""
+lowmem.py
+
+This module implements the low-memory engine behind ``split_file`` and
+``combine_files`` with ``low_memory=True``, for generated modules too large to
+hold several copies of in memory.
+
+Files are memory-mapped and read one line at a time, in the encoding they
+declare and with their own line endings. Docstrings are located with the
+tokenizer instead of a full syntax tree, and the output is streamed to disk in
+chunks, so peak memory stays near the size of the docstrings rather than a
+multiple of the source. The tokenizer accepts sources the parser rejects, so a
+file is parsed once to check its syntax before it is split; the tree is dropped
+at once. A parenthesized docstring such as ``("text")`` is treated as ordinary
+code. Files with lines ending in a lone carriage return are split in memory.
+"""
+
+import ast
+import codecs
+import mmap
+import os
+import re
+import tokenize
+from ast import literal_eval
+from contextlib import contextmanager
+from inspect import cleandoc
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from colored_custom_logger import CustomLogger
+from . import sidecar
+from .profiling import profile_phase
+from .combiner import FileReadError as CombinerReadError, DocstringMismatchError, _combine_bytes
+from .sidecar import (SidecarEntry, SidecarError, loads as load_sidecar, join_statement,
+                      render_docstring, source_newline, with_formatting)
+from .splitter import FileReadError, ParseError, _split_in_memory
+from .writer import write_file, write_files
+
+logger = CustomLogger.get_logger("lowmem")
+
+CHUNK_SIZE = 1 << 16
+# Tokens that carry no statement of their own.
+_SKIPPED_TOKENS = (tokenize.COMMENT, tokenize.NL, tokenize.ENCODING)
+_DEFINITION_KINDS = {'def': 'FunctionDef', 'class': 'ClassDef', 'async': 'AsyncFunctionDef'}
+# A carriage return that does not start a ``\r\n`` line ending.
+_LONE_CARRIAGE_RETURN = re.compile(rb'\r(?!\n)')
+
+Position = Tuple[int, int]
+
+class LineSpan(NamedTuple):
+    """
+    The location of one definition's docstring, as 1-based rows and character columns.
+
+    The fields mirror :class:`~segmented_docstring.spans.DocstringSpan`, except that
+    ``start`` and ``end`` are ``(row, column)`` positions rather than offsets, and
+    ``text`` holds the source between them, for spans with a docstring.
+    """
+    kind: str
+    name: str
+    qualname: str
+    lineno: int
+    indent: int
+    body_indent: int
+    start: Position
+    end: Position
+    docstring: Optional[str]
+    text: Optional[str] = None
+
+class _MappedLines:
+    """
+    Line reader over a memory-mapped file.
+
+    Lines are decoded in the encoding the file declares, without a byte order mark
+    and with their line endings kept. ``data`` is the whole mapped file, ``encoding``
+    its encoding as reported by ``source_encoding`` and ``newline`` the line ending
+    of its first line.
+    """
+
+    def __init__(self, buffer):
+        self.buffer = self.data = buffer
+        try:
+            self.encoding = tokenize.detect_encoding(buffer.readline)[0]
+        except SyntaxError:
+            # An unknown encoding is reported by the syntax check.
+            self.encoding = 'utf-8'
+        self.codec = 'utf-8' if self.encoding == 'utf-8-sig' else self.encoding
+        buffer.seek(0)
+        self.newline = source_newline(buffer.readline())
+        buffer.seek(0)
+
+    def readline(self) -> str:
+        first = self.buffer.tell() == 0
+        line = self.buffer.readline().decode(self.codec)
+        return line[1:] if first and line.startswith('\ufeff') else line
+
+    def rewind(self) -> None:
+        self.buffer.seek(0)
+
+class _EmptyLines:
+    """Line reader for an empty file, which cannot be memory-mapped."""
+
+    data = b''
+    encoding = codec = 'utf-8'
+    newline = '\n'
+
+    def readline(self) -> str:
+        return ''
+
+    def rewind(self) -> None:
+        pass
+
+@contextmanager
+def map_lines(file: BinaryIO):
+    """
+    Memory-map an open file for reading one line at a time.
+
+    Args:
+        file (BinaryIO): A file opened in binary mode.
+
+    Yields:
+        A reader with ``readline()`` and ``rewind()`` methods, and the ``data``,
+        ``encoding`` and ``newline`` of the file.
+    """
+    if os.fstat(file.fileno()).st_size == 0:
+        yield _EmptyLines()
+        return
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        yield _MappedLines(buffer)
+
+def _is_text_literal(token: tokenize.TokenInfo) -> bool:
+    """Whether a STRING token is a plain (not bytes or f-string) literal."""
+    prefix = token.string[:token.string.index(token.string[-1])].lower()
+    return 'b' not in prefix and 'f' not in prefix
+
+def scan_docstring_spans(readline: Callable[[], str]) -> List[LineSpan]:
+    """
+    Locate the docstring of every module, class and function with the tokenizer.
+
+    Args:
+        readline (Callable[[], str]): Returns the next line of source, or ``''`` at the end.
+
+    Returns:
+        List[LineSpan]: One span per definition, in source order.
+
+    Raises:
+        tokenize.TokenError: If the source ends inside a bracket or string.
+        SyntaxError: If the source is inconsistently indented.
+    """
+    lines: Dict[int, str] = {}  # Recently read lines, by row.
+    rows_read = 0
+
+    def read() -> str:
+        nonlocal rows_read
+        line = readline()
+        rows_read += 1
+        lines[rows_read] = line
+        return line
+
+    spans: List[Optional[LineSpan]] = [None]
+    prefixes = ['']             # Qualified name prefix of each open indented block.
+    block_prefix = None         # Prefix for the block opened by the next INDENT.
+    # [kind, name, lineno, indent] while reading a def/class header; the name is ''
+    # after ``async`` until ``def`` confirms it, and None until it has been read.
+    header: Optional[list] = None
+    # The definition awaiting its first statement.
+    opening: Optional[tuple] = (0, 'Module', 'module', 'module', 0, 0)
+    candidate: List[tokenize.TokenInfo] = []    # String tokens that may form a docstring.
+    # A docstring followed by ``;``, whose span ends at the next token.
+    separated: Optional[tuple] = None
+    after_header = False
+    statement_start = True
+    depth = 0
+
+    def close(docstring_tokens: List[tokenize.TokenInfo], first: tokenize.TokenInfo,
+              token: tokenize.TokenInfo) -> None:
+        nonlocal separated
+        slot, kind, name, qualname, lineno, indent = opening
+        row, col = first.start
+        if not docstring_tokens:
+            spans[slot] = LineSpan(kind, name, qualname, lineno, indent, col,
+                                   (row, 0), (row, 0), None)
+            return
+        docstring = cleandoc(literal_eval(' '.join(t.string for t in docstring_tokens)))
+        if token.type == tokenize.OP:
+            # The ``;`` is removed with the docstring, up to the next token, like
+            # ``spans.separator_length`` does; that token may be on a continuation line.
+            separated = (opening, docstring, first)
+            return
+        finish(opening, docstring, first, docstring_tokens[-1].end)
+
+    def finish(definition: tuple, docstring: str, first: tokenize.TokenInfo,
+               position: Position) -> None:
+        slot, kind, name, qualname, lineno, indent = definition
+        (row, col), (end_row, end_col) = first.start, position
+        before = lines[row][:col]
+        after = lines.get(end_row, '')[end_col:]
+        text = ''.join(lines.get(r, '') for r in range(row, end_row + 1))
+        if not before.strip() and not after.strip():
+            start, end = (row, 0), (end_row + 1, 0)
+        else:
+            start, end = (row, col), (end_row, end_col)
+            text = text[col:len(text) - len(after)]
+        spans[slot] = LineSpan(kind, name, qualname, lineno, indent, col, start, end,
+                               docstring, text)
+
+    for token in tokenize.generate_tokens(read):
+        token_type = token.type
+        if separated is not None:
+            finish(*separated, token.start)
+            separated = None
+        if token_type in _SKIPPED_TOKENS:
+            continue
+        if after_header:
+            # A body on the header's own line opens no indented block.
+            after_header = False
+            if token_type != tokenize.NEWLINE:
+                block_prefix = None
+        if candidate:
+            if token_type == tokenize.STRING:
+                candidate.append(token)
+                continue
+            is_docstring = (token_type in (tokenize.NEWLINE, tokenize.ENDMARKER)
+                            or (token_type == tokenize.OP and token.string == ';'))
+            is_docstring = is_docstring and all(_is_text_literal(t) for t in candidate)
+            close(candidate if is_docstring else [], candidate[0], token)
+            candidate = []
+            opening = None
+
+        if token_type == tokenize.INDENT:
+            prefixes.append(prefixes[-1] if block_prefix is None else block_prefix)
+            block_prefix = None
+            continue
+        if token_type == tokenize.DEDENT:
+            prefixes.pop()
+            continue
+        if token_type == tokenize.NEWLINE:
+            statement_start = True
+            for row in [row for row in lines if row < token.start[0]]:
+                del lines[row]
+            continue
+        if token_type == tokenize.ENDMARKER:
+            if opening is not None:
+                slot, kind, name, qualname, lineno, indent = opening
+                spans[slot] = LineSpan(kind, name, qualname, lineno, indent, indent,
+                                       token.start, token.start, None)
+            break
+
+        if opening is not None:
+            if token_type == tokenize.STRING:
+                candidate.append(token)
+                statement_start = False
+                continue
+            close([], token, token)
+            opening = None
+
+        if token_type == tokenize.OP:
+            if token.string in '([{':
+                depth += 1
+            elif token.string in ')]}':
+                depth -= 1
+            elif token.string == ';' and depth == 0:
+                statement_start = True
+                continue
+            elif token.string == ':' and depth == 0 and header is not None and header[1]:
+                kind, name, lineno, indent = header
+                qualname = f"{prefixes[-1]}{name}"
+                opening = (len(spans), kind, name, qualname, lineno, indent)
+                spans.append(None)
+                block_prefix = f"{qualname}."
+                header = None
+                after_header = True
+                statement_start = True
+                continue
+        elif token_type == tokenize.NAME:
+            if statement_start and token.string in _DEFINITION_KINDS:
+                header = [_DEFINITION_KINDS[token.string], '' if token.string == 'async' else None,
+                          token.start[0], token.start[1]]
+            elif header is not None and header[1] == '':
+                # ``async for`` and ``async with`` are not definitions.
+                header = header if token.string == 'def' else None
+                if header is not None:
+                    header[1] = None
+            elif header is not None and header[1] is None:
+                header[1] = token.string
+        statement_start = False
+
+    return [span for span in spans if span is not None]
+
+def barecode_entries(spans: List[LineSpan], newline: str = '\n') -> List[SidecarEntry]:
+    """
+    Build sidecar entries for spans, anchored in the stripped bare code.
+
+    Args:
+        spans (List[LineSpan]): Spans returned by :func:`scan_docstring_spans`.
+        newline (str): The line ending of the source.
+
+    Returns:
+        List[SidecarEntry]: One entry per span, in the same order.
+    """
+    anchors: Dict[int, Tuple[int, int]] = {}
+    removed_lines = 0
+    for index in sorted(range(len(spans)), key=lambda i: spans[i].start):
+        span = spans[index]
+        (start_row, start_col), (end_row, _) = span.start, span.end
+        anchors[index] = (start_row - removed_lines, start_col)
+        removed_lines += end_row - start_row
+    entries = []
+    for i, span in enumerate(spans):
+        line, column = anchors[i]
+        entry = SidecarEntry(span.qualname, span.kind, line, column, span.body_indent,
+                             span.docstring)
+        if span.docstring is not None:
+            entry = with_formatting(entry, span.text, newline)
+        entries.append(entry)
+    return entries
+
+def stripped_chunks(readline: Callable[[], str], spans: List[LineSpan]) -> Iterator[str]:
+    """
+    Stream the source with every docstring span removed.
+
+    Args:
+        readline (Callable[[], str]): Returns the next line of source, or ``''`` at the end.
+        spans (List[LineSpan]): Spans returned by :func:`scan_docstring_spans`.
+
+    Yields:
+        str: Chunks of bare code of about :data:`CHUNK_SIZE` characters.
+    """
+    removals = sorted((span.start, span.end) for span in spans if span.start != span.end)
+    pieces: List[str] = []
+    size = 0
+    index = 0
+    skip_to: Optional[Position] = None
+    row = 0
+    while True:
+        line = readline()
+        if not line:
+            break
+        row += 1
+        if skip_to is not None:
+            if skip_to[0] > row:
+                continue
+            col: Optional[int] = skip_to[1]
+            skip_to = None
+        else:
+            col = 0
+        while index < len(removals) and removals[index][0][0] == row:
+            (_, start_col), end = removals[index]
+            index += 1
+            pieces.append(line[col:start_col])
+            if end[0] == row:
+                col = end[1]
+            else:
+                skip_to, col = end, None
+                break
+        if col is not None:
+            pieces.append(line[col:])
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield ''.join(pieces)
+            pieces, size = [], 0
+    if pieces:
+        yield ''.join(pieces)
+
+def _encoded(chunks: Iterable[str], encoding: str) -> Iterator[bytes]:
+    """Encode text chunks in a source encoding, starting with the byte order mark of utf-8-sig."""
+    codec = 'utf-8' if encoding == 'utf-8-sig' else encoding
+    first = True
+    for chunk in chunks:
+        yield chunk.encode(encoding if first else codec, 'backslashreplace')
+        first = False
+    if first and encoding == 'utf-8-sig':
+        yield codecs.BOM_UTF8
+
+def split_file_streaming(input_file_path: str, barecode_path: str,
+                         docstring_path: str) -> Tuple[List[str], int]:
+    """
+    Split a file into bare code and docstrings without holding it in memory.
+
+    Args:
+        input_file_path (str): Path to the input Python file.
+        barecode_path (str): Path of the bare code output.
+        docstring_path (str): Path of the docstring sidecar output.
+
+    Returns:
+        Tuple[List[str], int]: The output paths that were written (unchanged outputs are
+            skipped) and the number of docstrings found.
+
+    Raises:
+        FileReadError: If the input file cannot be read or decoded.
+        ParseError: If the input is not valid Python.
+        OSError: If the outputs cannot be written.
+    """
+    try:
+        file = open(input_file_path, 'rb')
+    except OSError as e:
+        raise FileReadError(f"Error reading input file: {e}") from e
+    try:
+        with file, map_lines(file) as reader:
+            try:
+                with profile_phase('parse'):
+                    ast.parse(reader.data)
+            except (SyntaxError, ValueError, RecursionError, MemoryError) as e:
+                raise ParseError(f"Error parsing Python source: {e}") from e
+            if _LONE_CARRIAGE_RETURN.search(reader.data):
+                # The tokenizer's lines would not match the parser's.
+                return _split_in_memory(input_file_path, barecode_path, docstring_path)
+            try:
+                with profile_phase('scan'):
+                    spans = scan_docstring_spans(reader.readline)
+            except (tokenize.TokenError, SyntaxError) as e:
+                raise ParseError(f"Error parsing Python source: {e}") from e
+            reader.rewind()
+            # Filtering is interleaved with writing, so the streamed write covers both.
+            with profile_phase('write'):
+                barecode = _encoded(stripped_chunks(reader.readline, spans), reader.encoding)
+                docstrings = sidecar.iter_dumps(barecode_entries(spans, reader.newline))
+                written = write_files([(barecode_path, barecode), (docstring_path, docstrings)])
+            return written, sum(1 for span in spans if span.docstring is not None)
+    except UnicodeDecodeError as e:
+        raise FileReadError(f"Error reading input file: {e}") from e
+
+def spliced_chunks(readline: Callable[[], str], entries: List[SidecarEntry], newline: str = '\n',
+                   encoding: Optional[str] = None) -> Iterator[str]:
+    """
+    Stream bare code with the docstrings of a versioned sidecar spliced in.
+
+    Args:
+        readline (Callable[[], str]): Returns the next line of bare code, or ``''`` at the end.
+        entries (List[SidecarEntry]): Entries loaded from the sidecar.
+        newline (str): The line ending of the bare code, used in the docstrings.
+        encoding (Optional[str]): The encoding the output will be written in, if not UTF-8.
+
+    Yields:
+        str: Chunks of combined code of about :data:`CHUNK_SIZE` characters.
+
+    Raises:
+        DocstringMismatchError: If an entry is anchored outside the bare code.
+    """
+    inserts = sorted((entry for entry in entries if entry.docstring is not None),
+                     key=lambda entry: (entry.line, entry.column))
+    pieces: List[str] = []
+    size = 0
+    index = 0
+    row = 0
+    while True:
+        line = readline()
+        row += 1
+        col = 0
+        while index < len(inserts) and inserts[index].line == row:
+            entry = inserts[index]
+            index += 1
+            pieces.append(line[col:entry.column])
+            text = render_docstring(entry, newline, encoding)
+            pieces.append(join_statement(text, line[entry.column:]) if entry.column else text)
+            col = entry.column
+        if not line:
+            break
+        pieces.append(line[col:])
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield ''.join(pieces)
+            pieces, size = [], 0
+    if index < len(inserts):
+        entry = inserts[index]
+        raise DocstringMismatchError(
+            f"Docstring for {entry.qualname} is anchored at line {entry.line}, "
+            f"but the bare code has {row - 1} lines")
+    if pieces:
+        yield ''.join(pieces)
+
+def combine_files_streaming(barecode_file_path: str, docstring_file_path: str,
+                            output_file_path: str) -> Tuple[bool, int]:
+    """
+    Combine bare code and docstring files without holding the bare code in memory.
+
+    The bare code keeps its encoding and line endings, as with
+    :func:`~segmented_docstring.combiner.combine_bytes`. Legacy sidecars are merged in
+    memory, as their heuristic needs the whole file, and so is bare code with lines ending
+    in a lone carriage return.
+
+    Args:
+        barecode_file_path (str): Path to the file containing the bare code.
+        docstring_file_path (str): Path to the file containing the docstrings.
+        output_file_path (str): Path to write the combined output file.
+
+    Returns:
+        Tuple[bool, int]: Whether the output was written (False if it was unchanged) and
+            the number of docstrings inserted.
+
+    Raises:
+        FileReadError: If the input files cannot be read or the sidecar cannot be parsed.
+        DocstringMismatchError: If there's a mismatch between bare code and docstrings.
+        OSError: If the output cannot be written.
+    """
+    try:
+        with profile_phase('parse'), open(docstring_file_path, 'r', encoding='utf-8') as f:
+            entries = load_sidecar(f.read())
+        bare_file = open(barecode_file_path, 'rb')
+    except SidecarError as e:
+        raise CombinerReadError(f"Error parsing docstring file: {e}") from e
+    except (OSError, UnicodeDecodeError) as e:
+        raise CombinerReadError(f"Error reading input files: {e}") from e
+
+    try:
+        with bare_file, map_lines(bare_file) as reader:
+            if not isinstance(entries, list) or _LONE_CARRIAGE_RETURN.search(reader.data):
+                combined_code, count = _combine_bytes(bytes(reader.data), entries)
+                return write_file(output_file_path, combined_code), count
+            codec = None if reader.codec == 'utf-8' else reader.codec
+            with profile_phase('write'):
+                chunks = spliced_chunks(reader.readline, entries, reader.newline, codec)
+                written = write_file(output_file_path, _encoded(chunks, reader.encoding))
+            return written, sum(1 for entry in entries if entry.docstring is not None)
+    except UnicodeDecodeError as e:
+        raise CombinerReadError(f"Error reading input files: {e}") from e
+
+__version__ = '0.1.0'
@@ -0,0 +1,256 @@
+"""
+parsecache.py
+
+This module provides an in-process LRU cache of parsed syntax trees and
+docstring span tables, keyed by a hash of the source, so that long-running
+processes (watchers, servers, git filters) never parse the same source twice.
+
+Entries are evicted least recently used first once their estimated size exceeds
+the cache's budget. Span tables, which are small, can be persisted to disk and
+loaded by a later process; syntax trees are only ever kept in memory, and only
+for callers that ask for a tree.
+
+The shared cache consulted by the splitter, combiner, verifier and statistics is
+off by default, since a one-shot run never sees the same source twice: the
+resident modes (the daemon, the watcher and the git filter) turn it on with
+:func:`enable_shared_cache`.
+"""
+
+import ast
+import hashlib
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from colored_custom_logger import CustomLogger
+from .profiling import profile_phase
+from .spans import DocstringSpan, Source, find_docstring_spans
+
+logger = CustomLogger.get_logger("parsecache")
+
+DEFAULT_MAX_BYTES = 64 << 20
+# A syntax tree takes roughly this many times the size of its source in memory.
+TREE_SIZE_FACTOR = 40
+PERSIST_FORMAT = 1
+
+class _Entry:
+    __slots__ = ('tree', 'spans', 'size')
+
+    def __init__(self):
+        self.tree: Optional[ast.Module] = None
+        self.spans: Optional[List[DocstringSpan]] = None
+        self.size = 0
+
+class ParseCache:
+    """
+    LRU cache of syntax trees and docstring spans, keyed by a SHA-256 of the source.
+
+    Trees handed out by :meth:`tree` are shared and must not be modified. The cache
+    is safe to use from several threads.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, path: Optional[str] = None):
+        """
+        Args:
+            max_bytes (int): Budget for the estimated memory of all entries.
+            path (Optional[str]): File to load span tables from and :meth:`save` them to.
+        """
+        self.max_bytes = max_bytes
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        if path is not None:
+            self.load(path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(source: Source) -> str:
+        """Return the cache key of ``source``; raw bytes and text never share a key."""
+        if source.__class__ is bytes:
+            # Spans of raw bytes hold byte offsets, which differ from those of the same text.
+            return 'b' + hashlib.sha256(source).hexdigest()
+        return hashlib.sha256(source.encode('utf-8', 'surrogatepass')).hexdigest()
+
+    def tree(self, source: Source) -> ast.Module:
+        """
+        Return the syntax tree of ``source``, parsing it only if it is not cached.
+
+        Args:
+            source (Source): The Python source, as text or raw bytes.
+
+        Returns:
+            ast.Module: The parsed tree. It is shared and must not be modified.
+
+        Raises:
+            SyntaxError: If the source cannot be parsed.
+        """
+        key = self.key(source)
+        tree, = self._lookup(key, 'tree')
+        if tree is None:
+            with profile_phase('parse'):
+                tree = ast.parse(source)
+            self._store(key, tree=tree, size=len(source) * TREE_SIZE_FACTOR)
+        return tree
+
+    def spans(self, source: Source) -> List[DocstringSpan]:
+        """
+        Return the docstring spans of ``source``, parsing it only if they are not cached.
+
+        Only the spans are kept: the tree parsed to find them is cached only if it
+        already was.
+
+        Args:
+            source (Source): The Python source, as text or raw bytes.
+
+        Returns:
+            List[DocstringSpan]: Spans as returned by ``find_docstring_spans``.
+
+        Raises:
+            SyntaxError: If the source cannot be parsed.
+        """
+        key = self.key(source)
+        spans, tree = self._lookup(key, 'spans', 'tree')
+        if spans is None:
+            if tree is None:
+                with profile_phase('parse'):
+                    tree = ast.parse(source)
+            with profile_phase('visit'):
+                spans = find_docstring_spans(source, tree)
+            self._store(key, spans=spans, size=_spans_size(spans))
+        return spans
+
+    def _lookup(self, key: str, *fields: str) -> tuple:
+        """Return the cached ``fields`` of ``key`` (None if missing), counting a hit if any is."""
+        with self._lock:
+            entry = self._entries.get(key)
+            values = tuple(getattr(entry, field) if entry is not None else None for field in fields)
+            if any(value is not None for value in values):
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return values
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Persist the cached span tables.
+
+        The file is written to a temporary file and renamed into place.
+
+        Args:
+            path (Optional[str]): Destination; defaults to the path given at construction.
+        """
+        path = path or self.path
+        if path is None:
+            raise ValueError("No path to save the parse cache to")
+        with self._lock:
+            tables = {key: [tuple(span) for span in entry.spans]
+                      for key, entry in self._entries.items() if entry.spans is not None}
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump((PERSIST_FORMAT, sys.version_info[:2], tables), f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            logger.debug("Parse cache saved to: %s", path)
+        except OSError as e:
+            logger.warning("Unable to save parse cache %s: %s", path, e)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def load(self, path: str) -> None:
+        """
+        Load span tables persisted by :meth:`save`.
+
+        A missing, unreadable or incompatible file is ignored. Only load files this
+        cache wrote: they are unpickled.
+
+        Args:
+            path (str): The file to load.
+        """
+        try:
+            with open(path, 'rb') as f:
+                version, python, tables = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError) as e:
+            logger.warning("Ignoring unreadable parse cache %s: %s", path, e)
+            return
+        if version != PERSIST_FORMAT or tuple(python) != sys.version_info[:2]:
+            logger.debug("Ignoring parse cache %s written by another version", path)
+            return
+        for key, rows in tables.items():
+            spans = [DocstringSpan(*row) for row in rows]
+            self._store(key, spans=spans, size=_spans_size(spans))
+
+    def _store(self, key: str, tree: Optional[ast.Module] = None,
+               spans: Optional[List[DocstringSpan]] = None, size: int = 0) -> None:
+        if size > self.max_bytes:
+            # Caching this would only evict everything else, itself included.
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+            self._entries.move_to_end(key)
+            if tree is not None and entry.tree is None:
+                entry.tree = tree
+                entry.size += size
+                self._size += size
+            if spans is not None and entry.spans is None:
+                entry.spans = spans
+                entry.size += size
+                self._size += size
+            while self._size > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.size
+
+def _spans_size(spans: List[DocstringSpan]) -> int:
+    """Estimate the memory held by a span table."""
+    return sum(200 + len(span.qualname) + len(span.docstring or '') for span in spans)
+
+_shared: Optional[ParseCache] = None
+
+def get_shared_cache() -> Optional[ParseCache]:
+    """Return the cache used by the splitter, or None if caching is disabled (the default)."""
+    return _shared
+
+def enable_shared_cache() -> ParseCache:
+    """
+    Turn the shared cache on, for a process that will see the same sources again.
+
+    Returns:
+        ParseCache: The shared cache; an existing one is kept.
+    """
+    global _shared
+    if _shared is None:
+        _shared = ParseCache()
+    return _shared
+
+def set_shared_cache(cache: Optional[ParseCache]) -> None:
+    """
+    Replace the cache used by the splitter.
+
+    Args:
+        cache (Optional[ParseCache]): The new cache, or None to disable caching.
+    """
+    global _shared
+    _shared = cache
+
+__version__ = '0.1.0'
@@ -0,0 +1,208 @@
+"""
+profiling.py
+
+This module records how long each phase of splitting and combining takes, per
+file, to find out what makes a run slow.
+
+Instrumented code wraps its phases in :func:`profile_phase` and the per-file
+work in :func:`profile_file`. Both do nothing unless a :class:`Profiler` has
+been activated with :func:`set_profiler`, which the CLI does for ``--profile``
+or the ``SEGMENTED_PROFILE`` environment variable.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import ContextManager, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from colored_custom_logger import CustomLogger
+
+logger = CustomLogger.get_logger("profiling")
+
+ENV_VAR = 'SEGMENTED_PROFILE'
+REPORT_FORMATS = ('json', 'chrome')
+# Phases that are not spent on any one file.
+UNATTRIBUTED = '<none>'
+
+class PhaseRecord(NamedTuple):
+    """One timed phase: wall-clock start and duration in seconds."""
+    path: Optional[str]
+    phase: str
+    start: float
+    duration: float
+    pid: int
+    thread: int
+
+class Profiler:
+    """
+    Collects :class:`PhaseRecord` entries and summarizes them.
+
+    A profiler can be shared by several threads; each thread attributes its phases
+    to the file it entered last with :meth:`file`.
+    """
+
+    def __init__(self):
+        self.records: List[PhaseRecord] = []
+        self._local = threading.local()
+
+    @contextmanager
+    def file(self, path: str) -> Iterator[None]:
+        """Attribute the phases recorded inside the block to ``path``."""
+        previous = getattr(self._local, 'path', None)
+        self._local.path = path
+        try:
+            yield
+        finally:
+            self._local.path = previous
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the block as phase ``name`` of the current file."""
+        start = time.time()
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.records.append(PhaseRecord(getattr(self._local, 'path', None), name, start,
+                                            time.perf_counter() - began, os.getpid(),
+                                            threading.get_ident()))
+
+    def extend(self, records: Iterable[Tuple]) -> None:
+        """Add records collected elsewhere, e.g. by a worker process."""
+        self.records.extend(PhaseRecord(*record) for record in records)
+
+    def phase_totals(self) -> Dict[str, float]:
+        """Return the total seconds spent in each phase, in order of first occurrence."""
+        totals: Dict[str, float] = {}
+        for record in self.records:
+            totals[record.phase] = totals.get(record.phase, 0.0) + record.duration
+        return totals
+
+    def file_totals(self) -> Dict[str, Dict[str, float]]:
+        """Return the seconds spent in each phase for every file."""
+        files: Dict[str, Dict[str, float]] = defaultdict(dict)
+        for record in self.records:
+            phases = files[record.path or UNATTRIBUTED]
+            phases[record.phase] = phases.get(record.phase, 0.0) + record.duration
+        return dict(files)
+
+    def summary(self, limit: int = 10) -> str:
+        """
+        Format the totals per phase and the slowest files.
+
+        Args:
+            limit (int): Number of slowest files to list.
+
+        Returns:
+            str: A multi-line, human-readable report.
+        """
+        totals = self.phase_totals()
+        overall = sum(totals.values())
+        files = self.file_totals()
+        files.pop(UNATTRIBUTED, None)
+        lines = [f"Profile: {len(files)} file(s), {overall:.3f}s in instrumented phases"]
+        for phase, seconds in totals.items():
+            share = seconds / overall * 100 if overall else 0.0
+            lines.append(f"  {phase:<10} {seconds:9.3f}s {share:6.1f}%")
+        slowest = sorted(files.items(), key=lambda item: sum(item[1].values()),
+                         reverse=True)[:limit]
+        if slowest:
+            lines.append("Slowest files:")
+            for path, phases in slowest:
+                detail = ', '.join(f"{phase} {seconds:.3f}s" for phase, seconds in phases.items())
+                lines.append(f"  {sum(phases.values()):9.3f}s  {path} ({detail})")
+        return '\n'.join(lines)
+
+    def to_json(self) -> dict:
+        """Return the totals and every record as a JSON-serializable dictionary."""
+        return {
+            'phases': self.phase_totals(),
+            'files': self.file_totals(),
+            'records': [record._asdict() for record in self.records],
+        }
+
+    def to_chrome_trace(self) -> dict:
+        """Return the records in the Chrome trace event format (``chrome://tracing``, Perfetto)."""
+        origin = min((record.start for record in self.records), default=0.0)
+        events = [{
+            'name': record.phase,
+            'cat': 'segmented-docstring',
+            'ph': 'X',
+            'ts': round((record.start - origin) * 1e6, 3),
+            'dur': round(record.duration * 1e6, 3),
+            'pid': record.pid,
+            'tid': record.thread,
+            'args': {'file': record.path},
+        } for record in self.records]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save(self, path: str, report_format: str = 'json') -> None:
+        """
+        Write the report to a file.
+
+        Args:
+            path (str): Destination file.
+            report_format (str): ``'json'`` or ``'chrome'``.
+
+        Raises:
+            ValueError: If the format is unknown.
+            OSError: If the file cannot be written.
+        """
+        if report_format == 'json':
+            data = self.to_json()
+        elif report_format == 'chrome':
+            data = self.to_chrome_trace()
+        else:
+            raise ValueError(f"Unknown profile format: {report_format}")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        logger.info("Profile saved to: %s", path)
+
+_active: Optional[Profiler] = None
+_disabled = nullcontext()
+
+def get_profiler() -> Optional[Profiler]:
+    """Return the active profiler, or None if profiling is off."""
+    return _active
+
+def set_profiler(profiler: Optional[Profiler]) -> None:
+    """
+    Activate a profiler for this process.
+
+    Args:
+        profiler (Optional[Profiler]): The profiler to record into, or None to stop profiling.
+    """
+    global _active
+    _active = profiler
+
+def profile_phase(name: str) -> ContextManager[None]:
+    """Time the block as a phase of the current file, if profiling is on."""
+    profiler = _active
+    return _disabled if profiler is None else profiler.phase(name)
+
+def profile_file(path: str) -> ContextManager[None]:
+    """Attribute the phases of the block to ``path``, if profiling is on."""
+    profiler = _active
+    return _disabled if profiler is None else profiler.file(path)
+
+def profile_from_env() -> Tuple[bool, Optional[str]]:
+    """
+    Read the ``SEGMENTED_PROFILE`` environment variable.
+
+    ``1`` (or ``true``/``yes``) turns profiling on; any other non-empty value except
+    ``0`` turns it on and names the file to save the report to.
+
+    Returns:
+        Tuple[bool, Optional[str]]: Whether to profile, and the report path if any.
+    """
+    value = os.environ.get(ENV_VAR, '').strip()
+    if value.lower() in ('', '0', 'false', 'no'):
+        return False, None
+    if value.lower() in ('1', 'true', 'yes'):
+        return True, None
+    return True, value
+
+__version__ = '0.1.0'
@@ -0,0 +1,166 @@
+"""
+report.py
+
+This module provides structured results for large runs: the per-file statistics
+returned by ``split_file`` and ``combine_files``, a reporter that streams one
+JSON record per file followed by a summary, and a progress bar for terminals.
+"""
+
+import json
+import sys
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, TextIO
+
+REPORT_FORMATS = ('json', 'ndjson')
+STATUSES = ('ok', 'unchanged', 'skipped', 'failed')
+
+class FileStats(NamedTuple):
+    """
+    What splitting or combining one file did.
+
+    ``docstrings`` counts the docstrings extracted or inserted, ``bytes_in`` and
+    ``bytes_out`` the sizes of the input and output files on disk, and ``written``
+    the outputs that were actually rewritten (unchanged outputs are left alone).
+    """
+    docstrings: int
+    bytes_in: int
+    bytes_out: int
+    written: int
+
+class Reporter:
+    """
+    Writes machine-readable results of a run.
+
+    With ``ndjson`` every record is written as one compact line as soon as it is
+    known, followed by a summary line. With ``json`` a single document holding all
+    records and the summary is written when the run finishes.
+    """
+
+    def __init__(self, action: str, report_format: str, stream: TextIO):
+        """
+        Args:
+            action (str): The operation being reported, e.g. ``'split'``.
+            report_format (str): ``'json'`` or ``'ndjson'``.
+            stream (TextIO): Where to write the report.
+
+        Raises:
+            ValueError: If the format is unknown.
+        """
+        if report_format not in REPORT_FORMATS:
+            raise ValueError(f"Unknown report format: {report_format}")
+        self.action = action
+        self.report_format = report_format
+        self.stream = stream
+        self.records: List[Dict[str, Any]] = []
+        self.totals = dict.fromkeys(STATUSES, 0)
+        self.docstrings = self.bytes_in = self.bytes_out = 0
+        self._started = time.perf_counter()
+
+    def record(self, path: str, status: str, seconds: Optional[float] = None,
+               stats: Optional[FileStats] = None, error: Optional[str] = None) -> None:
+        """
+        Report the result of one file.
+
+        Args:
+            path (str): The input file.
+            status (str): One of :data:`STATUSES`.
+            seconds (Optional[float]): Time spent on the file.
+            stats (Optional[FileStats]): What was done, for files that were processed.
+            error (Optional[str]): The error message of a failed file.
+        """
+        self.totals[status] += 1
+        record: Dict[str, Any] = {'type': 'file', 'path': path, 'status': status}
+        if seconds is not None:
+            record['seconds'] = round(seconds, 6)
+        if stats is not None:
+            record.update(docstrings=stats.docstrings, bytes_in=stats.bytes_in,
+                          bytes_out=stats.bytes_out)
+            self.docstrings += stats.docstrings
+            self.bytes_in += stats.bytes_in
+            self.bytes_out += stats.bytes_out
+        if error is not None:
+            record['error'] = error
+        if self.report_format == 'ndjson':
+            self._write_line(record)
+        else:
+            self.records.append(record)
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the totals of the run so far."""
+        return {
+            'type': 'summary',
+            'action': self.action,
+            'files': sum(self.totals.values()),
+            **self.totals,
+            'docstrings': self.docstrings,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'seconds': round(time.perf_counter() - self._started, 6),
+        }
+
+    def finish(self) -> None:
+        """Write the summary (and, for ``json``, every record)."""
+        if self.report_format == 'ndjson':
+            self._write_line(self.summary())
+            return
+        json.dump({'action': self.action, 'files': self.records, 'summary': self.summary()},
+                  self.stream, indent=2)
+        self.stream.write('\n')
+        self.stream.flush()
+
+    def _write_line(self, record: Dict[str, Any]) -> None:
+        self.stream.write(json.dumps(record, separators=(',', ':'), ensure_ascii=False) + '\n')
+        self.stream.flush()
+
+class ProgressBar:
+    """
+    A single-line progress bar, redrawn at most a few times per second.
+
+    Nothing is drawn unless the stream is a terminal.
+    """
+
+    def __init__(self, total: int, label: str = '', stream: Optional[TextIO] = None,
+                 width: int = 30, interval: float = 0.1):
+        """
+        Args:
+            total (int): Number of steps.
+            label (str): Text shown before the bar.
+            stream (Optional[TextIO]): Where to draw; stderr if None.
+            width (int): Width of the bar in characters.
+            interval (float): Minimum seconds between redraws.
+        """
+        self.total = total
+        self.label = label
+        self.stream = stream or sys.stderr
+        self.width = width
+        self.interval = interval
+        self.count = 0
+        self.enabled = total > 0 and _is_terminal(self.stream)
+        self._drawn_at = 0.0
+
+    def update(self, steps: int = 1) -> None:
+        """Advance the bar, redrawing it if enough time has passed or it is complete."""
+        self.count += steps
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if now - self._drawn_at >= self.interval or self.count >= self.total:
+            self._drawn_at = now
+            filled = self.width * self.count // self.total
+            bar = '#' * filled + '-' * (self.width - filled)
+            self.stream.write(f"\r{self.label}[{bar}] {self.count}/{self.total}")
+            self.stream.flush()
+
+    def close(self) -> None:
+        """End the bar's line."""
+        if self.enabled and self._drawn_at:
+            self.stream.write('\n')
+            self.stream.flush()
+
+def _is_terminal(stream: TextIO) -> bool:
+    try:
+        return stream.isatty()
+    except (AttributeError, ValueError):
+        return False
+
+__version__ = '0.1.0'
@@ -0,0 +1,324 @@
+"""
+sidecar.py
+
+This module defines the docstring sidecar format: a versioned JSON document
+listing every definition's docstring, keyed by qualified name and anchored to
+the line of the bare code where the docstring belongs.
+
+Each entry also records how its docstring was written (quotes, prefix, where
+the text starts and ends), and the exact original text when that is not enough
+to reproduce it, so that combining gives back the original file byte for byte
+as long as the docstring is not edited.
+"""
+
+import ast
+import json
+import re
+from inspect import cleandoc
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Union
+
+from .spans import SEPARATOR, DocstringSpan, Source, barecode_anchors, source_encoding
+
+SIDECAR_FORMAT = 'segmented-docstring'
+SIDECAR_VERSION = 3
+# Versions that can be read; version 2 entries have no formatting fields.
+SUPPORTED_VERSIONS = (2, 3)
+# Fields left out of the document when they are None.
+OPTIONAL_FIELDS = ('quote', 'layout', 'raw')
+# Where a docstring's text starts and ends: on a line of its own after the opening
+# quotes ('open'), before the closing quotes ('close'), or both ('block').
+LAYOUTS = ('open', 'close', 'block')
+
+_QUOTE_PATTERN = re.compile(r'[rRuU]?("""|\'\'\'|"|\')')
+# The separator an inline docstring followed by a statement was removed with
+# (see ``spans.separator_length``), and the line end of a docstring on its own line.
+_SEPARATOR_PATTERN = re.compile(SEPARATOR + r'\s*\Z')
+# Characters a string literal cannot hold as they are: NUL, and carriage returns and
+# other controls that would be read as line breaks or are invisible in the source.
+_CONTROL_PATTERN = re.compile('[\x00-\x08\x0b-\x1f\x7f]')
+
+class SidecarError(ValueError):
+    """Raised when a docstring sidecar cannot be parsed."""
+    pass
+
+class SidecarEntry(NamedTuple):
+    """
+    One definition's docstring, as stored in a sidecar.
+
+    ``line`` and ``column`` locate the insertion point in the bare code. A
+    column of zero means the docstring occupies its own lines, indented by
+    ``indent``; otherwise it is inserted inline at that column. ``docstring``
+    is None for definitions that have no docstring yet.
+
+    ``quote`` is the opening quote with its prefix (e.g. ``r'''``) when it is
+    not the default triple double quote, and ``layout`` one of :data:`LAYOUTS`. ``raw`` is
+    the exact text that was removed from the source, kept only when it cannot
+    be rendered from the other fields; it is used as long as it still holds
+    ``docstring``.
+    """
+    qualname: str
+    kind: str
+    line: int
+    column: int
+    indent: int
+    docstring: Optional[str]
+    quote: Optional[str] = None
+    layout: Optional[str] = None
+    raw: Optional[str] = None
+
+def entries_from_spans(source: Source, spans: List[DocstringSpan]) -> List[SidecarEntry]:
+    """
+    Build sidecar entries for the spans found in ``source``.
+
+    Args:
+        source (Source): The Python source the spans were computed from, as text or bytes.
+        spans (List[DocstringSpan]): Spans returned by ``find_docstring_spans``.
+
+    Returns:
+        List[SidecarEntry]: One entry per span, in the same order.
+    """
+    decode = None
+    if source.__class__ is bytes:
+        encoding = source_encoding(source)
+        codec = 'utf-8' if encoding == 'utf-8-sig' else encoding
+        decode = lambda data: data.decode(codec)
+    newline = source_newline(source)
+    entries = []
+    for span, (line, column) in zip(spans, barecode_anchors(source, spans)):
+        entry = SidecarEntry(span.qualname, span.kind, line, column, span.body_indent,
+                             span.docstring)
+        if span.docstring is not None:
+            text = source[span.start:span.end]
+            entry = with_formatting(entry, text if decode is None else decode(text), newline)
+        entries.append(entry)
+    return entries
+
+def source_newline(source: Source) -> str:
+    """
+    Return the line ending used by ``source``: that of its first line, or ``\\n``.
+
+    Args:
+        source (Source): The source, as text or bytes.
+
+    Returns:
+        str: ``'\\r\\n'`` or ``'\\n'``.
+    """
+    newline = '\n' if source.__class__ is str else b'\n'
+    first = source.find(newline)
+    return '\r\n' if first > 0 and source[first - 1:first] in ('\r', b'\r') else '\n'
+
+def with_formatting(entry: SidecarEntry, text: str, newline: str = '\n') -> SidecarEntry:
+    """
+    Record how a docstring was written in its entry.
+
+    Args:
+        entry (SidecarEntry): The entry of the docstring.
+        text (str): The text removed from the source for it: whole lines, or just the
+            literal for an inline docstring.
+        newline (str): The line ending of the source.
+
+    Returns:
+        SidecarEntry: The entry with ``quote`` and ``layout`` set, and ``raw`` if they
+            are not enough to render ``text`` exactly.
+    """
+    literal = _literal(text)
+    match = _QUOTE_PATTERN.match(literal)
+    if (match is not None and literal.endswith(match.group(1))
+            and len(literal) >= 2 * len(match.group(1))):
+        quote, closing = match.group(0), match.group(1)
+        body = literal[len(quote):len(literal) - len(closing)].replace('\r\n', '\n')
+        opens = body.startswith('\n')
+        closes = '\n' in body and not body.rsplit('\n', 1)[1].strip()
+        layout = 'block' if opens and closes else 'open' if opens else 'close' if closes else None
+        if quote == _default_quote(entry.docstring):
+            quote = None
+        entry = entry._replace(quote=quote, layout=layout)
+    rendered = render_docstring(entry, newline)
+    if text not in (rendered, join_statement(rendered, 'code')):
+        entry = entry._replace(raw=text)
+    return entry
+
+def render_docstring(entry: SidecarEntry, newline: str = '\n',
+                     encoding: Optional[str] = None) -> str:
+    """
+    Render a sidecar entry as the text to splice into bare code.
+
+    The original text is returned if the entry has one and its docstring was not
+    changed since. Otherwise the docstring is written with the entry's quotes and
+    layout, on its own indented lines unless the entry is inline. Backslashes,
+    quotes that would end the literal early and control characters are escaped,
+    and a raw prefix is dropped when the text cannot be written raw.
+
+    Args:
+        entry (SidecarEntry): The entry to render; its docstring must not be None.
+        newline (str): The line ending to use.
+        encoding (Optional[str]): The encoding the text will be written in, if not
+            UTF-8; characters it lacks are escaped as well.
+
+    Returns:
+        str: The text to insert at the entry's anchor.
+    """
+    if entry.raw is not None and _holds(entry.raw, entry.docstring):
+        return entry.raw
+    text = _render(entry, entry.layout, encoding)
+    lines = entry.docstring.split('\n')
+    if (entry.layout is not None and len(lines) > 1 and not lines[-1].strip()
+            and not _holds(text, entry.docstring)):
+        # A text ending in blank lines is only kept as it is where the layout adds none.
+        text = _render(entry, None, encoding)
+    return text if newline == '\n' else text.replace('\n', newline)
+
+def _render(entry: SidecarEntry, layout: Optional[str], encoding: Optional[str]) -> str:
+    """Write an entry's docstring as a literal with ``layout``, lines ending in ``\\n``."""
+    text = entry.docstring
+    if layout == 'close' and '\n' not in text and entry.indent:
+        # ``cleandoc`` would keep the closing line's indentation as part of the text.
+        layout = None
+    quote = entry.quote or _default_quote(text)
+    closing = quote.lstrip('rRuU')
+    if len(closing) == 1 and (closing in text or '\n' in text or layout is not None):
+        # The text no longer fits between single quotes.
+        quote, closing = quote[:-1] + closing * 3, closing * 3
+    if closing in text:
+        quote, closing = quote.replace(closing, _default_quote(text)), _default_quote(text)
+    indent = ' ' * entry.indent
+    lines = text.split('\n')
+    if layout in ('close', 'block') and len(lines) > 1 and not lines[-1].strip():
+        # ``cleandoc`` keeps the closing line's indentation when no other line has any.
+        lines.pop()
+    if any(line.strip() for line in lines[1:]):
+        lines[1:] = [indent + line if line else line for line in lines[1:]]
+    text = '\n'.join(lines)
+    if layout in ('open', 'block'):
+        text = f'\n{indent}{text}'
+    if layout in ('close', 'block'):
+        text = f'{text}\n{indent}'
+    if 'r' in quote.lower() and not _fits_raw(text, closing, encoding):
+        quote = quote.replace('r', '').replace('R', '')
+    if 'r' not in quote.lower():
+        text = _escape(text, closing, encoding)
+    return f'{quote}{text}{closing}' if entry.column else f'{indent}{quote}{text}{closing}\n'
+
+def join_statement(text: str, rest: Source) -> str:
+    """
+    Separate an inline docstring from the statement that follows it, if any.
+
+    Args:
+        text (str): The rendered docstring, to be inserted before ``rest``.
+        rest (Source): The rest of the bare code line at the insertion point.
+
+    Returns:
+        str: ``text``, followed by ``; `` if ``rest`` starts with a statement and
+            ``text`` does not already end with a separator.
+    """
+    rest = rest.strip()
+    if not rest or rest[:1] in ('#', b'#') or _SEPARATOR_PATTERN.search(text):
+        return text
+    return text + '; '
+
+def _default_quote(docstring: str) -> str:
+    return "'''" if '"""' in docstring else '"""'
+
+def _fits_raw(text: str, closing: str, encoding: Optional[str]) -> bool:
+    """Whether ``text`` can be written as it is between raw ``closing`` quotes."""
+    if closing in text or text.endswith(('\\', closing[0])) or _CONTROL_PATTERN.search(text):
+        return False
+    try:
+        text.encode(encoding or 'utf-8')
+    except UnicodeEncodeError:
+        return False
+    return True
+
+def _escape(text: str, closing: str, encoding: Optional[str]) -> str:
+    """Escape ``text`` so that a non-raw literal closed by ``closing`` evaluates to it."""
+    text = text.replace('\\', '\\\\')
+    text = _CONTROL_PATTERN.sub(lambda match: f'\\x{ord(match.group()):02x}', text)
+    if encoding is not None:
+        text = text.encode(encoding, 'backslashreplace').decode(encoding)
+    quote = re.escape(closing[0])
+    # Runs of the quote character that would close the literal, or run into its end.
+    pattern = f'{quote}{{3,}}|{quote}+\\Z' if len(closing) == 3 else f'{quote}+'
+    return re.sub(pattern, lambda match: ('\\' + closing[0]) * len(match.group()), text)
+
+def _literal(text: str) -> str:
+    """Return the string literal in the text removed for a docstring."""
+    return _SEPARATOR_PATTERN.sub('', text).strip()
+
+def _holds(raw: str, docstring: str) -> bool:
+    """Whether the original text ``raw`` still evaluates to ``docstring``."""
+    try:
+        value = ast.literal_eval(_literal(raw))
+    except (SyntaxError, ValueError):
+        return False
+    return isinstance(value, str) and cleandoc(value) == docstring
+
+def dumps(entries: List[SidecarEntry]) -> str:
+    """
+    Serialize sidecar entries to the current sidecar format.
+
+    Args:
+        entries (List[SidecarEntry]): The entries to serialize.
+
+    Returns:
+        str: The JSON document, ending with a newline.
+    """
+    return ''.join(iter_dumps(entries))
+
+def iter_dumps(entries: Iterable[SidecarEntry]) -> Iterator[str]:
+    """
+    Serialize sidecar entries one at a time, producing the same text as :func:`dumps`.
+
+    Args:
+        entries (Iterable[SidecarEntry]): The entries to serialize.
+
+    Yields:
+        str: Consecutive pieces of the JSON document.
+    """
+    yield (f'{{\n  "format": {json.dumps(SIDECAR_FORMAT)},\n  "version": {SIDECAR_VERSION},'
+           f'\n  "docstrings": [')
+    separator = '\n    '
+    for entry in entries:
+        fields = {name: value for name, value in entry._asdict().items()
+                  if value is not None or name not in OPTIONAL_FIELDS}
+        # Newlines inside JSON strings are escaped, so this only re-indents the structure.
+        yield separator + json.dumps(fields, indent=2, ensure_ascii=False).replace('\n', '\n    ')
+        separator = ',\n    '
+    yield ']\n}\n' if separator == '\n    ' else '\n  ]\n}\n'
+
+def loads(text: str) -> Union[List[SidecarEntry], Dict[str, Any]]:
+    """
+    Parse a docstring sidecar in the current or the legacy format.
+
+    Args:
+        text (str): The sidecar contents.
+
+    Returns:
+        Union[List[SidecarEntry], Dict[str, Any]]: Entries for a versioned
+            sidecar, or the name-to-docstring mapping of a legacy sidecar.
+
+    Raises:
+        SidecarError: If the text is not a readable sidecar.
+    """
+    try:
+        data = json.loads(text)
+    except ValueError:
+        # Legacy sidecars are Python dict literals, which are not always valid JSON.
+        try:
+            data = ast.literal_eval(text)
+        except (SyntaxError, ValueError) as e:
+            raise SidecarError(f"Unrecognised docstring sidecar: {e}") from e
+
+    if not isinstance(data, dict):
+        raise SidecarError("Docstring sidecar must be a mapping")
+    if data.get('format') != SIDECAR_FORMAT:
+        return data
+
+    version = data.get('version')
+    if version not in SUPPORTED_VERSIONS:
+        raise SidecarError(f"Unsupported docstring sidecar version: {version}")
+    try:
+        return [SidecarEntry(**item) for item in data['docstrings']]
+    except (KeyError, TypeError) as e:
+        raise SidecarError(f"Malformed docstring sidecar: {e}") from e
+
+__version__ = '0.1.0'
@@ -0,0 +1,350 @@
+"""
+spans.py
+
+This module locates docstrings in Python source as offsets into the original
+buffer, so that bare code can be produced by slicing the source between those
+offsets instead of re-scanning it line by line.
+
+The buffer is either text or the raw bytes of a file. Raw bytes are parsed in
+the encoding declared by their PEP 263 comment or byte order mark, and offsets
+into them are byte offsets, so bare code can be cut out of a file without
+decoding and re-encoding it.
+"""
+
+import ast
+import codecs
+import io
+import re
+import tokenize
+from inspect import cleandoc
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+Source = Union[str, bytes]
+
+DEFINITION_TYPES = (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)
+# Fields that hold statement lists, in source order (``handlers`` and ``cases`` hold
+# nodes that have their own bodies; a ``try``'s handlers precede its ``else``).
+BLOCK_FIELDS = ('body', 'handlers', 'orelse', 'finalbody', 'cases')
+
+_block_fields_by_type: Dict[type, Tuple[str, ...]] = {}
+
+# The ``;`` after an inline docstring, with the blanks and backslash continuations around it.
+SEPARATOR = r'[ \t]*(?:\\\r?\n[ \t]*)*;[ \t]*(?:\\\r?\n[ \t]*)*'
+_SEPARATORS = {str: re.compile(SEPARATOR), bytes: re.compile(SEPARATOR.encode())}
+
+class DocstringSpan(NamedTuple):
+    """
+    The location of one definition's docstring in a source buffer.
+
+    ``start`` and ``end`` are offsets of the region removed from the source to
+    produce bare code, in characters, or in bytes for a source given as bytes:
+    whole lines for a docstring on its own lines, or just the string literal
+    when it shares a line with other code, along with the ``;`` that separates
+    it from a following statement (see :func:`separator_length`). When a
+    definition has no docstring, ``docstring`` is None and the region is empty,
+    anchored at the start of the line holding the first statement of the body.
+    ``indent`` is the column of the definition and ``body_indent`` the column
+    of its body, where the docstring belongs, in characters either way.
+    """
+    kind: str
+    name: str
+    qualname: str
+    lineno: int
+    indent: int
+    body_indent: int
+    start: int
+    end: int
+    docstring: Optional[str]
+
+def line_offsets(source: Source) -> List[int]:
+    """
+    Compute the offset at which each line of ``source`` starts.
+
+    For raw bytes, the first line starts after the UTF-8 byte order mark, if any.
+
+    Args:
+        source (Source): The source buffer, as text or bytes.
+
+    Returns:
+        List[int]: Offsets indexed by zero-based line number, plus a final
+            entry equal to ``len(source)``.
+    """
+    newline = '\n'
+    offsets = [0]
+    if source.__class__ is bytes:
+        newline = b'\n'
+        if source.startswith(codecs.BOM_UTF8):
+            offsets[0] = len(codecs.BOM_UTF8)
+    find = source.find
+    pos = find(newline)
+    while pos != -1:
+        offsets.append(pos + 1)
+        pos = find(newline, pos + 1)
+    if offsets[-1] != len(source):
+        offsets.append(len(source))
+    return offsets
+
+def source_encoding(data: bytes) -> str:
+    """
+    Determine the encoding of Python source bytes, like the interpreter does.
+
+    Args:
+        data (bytes): The raw source.
+
+    Returns:
+        str: The encoding declared by a PEP 263 comment, ``'utf-8-sig'`` if the
+            source starts with a UTF-8 byte order mark, or ``'utf-8'``.
+
+    Raises:
+        SyntaxError: If the declared encoding is unknown or contradicts the byte order mark.
+    """
+    return tokenize.detect_encoding(io.BytesIO(data).readline)[0]
+
+def decode_source(data: bytes) -> str:
+    """
+    Decode Python source bytes like the interpreter does, with universal newlines.
+
+    Args:
+        data (bytes): The raw source.
+
+    Returns:
+        str: The source text, without byte order mark and with lines ending in ``\\n``.
+
+    Raises:
+        SyntaxError: If the declared encoding is unknown or contradicts the byte order mark.
+        UnicodeDecodeError: If the source is not valid in its encoding.
+    """
+    return universal_newlines(data.decode(source_encoding(data)))
+
+def universal_newlines(text: str) -> str:
+    """
+    End every line of ``text`` with ``\\n``, as Python does when reading source.
+
+    Args:
+        text (str): The source text.
+
+    Returns:
+        str: The text with ``\\r\\n`` and lone ``\\r`` line endings replaced by ``\\n``.
+    """
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+def has_lone_carriage_returns(data: Source) -> bool:
+    """
+    Check whether source ends any line with a ``\\r`` alone.
+
+    Python reads such sources with universal newlines, so their line numbers do
+    not match a count of ``\\n``, and offsets cannot be computed for them.
+
+    Args:
+        data (Source): The source, as text or raw bytes.
+
+    Returns:
+        bool: True if ``data`` holds a ``\\r`` not followed by ``\\n``.
+    """
+    if data.__class__ is bytes:
+        return b'\r' in data and data.count(b'\r') != data.count(b'\r\n')
+    return '\r' in data and data.count('\r') != data.count('\r\n')
+
+def _char_column(line: str, byte_col: int) -> int:
+    """Convert an AST UTF-8 byte column into a character column within ``line``."""
+    if line.isascii():
+        return byte_col
+    return len(line.encode('utf-8')[:byte_col].decode('utf-8', errors='ignore'))
+
+def _byte_column(line: bytes, byte_col: int) -> int:
+    """Return an AST UTF-8 byte column unchanged, for UTF-8 encoded lines."""
+    return byte_col
+
+def _encoded_column(encoding: str) -> Callable[[bytes, int], int]:
+    """Build a converter of AST UTF-8 byte columns into byte columns of lines in ``encoding``."""
+    def column(line: bytes, byte_col: int) -> int:
+        if line.isascii():
+            return byte_col
+        text = line.decode(encoding)
+        return len(text[:_char_column(text, byte_col)].encode(encoding))
+    return column
+
+def find_docstring_spans(source: Source, tree: Optional[ast.Module] = None) -> List[DocstringSpan]:
+    """
+    Locate the docstring of every module, class and function in ``source``.
+
+    Args:
+        source (Source): The Python source, as text or as the raw bytes of a file.
+            Offsets into raw bytes are byte offsets. Lines must end with ``\\n`` or
+            ``\\r\\n`` (see :func:`has_lone_carriage_returns`).
+        tree (Optional[ast.Module]): The parsed source, if already available.
+
+    Returns:
+        List[DocstringSpan]: One span per definition, in source order.
+
+    Raises:
+        SyntaxError: If ``tree`` is not given and ``source`` cannot be parsed, or if
+            the encoding of raw bytes is invalid.
+    """
+    if source.__class__ is bytes:
+        encoding = source_encoding(source)
+        column = _byte_column if encoding in ('utf-8', 'utf-8-sig') else _encoded_column(encoding)
+    else:
+        column = _char_column
+    if tree is None:
+        tree = ast.parse(source)
+    offsets = line_offsets(source)
+    spans: List[DocstringSpan] = []
+
+    def visit(node: ast.AST, prefix: str) -> None:
+        if isinstance(node, ast.Module):
+            name, qualname, lineno, indent = 'module', 'module', 0, 0
+        else:
+            name = node.name
+            qualname = f"{prefix}{name}"
+            lineno, indent = node.lineno, node.col_offset
+        spans.append(_make_span(source, offsets, column, node, name, qualname, lineno, indent))
+
+        # Definitions can only appear in statement blocks, so expressions are never descended into.
+        child_prefix = '' if isinstance(node, ast.Module) else f"{qualname}."
+        stack = _statement_children(node)
+        while stack:
+            child = stack.pop()
+            if isinstance(child, DEFINITION_TYPES):
+                visit(child, child_prefix)
+            else:
+                stack.extend(_statement_children(child))
+
+    visit(tree, '')
+    return spans
+
+def _statement_children(node: ast.AST) -> List[ast.AST]:
+    """Return the statements nested directly in ``node``'s blocks, in reverse source order."""
+    cls = node.__class__
+    fields = _block_fields_by_type.get(cls)
+    if fields is None:
+        fields = _block_fields_by_type[cls] = tuple(f for f in BLOCK_FIELDS if f in cls._fields)
+    children: List[ast.AST] = []
+    for field in fields:
+        block = getattr(node, field)
+        if block.__class__ is list:
+            children.extend(block)
+    children.reverse()
+    return children
+
+def _docstring_node(node: ast.AST) -> Optional[ast.Expr]:
+    """Return the statement holding ``node``'s docstring, if it has one."""
+    if not node.body:
+        return None
+    first = node.body[0]
+    if (first.__class__ is ast.Expr and first.value.__class__ is ast.Constant
+            and first.value.value.__class__ is str):
+        return first
+    return None
+
+def _make_span(source: Source, offsets: List[int], column: Callable[[Source, int], int],
+               node: ast.AST, name: str, qualname: str, lineno: int, indent: int) -> DocstringSpan:
+    kind = node.__class__.__name__
+    expr = _docstring_node(node)
+    if expr is None:
+        if not node.body:
+            return DocstringSpan(kind, name, qualname, lineno, indent, indent,
+                                 len(source), len(source), None)
+        first = node.body[0]
+        # A decorated definition starts at its first decorator, not at ``def``/``class``.
+        decorators = getattr(first, 'decorator_list', None)
+        anchor = offsets[(decorators[0].lineno if decorators else first.lineno) - 1]
+        body_indent = first.col_offset
+        return DocstringSpan(kind, name, qualname, lineno, indent, body_indent,
+                             anchor, anchor, None)
+
+    docstring = cleandoc(expr.value.value)
+    first_line = source[offsets[expr.lineno - 1]:offsets[expr.lineno]]
+    last_line = source[offsets[expr.end_lineno - 1]:offsets[expr.end_lineno]]
+    start_col = column(first_line, expr.col_offset)
+    end_col = column(last_line, expr.end_col_offset)
+
+    before = first_line[:start_col]
+    end = offsets[expr.end_lineno - 1] + end_col
+    end += separator_length(source, end)
+    # A continuation after the separator moves the end of the region to a later line.
+    line_end = source.find(b'\n' if source.__class__ is bytes else '\n', end) + 1 or len(source)
+    if not before.strip() and not source[end:line_end].strip():
+        # The docstring occupies whole lines: drop them along with their newlines.
+        start = offsets[expr.lineno - 1]
+        end = line_end
+    else:
+        start = offsets[expr.lineno - 1] + start_col
+    return DocstringSpan(kind, name, qualname, lineno, indent, expr.col_offset,
+                         start, end, docstring)
+
+def separator_length(source: Source, pos: int) -> int:
+    """
+    Measure the ``;`` that separates a docstring from a following statement.
+
+    Leaving the ``;`` of ``def f(): "Doc."; return 1`` in the bare code would make
+    it invalid, so it is removed with the docstring, along with the blanks around it.
+    Backslash continuations around it are removed too, so that the statement after
+    ``"Doc."; \\`` moves up to where the docstring was instead of continuing a
+    line left with only a backslash.
+
+    Args:
+        source (Source): The source, as text or bytes.
+        pos (int): The offset just after the docstring's closing quotes.
+
+    Returns:
+        int: The length of the separator at ``pos``, or 0 if there is none.
+    """
+    match = _SEPARATORS[source.__class__].match(source, pos)
+    return 0 if match is None else match.end() - pos
+
+def strip_docstrings(source: Source, spans: List[DocstringSpan]) -> Source:
+    """
+    Produce bare code by removing every docstring span from ``source``.
+
+    Args:
+        source (Source): The Python source the spans were computed from.
+        spans (List[DocstringSpan]): Spans returned by :func:`find_docstring_spans`.
+
+    Returns:
+        Source: The source with all docstring regions removed, of the same type.
+    """
+    pieces = []
+    pos = 0
+    for span in sorted(spans, key=lambda s: s.start):
+        if span.start == span.end:
+            continue
+        pieces.append(source[pos:span.start])
+        pos = span.end
+    pieces.append(source[pos:])
+    return source[:0].join(pieces)
+
+def barecode_anchors(source: Source, spans: List[DocstringSpan]) -> List[Tuple[int, int]]:
+    """
+    Map each span to the position where its docstring belongs in the bare code.
+
+    Args:
+        source (Source): The Python source the spans were computed from.
+        spans (List[DocstringSpan]): Spans returned by :func:`find_docstring_spans`.
+
+    Returns:
+        List[Tuple[int, int]]: A 1-based line and 0-based character column in the
+            output of :func:`strip_docstrings`, for each span in the given order.
+    """
+    newline, encoding = '\n', None
+    if source.__class__ is bytes:
+        # Columns are counted in characters, so that they do not depend on the encoding.
+        newline, encoding = b'\n', source_encoding(source)
+    anchors: Dict[int, Tuple[int, int]] = {}
+    line = 1
+    removed_lines = 0
+    pos = 0
+    for index in sorted(range(len(spans)), key=lambda i: spans[i].start):
+        span = spans[index]
+        line += source.count(newline, pos, span.start)
+        line_start = source.rfind(newline, 0, span.start) + 1
+        column = span.start - line_start
+        if encoding is not None and column:
+            # Decoding from the start of the file drops a byte order mark, as the parser does.
+            column = len(source[line_start:span.start].decode(encoding))
+        anchors[index] = (line - removed_lines, column)
+        removed_lines += source.count(newline, span.start, span.end)
+        pos = span.start
+    return [anchors[i] for i in range(len(spans))]
+
+__version__ = '0.1.0'
@@ -3,14 +3,27 @@ splitter.py
 
 This module provides functionality to split Python source files into separate
 files containing bare code and docstrings.
+
+Files are split as raw bytes: the bare code is cut out of the file by byte
+offsets, so it keeps the file's encoding, byte order mark and line endings, and
+the unchanged majority of the file is never decoded or re-encoded.
 """
 
 import ast
 import os
 from pathlib import Path
-from typing import Dict, Any
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
 
 from colored_custom_logger import CustomLogger
+from .cache import ManifestCache
+from .config import DEFAULT_CONFIG
+from . import sidecar
+from .parsecache import get_shared_cache
+from .profiling import profile_file, profile_phase
+from .report import FileStats
+from .spans import (Source, decode_source, find_docstring_spans, has_lone_carriage_returns,
+                    source_encoding, strip_docstrings, universal_newlines)
+from .writer import file_size, write_files
 
 logger = CustomLogger.get_logger("splitter")
 
@@ -30,9 +43,21 @@ class ParseError(SplitterError):
     """Raised when there's an error parsing the Python source."""
     pass
 
-def split_file(input_file_path: str, output_directory: str, barecode_extension: str, docstring_extension: str) -> None:
+class SplitResult(NamedTuple):
     """
-    Split a Python file into separate files for bare code and docstrings.
+    The outcome of splitting one source with :func:`split_many`.
+
+    ``barecode`` is bytes, in the source's encoding, for files and bytes sources.
+    """
+    name: str
+    barecode: Optional[Source]
+    docstrings: Optional[str]
+    error: Optional[SplitterError]
+
+def output_paths(input_file_path: str, output_directory: str, barecode_extension: str,
+                 docstring_extension: str) -> Tuple[str, str]:
+    """
+    Compute the bare code and docstring output paths for an input file.
 
     Args:
         input_file_path (str): Path to the input Python file.
@@ -40,91 +65,225 @@ def split_file(input_file_path: str, output_directory: str, barecode_extension:
         barecode_extension (str): File extension for the bare code file.
         docstring_extension (str): File extension for the docstring file.
 
+    Returns:
+        Tuple[str, str]: The bare code path and the docstring path.
+    """
+    base_name = os.path.splitext(os.path.basename(input_file_path))[0]
+    barecode_path = os.path.join(output_directory, f"{base_name}{barecode_extension}")
+    docstring_path = os.path.join(output_directory, f"{base_name}{docstring_extension}")
+    return barecode_path, docstring_path
+
+def split_source(source: str) -> Tuple[str, str]:
+    """
+    Split Python source held in memory into bare code and docstrings.
+
+    Lines ending in a lone carriage return are read as Python reads them, so the
+    bare code of such a source ends its lines with ``\\n``.
+
+    Args:
+        source (str): The Python source.
+
+    Returns:
+        Tuple[str, str]: The bare code and the docstring sidecar contents.
+
     Raises:
-        FileReadError: If there's an error reading the input file.
         ParseError: If there's an error parsing the Python source.
-        FileSaveError: If there's an error saving the output files.
     """
-    logger.info("Splitting file: %s", input_file_path)
+    barecode, docstrings, _ = _split(source)
+    return barecode, docstrings
 
-    try:
-        with open(input_file_path, 'r', encoding='utf-8') as file:
-            source = file.read()
-    except IOError as e:
-        logger.error("Error reading input file: %s", e)
-        raise FileReadError(f"Error reading input file: {e}") from e
+def split_bytes(data: bytes) -> Tuple[bytes, str]:
+    """
+    Split the raw bytes of a Python file into bare code and docstrings.
+
+    The source is parsed in the encoding declared by its PEP 263 comment or byte
+    order mark (UTF-8 otherwise), and the bare code is sliced out of ``data``
+    without decoding it. Sources with lines ending in a lone carriage return are
+    decoded with universal newlines instead, so their bare code ends lines with ``\\n``.
+
+    Args:
+        data (bytes): The raw Python source.
 
+    Returns:
+        Tuple[bytes, str]: The bare code, in the encoding of ``data``, and the docstring
+            sidecar contents.
+
+    Raises:
+        ParseError: If the source cannot be decoded or parsed.
+    """
+    barecode, docstrings, _ = _split(data)
+    return barecode, docstrings
+
+def _split(source: Source) -> Tuple[Source, str, int]:
+    """Split text or raw bytes like :func:`split_source`, also counting the docstrings found."""
+    if has_lone_carriage_returns(source):
+        if source.__class__ is bytes:
+            return _split_decoded(source)
+        source = universal_newlines(source)
+    cache = get_shared_cache()
     try:
-        tree = ast.parse(source)
+        if cache is not None:
+            spans = cache.spans(source)
+        else:
+            with profile_phase('parse'):
+                tree = ast.parse(source)
+            with profile_phase('visit'):
+                spans = find_docstring_spans(source, tree)
     except SyntaxError as e:
         logger.error("Error parsing Python source: %s", e)
         raise ParseError(f"Error parsing Python source: {e}") from e
-    
-    barecode_lines = []
-    docstring_lines = []
-    
-    class DocstringVisitor(ast.NodeVisitor):
-        def visit_Module(self, node):
-            self._process_node(node, 0)
-            self.generic_visit(node)
-
-        def visit_ClassDef(self, node):
-            self._process_node(node, node.col_offset)
-            self.generic_visit(node)
-
-        def visit_FunctionDef(self, node):
-            self._process_node(node, node.col_offset)
-            self.generic_visit(node)
-
-        def _process_node(self, node, indent):
-            docstring = ast.get_docstring(node)
-            if docstring:
-                lines = docstring.split('\n')
-                docstring_lines.extend([' ' * indent + '"""' + lines[0] + '"""'] + 
-                                       [' ' * indent + line for line in lines[1:]])
-                docstring_lines.append('')
-            else:
-                placeholder = f'"""<placeholder> Add docstring for {node.__class__.__name__}"""'
-                docstring_lines.append(' ' * indent + placeholder)
-                docstring_lines.append('')
 
-    visitor = DocstringVisitor()
-    visitor.visit(tree)
+    with profile_phase('filter'):
+        barecode = strip_docstrings(source, spans)
+        docstrings = sidecar.dumps(sidecar.entries_from_spans(source, spans))
+    return barecode, docstrings, sum(1 for span in spans if span.docstring is not None)
 
-    lines = source.split('\n')
-    for i, line in enumerate(lines):
-        stripped = line.strip()
-        if stripped.startswith('"""') or stripped.startswith("'''"):
-            continue
-        if stripped and not stripped.startswith('#'):
-            barecode_lines.append(line)
-        elif stripped.startswith('#') or not stripped:
-            barecode_lines.append(line)
+def _split_decoded(data: bytes) -> Tuple[bytes, str, int]:
+    """Split raw bytes through their decoded text, for sources whose lines need decoding."""
+    try:
+        encoding = source_encoding(data)
+        source = decode_source(data)
+    except (SyntaxError, UnicodeDecodeError) as e:
+        logger.error("Error decoding Python source: %s", e)
+        raise ParseError(f"Error decoding Python source: {e}") from e
+    barecode, docstrings, count = _split(source)
+    return barecode.encode(encoding), docstrings, count
 
-    base_name = os.path.splitext(os.path.basename(input_file_path))[0]
-    barecode_path = os.path.join(output_directory, f"{base_name}{barecode_extension}")
-    docstring_path = os.path.join(output_directory, f"{base_name}{docstring_extension}")
+def split_file(input_file_path: str, output_directory: str, barecode_extension: str,
+               docstring_extension: str, cache: Optional[ManifestCache] = None,
+               low_memory: bool = False) -> Optional[FileStats]:
+    """
+    Split a Python file into separate files for bare code and docstrings.
+
+    The file is split as raw bytes (see :func:`split_bytes`), so files in any encoding
+    declared by a PEP 263 comment or byte order mark are supported. Progress is logged
+    at DEBUG, so that large runs are not slowed down by per-file logging.
+
+    Args:
+        input_file_path (str): Path to the input Python file.
+        output_directory (str): Directory to save the output files.
+        barecode_extension (str): File extension for the bare code file.
+        docstring_extension (str): File extension for the docstring file.
+        cache (Optional[ManifestCache]): Manifest used to skip unchanged inputs. The caller
+            is responsible for saving it.
+        low_memory (bool): Memory-map the input and stream the bare code out in chunks
+            instead of holding the whole file (see :mod:`segmented_docstring.lowmem`).
+
+    Returns:
+        Optional[FileStats]: What was done, or None if ``cache`` showed the outputs are up to date.
+
+    Raises:
+        FileReadError: If there's an error reading the input file.
+        ParseError: If there's an error parsing the Python source.
+        FileSaveError: If there's an error saving the output files.
+    """
+    barecode_path, docstring_path = output_paths(input_file_path, output_directory,
+                                                 barecode_extension, docstring_extension)
+    if cache is not None and cache.is_fresh([input_file_path], [barecode_path, docstring_path]):
+        logger.debug("Skipping unchanged file: %s", input_file_path)
+        return None
+
+    logger.debug("Splitting file: %s", input_file_path)
 
     try:
-        with open(barecode_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(barecode_lines))
-        logger.info("Bare code saved to: %s", barecode_path)
-
-        # Remove extra indentation for placeholder docstrings
-        cleaned_docstring_lines = []
-        for line in docstring_lines:
-            if line.strip().startswith('"""<placeholder>'):
-                cleaned_docstring_lines.append(line.lstrip())
+        with profile_file(input_file_path):
+            if low_memory:
+                from .lowmem import split_file_streaming
+                split = split_file_streaming
             else:
-                cleaned_docstring_lines.append(line)
-
-        with open(docstring_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(cleaned_docstring_lines))
-        logger.info("Docstrings saved to: %s", docstring_path)
+                split = _split_in_memory
+            written, docstrings = split(input_file_path, barecode_path, docstring_path)
     except IOError as e:
         logger.error("Error saving output files: %s", e)
         raise FileSaveError(f"Error saving output files: {e}") from e
+    if barecode_path in written:
+        logger.debug("Bare code saved to: %s", barecode_path)
+    if docstring_path in written:
+        logger.debug("Docstrings saved to: %s", docstring_path)
+
+    if cache is not None:
+        cache.record([input_file_path], [barecode_path, docstring_path])
+    logger.debug("File split successfully")
+    return FileStats(docstrings, file_size(input_file_path),
+                     file_size(barecode_path, docstring_path), len(written))
+
+def _split_in_memory(input_file_path: str, barecode_path: str,
+                     docstring_path: str) -> Tuple[List[str], int]:
+    """Read and split a whole file and write both outputs, returning the paths written and count."""
+    try:
+        with profile_phase('read'), open(input_file_path, 'rb') as file:
+            data = file.read()
+    except IOError as e:
+        logger.error("Error reading input file: %s", e)
+        raise FileReadError(f"Error reading input file: {e}") from e
+
+    barecode, docstrings, count = _split(data)
+    with profile_phase('write'):
+        return write_files([(barecode_path, barecode), (docstring_path, docstrings)]), count
+
+def split_many(items: Iterable[Union[str, os.PathLike, Tuple[str, Source]]],
+               output_directory: Optional[str] = None,
+               config: Optional[dict] = None) -> Iterator[SplitResult]:
+    """
+    Split many sources in one call, yielding the results as they are produced.
+
+    Each item is either the path of a Python file, which is read from disk and split
+    like :func:`split_bytes`, or a ``(name, source)`` tuple holding text or raw bytes
+    in memory; ``name`` is only used to name the outputs. A failing item does not stop
+    the batch: its result carries the error instead. Per-item progress is logged at
+    DEBUG and one summary at INFO.
+
+    Args:
+        items (Iterable[Union[str, os.PathLike, Tuple[str, Source]]]): Paths or
+            ``(name, source)`` tuples.
+        output_directory (Optional[str]): If given, the outputs are also written there
+            (created if needed); otherwise results are only returned.
+        config (Optional[dict]): Configuration dictionary, for the output extensions.
+            Defaults to the default configuration.
+
+    Yields:
+        SplitResult: The bare code and docstring sidecar, or the error, of each item in order.
+    """
+    config = config or DEFAULT_CONFIG
+    barecode_extension = config['barecode_extension']
+    docstring_extension = config['docstring_extension']
+    if output_directory is not None:
+        os.makedirs(output_directory, exist_ok=True)
+
+    count = failed = 0
+    for item in items:
+        count += 1
+        if isinstance(item, tuple):
+            name, source = item
+        else:
+            name = os.fspath(item)
+            source = None
+        logger.debug("Splitting %s", name)
+        try:
+            if source is None:
+                try:
+                    with open(name, 'rb') as file:
+                        source = file.read()
+                except IOError as e:
+                    raise FileReadError(f"Error reading input file: {e}") from e
+            if isinstance(source, bytes):
+                barecode, docstrings = split_bytes(source)
+            else:
+                barecode, docstrings = split_source(source)
+            if output_directory is not None:
+                barecode_path, docstring_path = output_paths(
+                    name, output_directory, barecode_extension, docstring_extension)
+                try:
+                    write_files([(barecode_path, barecode), (docstring_path, docstrings)])
+                except IOError as e:
+                    raise FileSaveError(f"Error saving output files: {e}") from e
+        except SplitterError as e:
+            failed += 1
+            logger.debug("Failed to split %s: %s", name, e)
+            yield SplitResult(name, None, None, e)
+            continue
+        yield SplitResult(name, barecode, docstrings, None)
 
-    logger.info("File split successfully")
+    logger.info("Split %d source(s), %d failed", count, failed)
 
 __version__ = "0.1.9"
@@ -0,0 +1,192 @@
+"""
+stats.py
+
+This module measures docstrings without splitting anything: how many modules,
+classes and functions have a docstring, how much of each file's size the
+docstrings take up, and which docstrings are the largest.
+
+It uses the same span table as the splitter, so a coverage report costs one
+parse per file, and, in the daemon, where the shared parse cache is on, none
+for sources a split has already seen.
+"""
+
+import ast
+import os
+from typing import Any, Dict, Iterable, List, NamedTuple
+
+from colored_custom_logger import CustomLogger
+from .parsecache import get_shared_cache
+from .profiling import profile_phase
+from .spans import DocstringSpan, decode_source, find_docstring_spans
+
+logger = CustomLogger.get_logger("stats")
+
+# Number of largest docstrings kept per file and listed in a report.
+DEFAULT_LARGEST = 10
+
+class StatsError(Exception):
+    """Raised when a file cannot be read or parsed for statistics."""
+    pass
+
+class DocstringSize(NamedTuple):
+    """The size in bytes of one docstring, including its quotes and indentation."""
+    path: str
+    qualname: str
+    kind: str
+    line: int
+    bytes: int
+
+class FileCoverage(NamedTuple):
+    """
+    Docstring statistics of one file.
+
+    ``definitions`` counts the module, classes and functions, ``documented`` those
+    with a docstring and ``missing`` lists the qualified names of the others.
+    ``bytes`` is the size of the source and ``docstring_bytes`` the part of it that
+    splitting moves to the docstring file, both in UTF-8. ``largest`` holds the
+    file's largest docstrings, largest first.
+    """
+    path: str
+    definitions: int
+    documented: int
+    missing: List[str]
+    bytes: int
+    docstring_bytes: int
+    largest: List[DocstringSize]
+
+def source_coverage(source: str, path: str = '<source>',
+                    largest: int = DEFAULT_LARGEST) -> FileCoverage:
+    """
+    Compute the docstring statistics of Python source held in memory.
+
+    An empty module does not count as a definition.
+
+    Args:
+        source (str): The Python source.
+        path (str): The name to report the source under.
+        largest (int): How many of the largest docstrings to keep.
+
+    Returns:
+        FileCoverage: The statistics of the source.
+
+    Raises:
+        StatsError: If the source cannot be parsed.
+    """
+    try:
+        spans = _spans(source)
+    except SyntaxError as e:
+        raise StatsError(f"Error parsing Python source: {e}") from e
+
+    with profile_phase('stats'):
+        missing: List[str] = []
+        sizes: List[DocstringSize] = []
+        definitions = 0
+        for span in spans:
+            if span.kind == 'Module' and not source.strip():
+                continue
+            definitions += 1
+            if span.docstring is None:
+                missing.append(span.qualname)
+            else:
+                size = len(source[span.start:span.end].encode('utf-8', 'surrogatepass'))
+                sizes.append(DocstringSize(path, span.qualname, span.kind, max(span.lineno, 1),
+                                           size))
+        sizes.sort(key=lambda size: -size.bytes)
+        total = len(source.encode('utf-8', 'surrogatepass'))
+        return FileCoverage(path, definitions, len(sizes), missing, total,
+                            sum(size.bytes for size in sizes), sizes[:largest])
+
+def file_coverage(path: str, largest: int = DEFAULT_LARGEST) -> FileCoverage:
+    """
+    Compute the docstring statistics of a Python file.
+
+    The file is decoded in the encoding it declares (PEP 263 comment or byte order
+    mark, UTF-8 otherwise); sizes are still counted in UTF-8.
+
+    Args:
+        path (str): Path to the Python file.
+        largest (int): How many of the largest docstrings to keep.
+
+    Returns:
+        FileCoverage: The statistics of the file.
+
+    Raises:
+        StatsError: If the file cannot be read or parsed.
+    """
+    try:
+        with profile_phase('read'), open(path, 'rb') as f:
+            source = decode_source(f.read())
+    except (OSError, SyntaxError, UnicodeDecodeError) as e:
+        raise StatsError(f"Error reading file: {e}") from e
+    coverage = source_coverage(source, path, largest)
+    logger.debug("%s: %d of %d definitions documented",
+                 path, coverage.documented, coverage.definitions)
+    return coverage
+
+def summarize(coverages: Iterable[FileCoverage], root: str, largest: int = DEFAULT_LARGEST,
+              errors: Iterable[Any] = ()) -> Dict[str, Any]:
+    """
+    Build a report from the statistics of many files.
+
+    Files are grouped into packages by their directory relative to ``root``
+    (``.`` for files directly in it); a package does not include its subpackages.
+
+    Args:
+        coverages (Iterable[FileCoverage]): The statistics of each file.
+        root (str): The directory the report is about.
+        largest (int): How many of the largest docstrings to list.
+        errors (Iterable[Any]): ``(path, message)`` pairs of files that could not be measured.
+
+    Returns:
+        Dict[str, Any]: A JSON-serializable report with a ``summary``, per-``packages``
+            and per-``files`` statistics, the ``largest`` docstrings and any ``errors``.
+    """
+    files = sorted(coverages, key=lambda coverage: coverage.path)
+    packages: Dict[str, List[FileCoverage]] = {}
+    for coverage in files:
+        package = os.path.relpath(os.path.dirname(coverage.path) or '.', root).replace(os.sep, '/')
+        packages.setdefault(package, []).append(coverage)
+    biggest = sorted((size for coverage in files for size in coverage.largest),
+                     key=lambda size: (-size.bytes, size.path, size.line))[:largest]
+    return {
+        'summary': _totals(files),
+        'packages': [dict(path=package, **_totals(members))
+                     for package, members in sorted(packages.items())],
+        'files': [_file_record(coverage) for coverage in files],
+        'largest': [size._asdict() for size in biggest],
+        'errors': [{'path': path, 'error': error} for path, error in errors],
+    }
+
+def _totals(coverages: List[FileCoverage]) -> Dict[str, Any]:
+    """Add up the statistics of ``coverages``; percentages are rounded to two decimals."""
+    definitions = sum(coverage.definitions for coverage in coverages)
+    documented = sum(coverage.documented for coverage in coverages)
+    size = sum(coverage.bytes for coverage in coverages)
+    docstring_bytes = sum(coverage.docstring_bytes for coverage in coverages)
+    return {
+        'files': len(coverages),
+        'definitions': definitions,
+        'documented': documented,
+        'coverage': round(100 * documented / definitions, 2) if definitions else 100.0,
+        'bytes': size,
+        'docstring_bytes': docstring_bytes,
+        'docstring_share': round(100 * docstring_bytes / size, 2) if size else 0.0,
+    }
+
+def _file_record(coverage: FileCoverage) -> Dict[str, Any]:
+    """Describe one file in a report."""
+    record = dict(path=coverage.path, **_totals([coverage]), missing=coverage.missing)
+    del record['files']
+    return record
+
+def _spans(source: str) -> List[DocstringSpan]:
+    """Locate the docstrings of ``source`` through the shared parse cache, if any."""
+    cache = get_shared_cache()
+    if cache is not None:
+        return cache.spans(source)
+    with profile_phase('parse'):
+        tree = ast.parse(source)
+    with profile_phase('visit'):
+        return find_docstring_spans(source, tree)
+
+__version__ = '0.1.0'
@@ -0,0 +1,254 @@
+"""
+verify.py
+
+This module checks that splitting and recombining a source file is lossless:
+the file is split and combined by the same engine ``split`` and ``combine``
+use, on its raw bytes, and the result must be AST-equivalent to the original,
+ignoring formatting, or, in exact mode, identical to it byte for byte.
+
+Equivalence is decided by comparing a SHA-256 fingerprint of each tree, so no
+text diff is ever computed; a description of the first difference is only
+worked out for files that fail.
+"""
+
+import ast
+import hashlib
+import os
+import tempfile
+from inspect import cleandoc
+from typing import Dict, List, Optional, Tuple
+
+from colored_custom_logger import CustomLogger
+from .combiner import combine_bytes, combine_source, CombinerError
+from .lowmem import combine_files_streaming, split_file_streaming
+from .parsecache import get_shared_cache
+from .spans import (DEFINITION_TYPES, DocstringSpan, Source, decode_source, find_docstring_spans,
+                    has_lone_carriage_returns)
+from .splitter import split_bytes, split_source, SplitterError
+
+logger = CustomLogger.get_logger("verify")
+
+# Attributes that only record formatting: positions, and the ``u`` prefix of strings.
+_IGNORED_FIELDS = frozenset(('kind',))
+# Pushed on the walk stack to close a node or list; distinct from any AST value.
+_END = object()
+
+class VerifyError(Exception):
+    """Raised when a file cannot be verified at all, e.g. because it does not parse."""
+    pass
+
+def ast_fingerprint(tree: ast.AST) -> str:
+    """
+    Compute a fingerprint of a syntax tree that ignores formatting.
+
+    Positions and string prefixes are ignored, and docstrings are compared after
+    ``inspect.cleandoc``, as the sidecar stores them. The tree is not modified.
+
+    Args:
+        tree (ast.AST): The tree to fingerprint.
+
+    Returns:
+        str: A hex digest; equal trees give equal digests.
+    """
+    parts: List[str] = []
+    append = parts.append
+    docstrings: Dict[int, str] = {}
+    stack: List[object] = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ast.AST):
+            if node.__class__ in DEFINITION_TYPES and node.body:
+                first = node.body[0]
+                if (first.__class__ is ast.Expr and first.value.__class__ is ast.Constant
+                        and first.value.value.__class__ is str):
+                    docstrings[id(first.value)] = cleandoc(first.value.value)
+            append(node.__class__.__name__)
+            if id(node) in docstrings:
+                append(repr(docstrings[id(node)]))
+                continue
+            append('(')
+            stack.append(_END)
+            for field in reversed(node._fields):
+                if field not in _IGNORED_FIELDS:
+                    stack.append(getattr(node, field, None))
+        elif node.__class__ is list:
+            append('[')
+            stack.append(_END)
+            stack.extend(reversed(node))
+        elif node is _END:
+            append(')')
+        else:
+            append(repr(node))
+    return hashlib.sha256('\x00'.join(parts).encode('utf-8', 'surrogatepass')).hexdigest()
+
+def verify_source(source: str, legacy: bool = False, exact: bool = False) -> Optional[str]:
+    """
+    Split and recombine source in memory and compare the result with the original.
+
+    Args:
+        source (str): The Python source.
+        legacy (bool): Round-trip through a legacy name-keyed sidecar instead of the
+            current format, to find what that format would lose.
+        exact (bool): Also require the result to be identical to ``source``, formatting
+            included.
+
+    Returns:
+        Optional[str]: None if the result is AST-equivalent (and identical, if ``exact``),
+            otherwise a description of the first difference.
+
+    Raises:
+        VerifyError: If the source itself cannot be parsed.
+    """
+    return _verify(source, legacy, exact)
+
+def verify_bytes(data: bytes, legacy: bool = False, exact: bool = False) -> Optional[str]:
+    """
+    Split and recombine the raw bytes of a file in memory, as ``split`` and ``combine`` do.
+
+    The round trip goes through :func:`~segmented_docstring.splitter.split_bytes` and
+    :func:`~segmented_docstring.combiner.combine_bytes`, so it covers the source's
+    encoding, byte order mark and line endings.
+
+    Args:
+        data (bytes): The raw Python source.
+        legacy (bool): Round-trip through a legacy name-keyed sidecar.
+        exact (bool): Also require the result to be identical to ``data``, byte for byte.
+
+    Returns:
+        Optional[str]: None if the round trip is lossless, otherwise a description of
+            the first difference.
+
+    Raises:
+        VerifyError: If the source cannot be decoded or parsed.
+    """
+    return _verify(data, legacy, exact)
+
+def _verify(source: Source, legacy: bool, exact: bool, path: Optional[str] = None) -> Optional[str]:
+    """Verify text or raw bytes, or the file at ``path`` with the low-memory engine."""
+    cache = get_shared_cache()
+    try:
+        tree = cache.tree(source) if cache is not None else ast.parse(source)
+    except (SyntaxError, ValueError) as e:
+        raise VerifyError(f"Source does not parse: {e}") from e
+    try:
+        if path is not None:
+            combined = _round_trip_file(path, source, tree, legacy)
+        else:
+            combined = _round_trip(source, tree, legacy)
+    except SplitterError as e:
+        raise VerifyError(f"Source does not parse: {e}") from e
+    except CombinerError as e:
+        return f"Combining failed: {e}"
+    try:
+        combined_tree = ast.parse(combined)
+    except (SyntaxError, ValueError) as e:
+        return f"Combined source does not parse: {e}"
+
+    if ast_fingerprint(combined_tree) != ast_fingerprint(tree):
+        return _describe_difference(source, tree, combined, combined_tree)
+    if exact and combined != source:
+        return _describe_formatting_difference(source, combined)
+    return None
+
+def _round_trip(source: Source, tree: ast.Module, legacy: bool) -> Source:
+    """Split and combine text or raw bytes in memory."""
+    if source.__class__ is bytes:
+        barecode, docstrings = split_bytes(source)
+        combine = combine_bytes
+    else:
+        barecode, docstrings = split_source(source)
+        combine = combine_source
+    if legacy:
+        docstrings = _legacy_sidecar(source, tree)
+    return combine(barecode, docstrings)
+
+def _round_trip_file(path: str, data: bytes, tree: ast.Module, legacy: bool) -> bytes:
+    """Split and combine a file with the low-memory engine, through a temporary directory."""
+    with tempfile.TemporaryDirectory(prefix='segmented-verify-') as directory:
+        barecode_path = os.path.join(directory, 'module.bare.py')
+        docstring_path = os.path.join(directory, 'module.doc.py')
+        output_path = os.path.join(directory, 'module.py')
+        split_file_streaming(path, barecode_path, docstring_path)
+        if legacy:
+            with open(docstring_path, 'w', encoding='utf-8') as f:
+                f.write(_legacy_sidecar(data, tree))
+        combine_files_streaming(barecode_path, docstring_path, output_path)
+        with open(output_path, 'rb') as f:
+            return f.read()
+
+def _legacy_sidecar(source: Source, tree: ast.Module) -> str:
+    """Write the docstrings of ``source`` in the legacy name-keyed format."""
+    return repr({span.name: span.docstring for span in _spans(source, tree)
+                 if span.docstring is not None})
+
+def _spans(source: Source, tree: ast.Module) -> List[DocstringSpan]:
+    """Find docstring spans, decoding raw bytes whose line offsets cannot be computed."""
+    if source.__class__ is bytes and has_lone_carriage_returns(source):
+        source = decode_source(source)
+    return find_docstring_spans(source, tree)
+
+def _describe_formatting_difference(source: Source, combined: Source) -> str:
+    """Name the first line that differs between two equivalent sources."""
+    lines = source.splitlines(keepends=True)
+    combined_lines = combined.splitlines(keepends=True)
+    for number, (line, combined_line) in enumerate(zip(lines, combined_lines), 1):
+        if line != combined_line:
+            return f"Formatting of line {number} changed"
+    return (f"Length differs: {len(lines)} lines in the original, "
+            f"{len(combined_lines)} after combining")
+
+def _describe_difference(source: Source, tree: ast.Module, combined: Source,
+                         combined_tree: ast.Module) -> str:
+    """Name the first docstring that differs between two trees, if the code itself matches."""
+    expected = _docstring_table(source, tree)
+    actual = _docstring_table(combined, combined_tree)
+    for (qualname, docstring), (_, combined_docstring) in zip(expected, actual):
+        if docstring != combined_docstring:
+            if combined_docstring is None:
+                return f"Docstring of {qualname} was dropped"
+            if docstring is None:
+                return f"{qualname} gained a docstring"
+            return f"Docstring of {qualname} changed"
+    if len(expected) != len(actual):
+        return f"Definitions differ: {len(expected)} in the original, {len(actual)} after combining"
+    return "Code differs from the original"
+
+def _docstring_table(source: Source, tree: ast.Module) -> List[Tuple[str, Optional[str]]]:
+    return [(span.qualname, span.docstring) for span in _spans(source, tree)]
+
+def verify_file(path: str, legacy: bool = False, exact: bool = False,
+                low_memory: bool = False) -> Optional[str]:
+    """
+    Verify that a file survives a split and combine round trip.
+
+    The file's raw bytes are round-tripped like :func:`verify_bytes` does, or, with
+    ``low_memory``, by the engine of :mod:`segmented_docstring.lowmem`, so what is
+    verified is what ``split`` and ``combine`` write.
+
+    Args:
+        path (str): Path to the Python file.
+        legacy (bool): Round-trip through a legacy name-keyed sidecar.
+        exact (bool): Also require the file to come back identical, byte for byte.
+        low_memory (bool): Round-trip the file with the low-memory engine.
+
+    Returns:
+        Optional[str]: None if the round trip is lossless, otherwise a description of
+            the first difference.
+
+    Raises:
+        VerifyError: If the file cannot be read or parsed.
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        raise VerifyError(f"Error reading file: {e}") from e
+    try:
+        result = _verify(data, legacy, exact, path if low_memory else None)
+    except OSError as e:
+        raise VerifyError(f"Error round-tripping file: {e}") from e
+    if result is None:
+        logger.debug("Verified: %s", path)
+    return result
+
+__version__ = '0.1.0'
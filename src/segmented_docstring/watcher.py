@@ -0,0 +1,254 @@
+"""
+watcher.py
+
+This module implements watch mode: a resident process that re-splits or
+re-combines only the files that change in a directory tree.
+
+Filesystem notifications are used when the optional ``watchdog`` package is
+installed; otherwise the tree is polled. Either way, paths are filtered with the
+same ``.gitignore`` and exclude rules as ``split`` and ``combine`` use.
+"""
+
+import os
+import queue
+import threading
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Set, Tuple
+
+from colored_custom_logger import CustomLogger
+from .cache import ManifestCache
+from .combiner import combine_files, docstring_path_for, output_path, CombinerError
+from .discovery import LAYOUTS, IgnoreMatcher, find_pairs, find_sources, output_directory_for
+from .parsecache import enable_shared_cache
+from .splitter import split_file, SplitterError
+
+logger = CustomLogger.get_logger("watcher")
+
+WATCH_MODES = ('split', 'combine')
+# Notification types that can change a file's contents. Open and close-without-write
+# events are ignored, otherwise reading an input would trigger processing it again.
+CHANGE_EVENT_TYPES = ('created', 'modified', 'moved', 'deleted')
+
+class WatchError(Exception):
+    """Raised when a directory cannot be watched."""
+    pass
+
+class Watcher:
+    """
+    Watch a directory and split or combine files as they change.
+
+    Changes are debounced: a batch is processed once no further change has
+    been seen for ``debounce`` seconds, so an editor saving a file several
+    times in quick succession triggers a single run.
+    """
+
+    def __init__(self, directory: str, output_directory: str, config: dict, mode: str = 'split',
+                 recursive: bool = True, debounce: float = 0.2, poll_interval: float = 1.0,
+                 use_notifications: bool = True, cache: Optional[ManifestCache] = None,
+                 layout: str = 'flat', excludes: Sequence[str] = ()):
+        """
+        Args:
+            directory (str): Directory to watch.
+            output_directory (str): Directory to write outputs to.
+            config (dict): Configuration dictionary.
+            mode (str): ``'split'`` to split changed ``.py`` files, or ``'combine'`` to
+                combine changed bare code/docstring pairs.
+            recursive (bool): Whether to watch subdirectories.
+            debounce (float): Seconds without changes before a batch is processed.
+            poll_interval (float): Seconds between scans when polling.
+            use_notifications (bool): Use filesystem notifications if available.
+            cache (Optional[ManifestCache]): Manifest used to skip unchanged inputs.
+            layout (str): ``'flat'`` to write every output to ``output_directory``, or
+                ``'mirror'`` to recreate the watched tree under it.
+            excludes (Sequence[str]): More patterns to ignore, in ``.gitignore`` syntax,
+                relative to ``directory``, on top of ``.gitignore`` files and the
+                configured ``exclude`` patterns.
+
+        Raises:
+            WatchError: If the directory does not exist, or the mode or layout is unknown.
+        """
+        if not os.path.isdir(directory):
+            raise WatchError(f"{directory} is not a valid directory")
+        if mode not in WATCH_MODES:
+            raise WatchError(f"Unknown watch mode: {mode}")
+        if layout not in LAYOUTS:
+            raise WatchError(f"Unknown output layout: {layout}")
+        self.directory = directory
+        self.output_directory = output_directory
+        self.mode = mode
+        self.recursive = recursive
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_notifications = use_notifications
+        self.cache = cache
+        self.layout = layout
+        self.config = config
+        self.excludes = excludes
+        self.ignore = IgnoreMatcher(directory, config, excludes)
+        self.barecode_extension = config['barecode_extension']
+        self.docstring_extension = config['docstring_extension']
+
+    def is_relevant(self, path: str) -> bool:
+        """
+        Check whether a changed path should trigger processing in this mode.
+
+        Args:
+            path (str): The changed path.
+
+        Returns:
+            bool: True if the path is an input for the current mode.
+        """
+        is_output = path.endswith((self.barecode_extension, self.docstring_extension))
+        if self.mode == 'split':
+            return path.endswith('.py') and not is_output
+        return is_output
+
+    def is_watched(self, path: str) -> bool:
+        """
+        Check whether a changed path is relevant and not ignored.
+
+        Args:
+            path (str): The changed path.
+
+        Returns:
+            bool: True if the path is an input for the current mode that a directory
+                run would process.
+        """
+        return self.is_relevant(path) and not self.ignore.is_ignored(path)
+
+    def snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """
+        Scan the watched directory, skipping ignored paths like a directory run does.
+
+        Returns:
+            Dict[str, Tuple[int, int]]: ``(mtime_ns, size)`` of every relevant file.
+        """
+        result = {}
+        for path in self._inputs():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            result[path] = (st.st_mtime_ns, st.st_size)
+        return result
+
+    def _inputs(self) -> Iterator[str]:
+        """Yield the inputs of the current mode found in the watched directory."""
+        if self.mode == 'split':
+            yield from find_sources(self.directory, self.config, self.recursive, self.excludes)
+            return
+        for barecode_file, docstring_file in find_pairs(self.directory, self.config, self.recursive,
+                                                        self.excludes):
+            yield barecode_file
+            if docstring_file is not None:
+                yield docstring_file
+
+    def process(self, paths: Iterable[str]) -> None:
+        """
+        Split or combine the files affected by a batch of changed paths.
+
+        Args:
+            paths (Iterable[str]): Changed paths; irrelevant, ignored or deleted paths are skipped.
+        """
+        targets: Set[str] = set()
+        for path in paths:
+            if not self.is_watched(path):
+                continue
+            if self.mode == 'combine' and path.endswith(self.docstring_extension):
+                path = path[:-len(self.docstring_extension)] + self.barecode_extension
+            targets.add(path)
+
+        for path in sorted(targets):
+            if not os.path.exists(path):
+                continue
+            try:
+                output_directory = output_directory_for(path, self.directory, self.output_directory,
+                                                        self.layout)
+                if self.layout == 'mirror':
+                    os.makedirs(output_directory, exist_ok=True)
+                if self.mode == 'split':
+                    split_file(path, output_directory, self.barecode_extension,
+                               self.docstring_extension, cache=self.cache)
+                else:
+                    docstring_file = docstring_path_for(path, self.barecode_extension,
+                                                        self.docstring_extension)
+                    if not os.path.exists(docstring_file):
+                        logger.warning("Docstring file not found for: %s", path)
+                        continue
+                    combine_files(path, docstring_file,
+                                  output_path(path, output_directory, self.barecode_extension),
+                                  cache=self.cache)
+            except (SplitterError, CombinerError, OSError) as e:
+                logger.error("Error processing %s: %s", path, e)
+        if self.cache is not None:
+            self.cache.save()
+
+    def run(self, stop_event: Optional[threading.Event] = None) -> None:
+        """
+        Watch until ``stop_event`` is set (or forever if not given).
+
+        Args:
+            stop_event (Optional[threading.Event]): Event that stops the watcher.
+        """
+        stop_event = stop_event or threading.Event()
+        enable_shared_cache()
+        events: 'queue.Queue[str]' = queue.Queue()
+        observer = self._start_observer(events) if self.use_notifications else None
+        snapshot = self.snapshot() if observer is None else {}
+        logger.info("Watching %s (%s mode, %s)", self.directory, self.mode,
+                    "notifications" if observer is not None else "polling")
+
+        pending: Set[str] = set()
+        try:
+            while not stop_event.is_set():
+                if observer is None:
+                    current = self.snapshot()
+                    for path in _changed_paths(snapshot, current):
+                        events.put(path)
+                    snapshot = current
+                try:
+                    timeout = self.debounce if pending else self.poll_interval
+                    pending.add(events.get(timeout=timeout))
+                    while True:
+                        pending.add(events.get_nowait())
+                except queue.Empty:
+                    if pending:
+                        logger.debug("Processing %d changed file(s)", len(pending))
+                        self.process(pending)
+                        pending.clear()
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+
+    def _start_observer(self, events: 'queue.Queue[str]'):
+        """Start a ``watchdog`` observer feeding ``events``, or return None if unavailable."""
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            logger.debug("watchdog is not installed; falling back to polling")
+            return None
+
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory or event.event_type not in CHANGE_EVENT_TYPES:
+                    return
+                for path in (event.src_path, getattr(event, 'dest_path', '')):
+                    if path and watcher.is_watched(path):
+                        events.put(path)
+
+        observer = Observer()
+        observer.schedule(Handler(), self.directory, recursive=self.recursive)
+        observer.start()
+        return observer
+
+def _changed_paths(before: Dict[str, Tuple[int, int]],
+                   after: Dict[str, Tuple[int, int]]) -> Set[str]:
+    """Return the paths added, removed or modified between two snapshots."""
+    changed = {path for path, stat in after.items() if before.get(path) != stat}
+    changed.update(path for path in before if path not in after)
+    return changed
+
+__version__ = '0.1.0'
@@ -0,0 +1,249 @@
+"""
+writer.py
+
+This module provides the output layer shared by the splitter and combiner.
+
+Outputs whose contents have not changed are left untouched, so repeated runs do
+not bump modification times and retrigger downstream builds. Changed outputs are
+written to a temporary file next to the target and renamed into place, and the
+files of a pair are only renamed once all of them have been written, so an
+interrupted run never leaves a truncated or half-updated pair behind.
+
+A rewritten file keeps its permissions, and an output that is a symbolic link
+is written through: the file it points to is replaced, not the link.
+"""
+
+import os
+import stat
+import tempfile
+import threading
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+from colored_custom_logger import CustomLogger
+
+logger = CustomLogger.get_logger("writer")
+
+# Contents of an output: text, bytes, or an iterable of text or bytes chunks.
+Contents = Union[str, bytes, Iterable[Union[str, bytes]]]
+
+# The process umask, read by _umask() on the first write of a new file.
+_UMASK: Optional[int] = None
+_UMASK_LOCK = threading.Lock()
+
+def encode_text(text: str) -> bytes:
+    """
+    Encode text as it would be written by ``open(path, 'w', encoding='utf-8')``.
+
+    Args:
+        text (str): The text to encode.
+
+    Returns:
+        bytes: UTF-8 bytes with newlines translated to the platform line separator.
+    """
+    if os.linesep != '\n':
+        text = text.replace('\n', os.linesep)
+    return text.encode('utf-8')
+
+def is_unchanged(path: str, data: bytes) -> bool:
+    """
+    Check whether a file already holds exactly ``data``.
+
+    The size is compared first, so the file is only read when it could match.
+
+    Args:
+        path (str): Path to the file.
+        data (bytes): The contents about to be written.
+
+    Returns:
+        bool: True if the file exists with identical contents.
+    """
+    try:
+        if os.stat(path).st_size != len(data):
+            return False
+        with open(path, 'rb') as f:
+            return f.read() == data
+    except OSError:
+        return False
+
+def _same_contents(path: str, other_path: str) -> bool:
+    """Compare two files chunk by chunk, without reading either one whole."""
+    try:
+        if os.stat(path).st_size != os.stat(other_path).st_size:
+            return False
+        with open(path, 'rb') as f, open(other_path, 'rb') as other:
+            while True:
+                chunk = f.read(1 << 16)
+                if chunk != other.read(1 << 16):
+                    return False
+                if not chunk:
+                    return True
+    except OSError:
+        return False
+
+def file_size(*paths: str) -> int:
+    """
+    Return the combined size of files on disk.
+
+    Args:
+        *paths (str): The files; missing files count as empty.
+
+    Returns:
+        int: The total size in bytes.
+    """
+    total = 0
+    for path in paths:
+        try:
+            total += os.stat(path).st_size
+        except OSError:
+            pass
+    return total
+
+def make_directories(directories: Iterable[str]) -> None:
+    """
+    Create the directories that do not exist yet, with their parents.
+
+    Meant to be called once before a batch is written: every directory is created
+    at most once, however many outputs it receives.
+
+    Args:
+        directories (Iterable[str]): Directories to create; duplicates are ignored.
+
+    Raises:
+        OSError: If a directory cannot be created.
+    """
+    for directory in sorted(set(directories)):
+        os.makedirs(directory, exist_ok=True)
+
+def _umask() -> int:
+    """
+    Return the process umask, reading it the first time it is needed.
+
+    Linux reports it in ``/proc/self/status``. Elsewhere it can only be read by
+    setting it, which briefly changes it for every thread, so that is done once.
+    """
+    global _UMASK
+    if _UMASK is None:
+        with _UMASK_LOCK:
+            if _UMASK is None:
+                _UMASK = _read_umask()
+    return _UMASK
+
+def _read_umask() -> int:
+    try:
+        with open('/proc/self/status', 'r', encoding='ascii', errors='replace') as f:
+            for line in f:
+                if line.startswith('Umask:'):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+def _temporary_file(target: str) -> Tuple[int, str]:
+    """
+    Create a temporary file next to ``target``, with the permissions ``target`` should have.
+
+    The name is unique, so threads and processes writing the same target never share
+    a temporary file. An existing target's permissions are copied; a new file gets
+    the permissions ``open()`` would give it.
+
+    Args:
+        target (str): The file the temporary file will be renamed to.
+
+    Returns:
+        Tuple[int, str]: An open file descriptor and the path of the temporary file.
+    """
+    directory, name = os.path.split(target)
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{name}.', suffix='.tmp', dir=directory or '.')
+    try:
+        try:
+            mode = stat.S_IMODE(os.stat(target).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_umask()
+        os.chmod(tmp_path, mode)
+    except BaseException:
+        os.close(fd)
+        os.remove(tmp_path)
+        raise
+    return fd, tmp_path
+
+def write_files(outputs: Sequence[Tuple[str, Contents]]) -> List[str]:
+    """
+    Write a group of files atomically, skipping the ones that are unchanged.
+
+    Every changed file is first written to a temporary file in its target directory;
+    the temporary files are renamed into place only after all of them were written.
+    A target that is a symbolic link is resolved first, so the link is kept and the
+    file it points to is updated.
+    Contents given as an iterable of chunks are streamed to the temporary file and
+    compared with the existing file afterwards, so they are never held whole.
+
+    Args:
+        outputs (Sequence[Tuple[str, Contents]]): ``(path, text)`` pairs to write, where
+            ``text`` is a string (encoded with :func:`encode_text`), bytes written as they
+            are, or an iterable of such chunks.
+
+    Returns:
+        List[str]: The paths that were actually written.
+
+    Raises:
+        OSError: If a file cannot be written. No target is modified if writing a
+            temporary file fails, and no temporary file is left behind. Errors
+            raised by a chunk iterable propagate the same way.
+    """
+    pending = []
+    renamed = 0
+    try:
+        for path, text in outputs:
+            target = os.path.realpath(path)
+            if isinstance(text, (str, bytes)):
+                data = encode_text(text) if isinstance(text, str) else text
+                if is_unchanged(target, data):
+                    logger.debug("Unchanged, not rewriting: %s", path)
+                    continue
+                fd, tmp_path = _temporary_file(target)
+                pending.append((tmp_path, target, path))
+                with open(fd, 'wb') as f:
+                    f.write(data)
+            else:
+                fd, tmp_path = _temporary_file(target)
+                pending.append((tmp_path, target, path))
+                with open(fd, 'wb') as f:
+                    for chunk in text:
+                        f.write(chunk if isinstance(chunk, bytes) else encode_text(chunk))
+                if _same_contents(tmp_path, target):
+                    logger.debug("Unchanged, not rewriting: %s", path)
+                    pending.pop()
+                    os.remove(tmp_path)
+        for tmp_path, target, _ in pending:
+            os.replace(tmp_path, target)
+            renamed += 1
+    except BaseException:
+        # Chunk iterables may raise their own errors; never leave temporary files behind.
+        for tmp_path, _, _ in pending[renamed:]:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        raise
+    return [path for _, _, path in pending]
+
+def write_file(path: str, text: Contents) -> bool:
+    """
+    Write a file atomically unless it already holds ``text``.
+
+    Args:
+        path (str): Path to the file.
+        text (Contents): The contents to write, as text, bytes or an iterable of text or
+            bytes chunks.
+
+    Returns:
+        bool: True if the file was written, False if it was unchanged.
+
+    Raises:
+        OSError: If the file cannot be written.
+    """
+    return bool(write_files([(path, text)]))
+
+__version__ = '0.1.0'
@@ -0,0 +1,80 @@
+# tests/test_aio.py
+
+import unittest
+import asyncio
+import os
+import tempfile
+import shutil
+import sys
+from os.path import abspath, dirname, join
+
+# Add the src directory to the Python path
+sys.path.insert(0, abspath(join(dirname(__file__), '..', 'src')))
+
+from segmented_docstring.aio import (async_split_file, async_combine_files, async_split_directory,
+                                     async_combine_directory)
+from segmented_docstring.splitter import ParseError
+
+SOURCE = 'def func():\n    """Function docstring."""\n    return 1\n'
+CONFIG = {'barecode_extension': '.bare.py', 'docstring_extension': '.doc.py'}
+
+class TestAio(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.source_dir = os.path.join(self.temp_dir, 'src')
+        self.split_dir = os.path.join(self.temp_dir, 'split')
+        self.output_dir = os.path.join(self.temp_dir, 'out')
+        for directory in (self.source_dir, self.split_dir, self.output_dir):
+            os.mkdir(directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, name, content):
+        path = os.path.join(self.source_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_split_and_combine_file(self):
+        path = self._write('mod.py', SOURCE)
+        barecode = os.path.join(self.split_dir, 'mod.bare.py')
+        docstrings = os.path.join(self.split_dir, 'mod.doc.py')
+        output = os.path.join(self.output_dir, 'mod.py')
+
+        async def run():
+            return (await async_split_file(path, self.split_dir, '.bare.py', '.doc.py'),
+                    await async_combine_files(barecode, docstrings, output))
+
+        split_stats, combine_stats = asyncio.run(run())
+        self.assertEqual((split_stats.docstrings, combine_stats.docstrings), (1, 1))
+        with open(output, 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), SOURCE)
+
+    def test_split_file_propagates_errors(self):
+        path = self._write('bad.py', 'def (:\n')
+        with self.assertRaises(ParseError):
+            asyncio.run(async_split_file(path, self.split_dir, '.bare.py', '.doc.py'))
+
+    def test_directories_round_trip_and_collect_errors(self):
+        for i in range(5):
+            self._write(f'mod{i}.py', SOURCE)
+        bad = self._write('bad.py', 'def (:\n')
+
+        self.split_dir = os.path.join(self.split_dir, 'new')
+        results = asyncio.run(async_split_directory(self.source_dir, self.split_dir, CONFIG, limit=2))
+        self.assertEqual(len(results), 6)
+        self.assertEqual([path for path, error in results if error], [bad])
+
+        output_dir = os.path.join(self.output_dir, 'new', 'nested')
+        results = asyncio.run(async_combine_directory(self.split_dir, output_dir, CONFIG, limit=2))
+        self.assertEqual([error for _, error in results], [None] * 5)
+        with open(os.path.join(output_dir, 'mod3.py'), 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), SOURCE)
+
+    def test_invalid_limit(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(async_split_directory(self.source_dir, self.split_dir, CONFIG, limit=0))
+
+if __name__ == '__main__':
+    unittest.main()
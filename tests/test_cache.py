@@ -0,0 +1,93 @@
+# tests/test_cache.py
+
+import unittest
+from unittest.mock import patch
+import json
+import os
+import tempfile
+import shutil
+import sys
+from os.path import abspath, dirname, join
+
+# Add the src directory to the Python path
+sys.path.insert(0, abspath(join(dirname(__file__), '..', 'src')))
+
+from segmented_docstring.cache import ManifestCache, CACHE_FILE_NAME, GENERATOR
+from segmented_docstring.splitter import split_file
+
+class TestManifestCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_file = os.path.join(self.temp_dir, "input.py")
+        self.output_file = os.path.join(self.temp_dir, "output.py")
+        self._write(self.input_file, "def func():\n    pass\n")
+        self._write(self.output_file, "output")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, path, content):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def test_unrecorded_input_is_not_fresh(self):
+        cache = ManifestCache(self.temp_dir)
+        self.assertFalse(cache.is_fresh([self.input_file], [self.output_file]))
+
+    def test_recorded_input_is_fresh_after_reload(self):
+        cache = ManifestCache(self.temp_dir)
+        cache.record([self.input_file], [self.output_file])
+        cache.save()
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir, CACHE_FILE_NAME)))
+
+        reloaded = ManifestCache(self.temp_dir)
+        self.assertTrue(reloaded.is_fresh([self.input_file], [self.output_file]))
+
+    def test_touched_but_identical_input_is_fresh(self):
+        cache = ManifestCache(self.temp_dir)
+        cache.record([self.input_file], [self.output_file])
+        st = os.stat(self.input_file)
+        os.utime(self.input_file, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        self.assertTrue(cache.is_fresh([self.input_file], [self.output_file]))
+
+    def test_changed_input_is_not_fresh(self):
+        cache = ManifestCache(self.temp_dir)
+        cache.record([self.input_file], [self.output_file])
+        self._write(self.input_file, "def other():\n    pass\n")
+        self.assertFalse(cache.is_fresh([self.input_file], [self.output_file]))
+
+    def test_missing_output_is_not_fresh(self):
+        cache = ManifestCache(self.temp_dir)
+        cache.record([self.input_file], [self.output_file])
+        os.remove(self.output_file)
+        self.assertFalse(cache.is_fresh([self.input_file], [self.output_file]))
+
+    def test_corrupt_manifest_is_ignored(self):
+        self._write(os.path.join(self.temp_dir, CACHE_FILE_NAME), "not json")
+        cache = ManifestCache(self.temp_dir)
+        self.assertEqual(cache.entries, {})
+
+    def test_manifest_from_another_version_is_ignored(self):
+        cache = ManifestCache(self.temp_dir)
+        cache.record([self.input_file], [self.output_file])
+        cache.save()
+        path = os.path.join(self.temp_dir, CACHE_FILE_NAME)
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(data['generator'], GENERATOR)
+
+        data['generator'] = dict(GENERATOR, sidecar=GENERATOR['sidecar'] - 1)
+        self._write(path, json.dumps(data))
+        reloaded = ManifestCache(self.temp_dir)
+        self.assertFalse(reloaded.is_fresh([self.input_file], [self.output_file]))
+
+    def test_split_file_skips_unchanged_input(self):
+        cache = ManifestCache(self.temp_dir)
+        split_file(self.input_file, self.temp_dir, ".bare.py", ".doc.py", cache=cache)
+
+        with patch('segmented_docstring.splitter.open') as mock_open:
+            split_file(self.input_file, self.temp_dir, ".bare.py", ".doc.py", cache=cache)
+        mock_open.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,12 +8,15 @@ import unittest
 from unittest.mock import patch, MagicMock
 import sys
 from pathlib import Path
-from io import StringIO
+from io import BytesIO, StringIO, TextIOWrapper
+import tempfile
+import shutil
 
 # Add the src directory to the Python path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
 
-from segmented_docstring.cli import main
+from segmented_docstring.cli import main, PARALLEL_THRESHOLD
+from segmented_docstring.splitter import SplitterError
 from segmented_docstring.config import DEFAULT_CONFIG
 
 class TestCLI(unittest.TestCase):
@@ -28,36 +31,37 @@ class TestCLI(unittest.TestCase):
 
     @patch('segmented_docstring.cli.split_file')
     @patch('segmented_docstring.cli.Path.is_dir')
-    @patch('segmented_docstring.cli.Path.glob')
+    @patch('segmented_docstring.cli.find_sources')
     @patch('segmented_docstring.cli.read_config')
-    def test_split_directory(self, mock_read_config, mock_glob, mock_is_dir, mock_split_file):
+    def test_split_directory(self, mock_read_config, mock_find_sources, mock_is_dir, mock_split_file):
         mock_read_config.return_value = DEFAULT_CONFIG
         mock_is_dir.return_value = True
-        mock_glob.return_value = [Path('test1.py'), Path('test2.py')]
+        mock_find_sources.return_value = ['test1.py', 'test2.py']
         main(['split', 'testdir'])
         self.assertEqual(mock_split_file.call_count, 2)
+        mock_find_sources.assert_called_once_with('testdir', DEFAULT_CONFIG, False, [])
 
     @patch('segmented_docstring.cli.split_file')
     @patch('segmented_docstring.cli.Path.is_dir')
-    @patch('segmented_docstring.cli.Path.rglob')
+    @patch('segmented_docstring.cli.find_sources')
     @patch('segmented_docstring.cli.read_config')
-    def test_split_recursive(self, mock_read_config, mock_rglob, mock_is_dir, mock_split_file):
+    def test_split_recursive(self, mock_read_config, mock_find_sources, mock_is_dir, mock_split_file):
         mock_read_config.return_value = DEFAULT_CONFIG
         mock_is_dir.return_value = True
-        mock_rglob.return_value = [Path('test1.py'), Path('subdir/test2.py')]
-        main(['split', 'testdir', '-r'])
+        mock_find_sources.return_value = ['test1.py', 'subdir/test2.py']
+        main(['split', 'testdir', '-r', '--exclude', 'build/'])
         self.assertEqual(mock_split_file.call_count, 2)
+        mock_find_sources.assert_called_once_with('testdir', DEFAULT_CONFIG, True, ['build/'])
 
     @patch('segmented_docstring.cli.combine_files')
     @patch('segmented_docstring.cli.Path.is_dir')
-    @patch('segmented_docstring.cli.Path.glob')
+    @patch('segmented_docstring.cli.find_pairs')
     @patch('segmented_docstring.cli.read_config')
-    def test_combine(self, mock_read_config, mock_glob, mock_is_dir, mock_combine_files):
+    def test_combine(self, mock_read_config, mock_find_pairs, mock_is_dir, mock_combine_files):
         mock_read_config.return_value = DEFAULT_CONFIG
         mock_is_dir.return_value = True
-        mock_glob.return_value = [Path('test.barecode.py')]
-        with patch('segmented_docstring.cli.Path.exists', return_value=True):
-            main(['combine', 'testdir'])
+        mock_find_pairs.return_value = [('test.barecode.py', 'test.docstring.py'), ('orphan.barecode.py', None)]
+        main(['combine', 'testdir'])
         mock_combine_files.assert_called_once()
 
     @patch('sys.stderr', new_callable=StringIO)
@@ -89,7 +93,109 @@ class TestCLI(unittest.TestCase):
         mock_read_config.return_value = DEFAULT_CONFIG
         mock_is_file.return_value = True
         main(['-v', 'split', 'test.py'])
-        mock_print.assert_any_call("Verbose mode enabled")
+        mock_print.assert_any_call("Verbose mode enabled", file=sys.stderr)
+
+    @patch('sys.stderr', new_callable=StringIO)
+    @patch('segmented_docstring.cli.split_file')
+    @patch('segmented_docstring.cli.Path.is_dir')
+    @patch('segmented_docstring.cli.find_sources')
+    @patch('segmented_docstring.cli.read_config')
+    def test_split_directory_failures_exit_nonzero(self, mock_read_config, mock_find_sources, mock_is_dir,
+                                                   mock_split_file, mock_stderr):
+        mock_read_config.return_value = DEFAULT_CONFIG
+        mock_is_dir.return_value = True
+        mock_find_sources.return_value = ['good.py', 'bad.py', 'good2.py']
+        mock_split_file.side_effect = [None, SplitterError("boom"), None]
+        with self.assertRaises(SystemExit) as cm:
+            main(['split', 'testdir', '-j', '1'])
+        self.assertEqual(cm.exception.code, 1)
+        self.assertEqual(mock_split_file.call_count, 3)
+        self.assertIn("1 file(s) failed to split", mock_stderr.getvalue())
+
+    @patch('sys.stderr', new_callable=StringIO)
+    @patch('segmented_docstring.cli.read_config')
+    def test_invalid_jobs(self, mock_read_config, mock_stderr):
+        mock_read_config.return_value = DEFAULT_CONFIG
+        temp_dir = tempfile.mkdtemp()
+        try:
+            with self.assertRaises(SystemExit):
+                main(['split', temp_dir, '-j', '0'])
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        self.assertIn("Invalid number of jobs", mock_stderr.getvalue())
+
+    @patch('segmented_docstring.cli.read_config')
+    def test_split_directory_parallel(self, mock_read_config):
+        mock_read_config.return_value = DEFAULT_CONFIG
+        temp_dir = tempfile.mkdtemp()
+        try:
+            source = Path(temp_dir) / 'src'
+            output = Path(temp_dir) / 'out'
+            source.mkdir()
+            output.mkdir()
+            count = PARALLEL_THRESHOLD + 2
+            for i in range(count):
+                (source / f'mod{i}.py').write_text(f'def func{i}():\n    """Doc {i}."""\n    return {i}\n')
+            main(['split', str(source), '-o', str(output), '-j', '2'])
+            self.assertEqual(len(list(output.glob('*.barecode.py'))), count)
+            self.assertEqual(len(list(output.glob('*.docstring.py'))), count)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    @patch('segmented_docstring.cli.read_config')
+    def test_mirror_layout_round_trip(self, mock_read_config):
+        mock_read_config.return_value = DEFAULT_CONFIG
+        temp_dir = tempfile.mkdtemp()
+        try:
+            source = Path(temp_dir) / 'src'
+            for package in ('a', 'b'):
+                (source / package).mkdir(parents=True)
+                (source / package / 'utils.py').write_text(f'def {package}():\n    """Doc {package}."""\n    return 1\n')
+            (source / 'top.py').write_text('X = 1\n')
+            split_output = Path(temp_dir) / 'split'
+            combined = Path(temp_dir) / 'combined'
+
+            main(['split', str(source), '-r', '-o', str(split_output), '--layout', 'mirror'])
+            self.assertTrue((split_output / 'top.barecode.py').exists())
+            self.assertEqual((split_output / 'b' / 'utils.barecode.py').read_text(), 'def b():\n    return 1\n')
+            main(['combine', str(split_output), '-r', '-o', str(combined), '--layout', 'mirror'])
+            for relative in ('top.py', 'a/utils.py', 'b/utils.py'):
+                self.assertEqual((combined / relative).read_text(), (source / relative).read_text())
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    @patch('segmented_docstring.cli.read_config')
+    def test_split_and_combine_streams(self, mock_read_config):
+        mock_read_config.return_value = DEFAULT_CONFIG
+        source = b'def func():\n    """Function docstring."""\n    return 1\n'
+        temp_dir = tempfile.mkdtemp()
+        try:
+            docstring_path = str(Path(temp_dir) / 'docs.json')
+            # Streams carry raw bytes: the source's encoding and byte order mark are kept.
+            latin1 = '# coding: latin-1\ndef f():\n    """Café."""\n    return "é"\n'.encode('latin-1')
+            for data, expected in ((source, b'def func():\n    return 1\n'),
+                                   (b'\xef\xbb\xbf' + source, b'\xef\xbb\xbfdef func():\n    return 1\n'),
+                                   (latin1, '# coding: latin-1\ndef f():\n    return "é"\n'.encode('latin-1'))):
+                stdout = TextIOWrapper(BytesIO(), encoding='utf-8')
+                with patch('sys.stdin', TextIOWrapper(BytesIO(data), encoding='utf-8')), patch('sys.stdout', stdout):
+                    main(['split', '-', '--docstring-out', docstring_path])
+                barecode = stdout.buffer.getvalue()
+                self.assertEqual(barecode, expected)
+
+                stdout = TextIOWrapper(BytesIO(), encoding='utf-8')
+                with patch('sys.stdin', TextIOWrapper(BytesIO(barecode), encoding='utf-8')), patch('sys.stdout', stdout):
+                    main(['combine', '-', '--docstrings', docstring_path])
+                self.assertEqual(stdout.buffer.getvalue(), data)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    @patch('sys.stderr', new_callable=StringIO)
+    @patch('segmented_docstring.cli.read_config')
+    def test_split_stream_requires_docstring_out(self, mock_read_config, mock_stderr):
+        mock_read_config.return_value = DEFAULT_CONFIG
+        with patch('sys.stdin', StringIO('x = 1\n')), self.assertRaises(SystemExit):
+            main(['split', '-'])
+        self.assertIn("--docstring-out is required", mock_stderr.getvalue())
 
 if __name__ == '__main__':
     unittest.main()
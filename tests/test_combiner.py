@@ -4,6 +4,8 @@ test_combiner.py
 This module contains unit tests for the combine_files function in the combiner module.
 """
 import unittest
+import ast
+import json
 import os
 import tempfile
 import shutil
@@ -14,7 +16,8 @@ from os.path import abspath, dirname, join
 # Add the src directory to the Python path
 sys.path.insert(0, abspath(join(dirname(__file__), '..', 'src')))
 
-from segmented_docstring.combiner import combine_files, FileReadError, FileSaveError, DocstringMismatchError
+from segmented_docstring.combiner import combine_bytes, combine_files, combine_many, combine_source, FileReadError, FileSaveError, DocstringMismatchError
+from segmented_docstring.splitter import split_bytes, split_source
 
 class TestCombiner(unittest.TestCase):
     def setUp(self):
@@ -98,6 +101,208 @@ class TestClass:
         
         # The combination should succeed, but a warning should be logged
 
+    def test_combine_files_versioned_sidecar(self):
+        barecode_content = '''class A:
+    def __init__(self):
+        pass
+
+class B:
+    async def __init__(self,
+                        value):
+        pass
+'''
+        docstring_content = json.dumps({
+            "format": "segmented-docstring",
+            "version": 2,
+            "docstrings": [
+                {"qualname": "A", "kind": "ClassDef", "line": 2, "column": 0, "indent": 4, "docstring": None},
+                {"qualname": "A.__init__", "kind": "FunctionDef", "line": 3, "column": 0, "indent": 8,
+                 "docstring": "Init A."},
+                {"qualname": "B.__init__", "kind": "AsyncFunctionDef", "line": 8, "column": 0, "indent": 8,
+                 "docstring": "Init B.\n\nDetails."},
+            ],
+        })
+
+        with open(self.barecode_file, 'w', encoding='utf-8') as f:
+            f.write(barecode_content)
+        with open(self.docstring_file, 'w', encoding='utf-8') as f:
+            f.write(docstring_content)
+
+        combine_files(self.barecode_file, self.docstring_file, self.output_file)
+
+        with open(self.output_file, 'r', encoding='utf-8') as f:
+            combined_content = f.read()
+
+        expected_content = '''class A:
+    def __init__(self):
+        """Init A."""
+        pass
+
+class B:
+    async def __init__(self,
+                        value):
+        """Init B.
+
+        Details."""
+        pass
+'''
+        self.assertEqual(combined_content, expected_content)
+
+    def test_combine_files_versioned_sidecar_out_of_range(self):
+        with open(self.barecode_file, 'w', encoding='utf-8') as f:
+            f.write("def func():\n    pass\n")
+        with open(self.docstring_file, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"format": "segmented-docstring", "version": 2, "docstrings": [
+                {"qualname": "func", "kind": "FunctionDef", "line": 40, "column": 0, "indent": 4,
+                 "docstring": "Function docstring."}]}))
+
+        with self.assertRaises(DocstringMismatchError):
+            combine_files(self.barecode_file, self.docstring_file, self.output_file)
+
+    def test_combine_legacy_sidecar_definitions(self):
+        barecode = (
+            '@dec\n'
+            'async def fetch(a,\n'
+            '                b) -> int:\n'
+            '    # comment\n'
+            '    return a\n'
+            '\n'
+            'class Outer:\n'
+            '    class Inner:\n'
+            '        def method(self):\n'
+            '        def other(self): return 1\n'
+        )
+        docstrings = repr({"fetch": "Fetch.", "Outer": "Outer.", "Outer.Inner": "Inner.",
+                           "method": "Method.", "other": "Other."})
+
+        expected = (
+            '@dec\n'
+            'async def fetch(a,\n'
+            '                b) -> int:\n'
+            '    """Fetch."""\n'
+            '    # comment\n'
+            '    return a\n'
+            '\n'
+            'class Outer:\n'
+            '    """Outer."""\n'
+            '    class Inner:\n'
+            '        """Inner."""\n'
+            '        def method(self):\n'
+            '            """Method."""\n'
+            '        def other(self): """Other."""; return 1\n'
+        )
+        self.assertEqual(combine_source(barecode, docstrings), expected)
+
+    def test_combine_many_pairs_and_sources(self):
+        source = 'def func():\n    """Function docstring."""\n    return 1\n'
+        barecode, docstrings = split_source(source)
+        with open(self.barecode_file, 'w', encoding='utf-8') as f:
+            f.write(barecode)
+        with open(self.docstring_file, 'w', encoding='utf-8') as f:
+            f.write(docstrings)
+        output_dir = os.path.join(self.temp_dir, "out")
+        config = {'barecode_extension': ".bare.py", 'docstring_extension': ".doc.py"}
+
+        results = list(combine_many([(self.barecode_file, self.docstring_file),
+                                     ("memory.bare.py", barecode, docstrings),
+                                     ("broken.bare.py", barecode, "not a sidecar")], output_dir, config))
+
+        self.assertEqual([r.source for r in results[:2]], [source.encode(), source])
+        self.assertIsInstance(results[2].error, FileReadError)
+        self.assertEqual(sorted(os.listdir(output_dir)), ["memory.py", "test_input.py"])
+
+    def test_combine_bytes(self):
+        source = '# coding: latin-1\r\nclass A:\r\n    """Café.\r\n\r\n    More."""\r\n    x = 1\r\n'.encode('latin-1')
+        barecode, docstrings = split_bytes(source)
+        self.assertEqual(combine_bytes(barecode, docstrings), source)
+
+        # Characters the encoding lacks are escaped, which keeps the docstring's value.
+        combined = combine_bytes(barecode, docstrings.replace('Café.', 'Costs €5.'))
+        self.assertIn(b'    """Costs \\u20ac5.\r\n', combined)
+        self.assertEqual(ast.get_docstring(ast.parse(combined).body[0]), 'Costs €5.\n\nMore.')
+
+        legacy = combine_bytes('# coding: latin-1\ndef f():\n    return "é"\n'.encode('latin-1'),
+                               '{"f": "Fonction é."}')
+        self.assertEqual(legacy.decode('latin-1'),
+                         '# coding: latin-1\ndef f():\n    """Fonction é."""\n    return "é"\n')
+        with self.assertRaises(FileReadError):
+            combine_bytes(b'# coding: no-such-codec\nx = 1\n', docstrings)
+
+    def test_split_then_combine_is_byte_identical(self):
+        source = ('\ufeff#!/usr/bin/env python\r\n'
+                  "r'''Module with a raw docstring: \\d+.'''\r\n"
+                  'class A:\r\n'
+                  '    """\r\n'
+                  '    Summary.\r\n'
+                  '\r\n'
+                  '    Details.\r\n'
+                  '    """\r\n'
+                  "    def f(self): 'Inline.'  # comment\r\n"
+                  '    def g(self):\r\n'
+                  '        """Tabbed\tand \\u00e9scaped.   """\r\n'
+                  '        return 1\r\n').encode('utf-8')
+        barecode, docstrings = split_bytes(source)
+        self.assertEqual(combine_bytes(barecode, docstrings), source)
+        text = source.decode('utf-8-sig').replace('\r\n', '\n')
+        self.assertEqual(combine_source(*split_source(text)), text)
+
+        # An edited docstring is rendered anew, keeping its quotes and layout.
+        edited = combine_bytes(barecode, docstrings.replace('Summary.', 'New summary.'))
+        self.assertEqual(edited, source.replace(b'Summary.', b'New summary.'))
+        edited = combine_bytes(barecode, docstrings.replace('\\\\d+.', 'digits.'))
+        self.assertIn(b"r'''Module with a raw docstring: digits.'''\r\n", edited)
+
+    def test_edited_docstrings_reparse(self):
+        source = ("# coding: latin-1\nr'''Raw \\d+.'''\ndef f():\n    \"\"\"Doc f.\"\"\"\n"
+                  "    def g(): 'Doc g.'; return 1\n").encode('latin-1')
+        barecode, docstrings = split_bytes(source)
+        data = json.loads(docstrings)
+        new = ['Raw \\d+ and "quotes" \'\'\' \\', 'see C:\\new\\table', 'both """ and \'\'\' €']
+        for entry, docstring in zip(data['docstrings'], new):
+            entry['docstring'] = docstring
+        for combined in (combine_bytes(barecode, json.dumps(data)),
+                         combine_source(barecode.decode('latin-1'), json.dumps(data))):
+            tree = ast.parse(combined)
+            functions = [node for node in ast.walk(tree) if isinstance(node, ast.FunctionDef)]
+            self.assertEqual([ast.get_docstring(node) for node in [tree] + functions], new)
+
+    def test_inline_docstring_before_statement(self):
+        source = 'def f(): """Doc f."""; return 1\nclass A:\n    "Doc A." ;  x = 1\n'
+        barecode, docstrings = split_source(source)
+        self.assertEqual(combine_source(barecode, docstrings), source)
+        # The replacement also edits ``A``'s recorded original text, which keeps its spacing.
+        edited = combine_source(barecode, docstrings.replace('Doc f.', 'New f.').replace('Doc A.', 'New A.'))
+        self.assertEqual(edited, 'def f(): """New f."""; return 1\nclass A:\n    "New A." ;  x = 1\n')
+        self.assertEqual(combine_bytes(*split_bytes(source.encode('utf-8'))), source.encode('utf-8'))
+
+    def test_inline_docstring_before_continuation(self):
+        source = ('class A:\n    """Doc A.""";  \\\n      x = 1\n'
+                  'def f(): "Doc f." \\\n  ; \\\n  return 1\n')
+        barecode, docstrings = split_source(source)
+        self.assertEqual(barecode, 'class A:\n    x = 1\ndef f(): return 1\n')
+        self.assertEqual(combine_source(barecode, docstrings), source)
+        data = source.replace('\n', '\r\n').encode('utf-8')
+        self.assertEqual(combine_bytes(*split_bytes(data)), data)
+        # An edited docstring is rendered anew, without the continuation.
+        data = json.loads(docstrings)
+        data['docstrings'][1]['docstring'] = 'New A.'
+        edited = combine_source(barecode, json.dumps(data))
+        self.assertEqual(edited, source.replace('"""Doc A.""";  \\\n      ', '"""New A."""; '))
+
+    def test_combine_many_keeps_the_source_encoding(self):
+        source = '# coding: latin-1\ndef f():\n    """Café."""\n    return "é"\n'.encode('latin-1')
+        barecode, docstrings = split_bytes(source)
+        with open(self.barecode_file, 'wb') as f:
+            f.write(barecode)
+        with open(self.docstring_file, 'w', encoding='utf-8') as f:
+            f.write(docstrings)
+        results = list(combine_many([(self.barecode_file, self.docstring_file), ("mem.py", barecode, docstrings)]))
+        self.assertEqual([r.source for r in results], [source, source])
+
+    def test_combine_many_missing_input(self):
+        results = list(combine_many([(self.barecode_file, self.docstring_file)]))
+        self.assertIsNone(results[0].source)
+        self.assertIsInstance(results[0].error, FileReadError)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,158 @@
+# tests/test_daemon.py
+
+import unittest
+import base64
+import logging
+import os
+import tempfile
+import shutil
+import sys
+import threading
+import time
+from io import BytesIO, StringIO, TextIOWrapper
+from unittest.mock import patch
+from os.path import abspath, dirname, join
+
+# Add the src directory to the Python path
+sys.path.insert(0, abspath(join(dirname(__file__), '..', 'src')))
+
+from segmented_docstring import cli
+from segmented_docstring.cli import _strip_daemon_options, main
+from segmented_docstring.config import DEFAULT_CONFIG
+from segmented_docstring.daemon import ConfigCache, Daemon, DaemonError
+
+SOURCE = 'def func():\n    """Function docstring."""\n    return 1\n'
+
+@unittest.skipUnless(hasattr(__import__('socket'), 'AF_UNIX'), "requires Unix domain sockets")
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.temp_dir, 'd.sock')
+        with open(os.path.join(self.temp_dir, 'mod.py'), 'w', encoding='utf-8') as f:
+            f.write(SOURCE)
+        os.mkdir(os.path.join(self.temp_dir, 'out'))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _start(self):
+        daemon = Daemon(self.socket_path)
+        daemon.start()
+        stop = threading.Event()
+        thread = threading.Thread(target=daemon.serve, args=(stop,))
+        thread.start()
+
+        def shutdown():
+            stop.set()
+            thread.join()
+        return daemon, shutdown
+
+    def test_execute_runs_like_a_client_process(self):
+        daemon = Daemon(self.socket_path)
+        cwd = os.getcwd()
+        response = daemon.execute({'argv': ['split', 'mod.py', '-o', 'out'], 'cwd': self.temp_dir})
+        self.assertEqual(response['status'], 0)
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir, 'out', 'mod.barecode.py')))
+
+        response = daemon.execute({'argv': ['split', '-', '--docstring-out', 'docs.json'],
+                                   'cwd': self.temp_dir, 'stdin': base64.b64encode(SOURCE.encode()).decode()})
+        self.assertEqual(base64.b64decode(response['stdout']), b'def func():\n    return 1\n')
+        self.assertEqual(os.getcwd(), cwd)
+        response = daemon.execute({'argv': ['split', '-'], 'cwd': self.temp_dir, 'stdin': 'not base64!'})
+        self.assertEqual(response['status'], 2)
+
+    def test_execute_reports_errors_and_restores_state(self):
+        daemon = Daemon(self.socket_path)
+        level = logging.getLogger('cli').level
+        response = daemon.execute({'argv': ['-v', 'split', 'missing.py'], 'cwd': self.temp_dir})
+        self.assertEqual(response['status'], 1)
+        self.assertEqual(response['stdout'], '')
+        self.assertIn("Verbose mode enabled", response['stderr'])
+        self.assertIn("missing.py is not a valid file", response['stderr'])
+        self.assertEqual(logging.getLogger('cli').level, level)
+
+        self.assertEqual(daemon.execute({'argv': ['watch', '.'], 'cwd': self.temp_dir})['status'], 2)
+        self.assertEqual(daemon.execute({'argv': ['split'], 'cwd': self.temp_dir})['status'], 2)
+        self.assertEqual(daemon.execute({'argv': 'split mod.py'})['status'], 2)
+
+    def test_config_cache_rereads_changed_files(self):
+        path = os.path.join(self.temp_dir, '.segmentedrc')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('[segmented_docstring]\nlayout = "mirror"\n')
+        cache = ConfigCache()
+        self.assertEqual(cache.read(path)['layout'], 'mirror')
+        with patch('segmented_docstring.daemon.read_config') as mock_read_config:
+            cache.read(path)
+            mock_read_config.assert_not_called()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('[segmented_docstring]\nlayout = "flat"\n')
+        os.utime(path, ns=(time.time_ns() + 10**9,) * 2)
+        self.assertEqual(cache.read(path)['layout'], 'flat')
+
+    @patch('segmented_docstring.cli.read_config')
+    def test_forwarding_over_the_socket(self, mock_read_config):
+        mock_read_config.return_value = DEFAULT_CONFIG
+        daemon, shutdown = self._start()
+        try:
+            self.assertIsNot(cli.read_config, mock_read_config)
+            with self.assertRaises(DaemonError):
+                Daemon(self.socket_path).start()
+
+            docstrings = os.path.join(self.temp_dir, 'docs.json')
+            # Raw bytes go both ways, so a source in another encoding is kept as it is.
+            source = '# coding: latin-1\n' + SOURCE.replace('Function', 'Fonction é')
+            stdin = TextIOWrapper(BytesIO(source.encode('latin-1')), encoding='utf-8')
+            stdout = TextIOWrapper(BytesIO(), encoding='utf-8')
+            with patch('sys.stdin', stdin), patch('sys.stdout', stdout):
+                main(['--via-daemon', '--socket', self.socket_path, 'split', '-', '--docstring-out', docstrings])
+            self.assertEqual(stdout.buffer.getvalue(), b'# coding: latin-1\ndef func():\n    return 1\n')
+            with open(docstrings, encoding='utf-8') as f:
+                self.assertIn('Fonction é', f.read())
+            self.assertEqual(daemon.requests, 1)
+
+            with patch('sys.stderr', new_callable=StringIO) as stderr, self.assertRaises(SystemExit) as cm:
+                main(['--via-daemon', f'--socket={self.socket_path}', 'split', join(self.temp_dir, 'missing.py')])
+            self.assertEqual(cm.exception.code, 1)
+            self.assertIn("is not a valid file", stderr.getvalue())
+        finally:
+            shutdown()
+        self.assertIs(cli.read_config, mock_read_config)
+        self.assertFalse(os.path.exists(self.socket_path))
+
+    @patch('segmented_docstring.cli.read_config')
+    def test_daemon_of_another_user_is_not_used(self, mock_read_config):
+        mock_read_config.return_value = DEFAULT_CONFIG
+        daemon, shutdown = self._start()
+        try:
+            output = os.path.join(self.temp_dir, 'out')
+            with patch('segmented_docstring.cli.socket_owner', return_value=os.getuid() + 1):
+                main(['--via-daemon', '--socket', self.socket_path, 'split', join(self.temp_dir, 'mod.py'),
+                      '-o', output])
+            self.assertEqual(daemon.requests, 0)
+            self.assertTrue(os.path.exists(os.path.join(output, 'mod.docstring.py')))
+        finally:
+            shutdown()
+
+    def test_socket_directory_is_private(self):
+        self.socket_path = os.path.join(self.temp_dir, 'run', 'd.sock')
+        daemon, shutdown = self._start()
+        shutdown()
+        self.assertEqual(os.stat(os.path.dirname(self.socket_path)).st_mode & 0o777, 0o700)
+        with patch('os.stat', return_value=os.stat_result((0o40700, 0, 0, 0, os.getuid() + 1) + (0,) * 5)):
+            with self.assertRaises(DaemonError):
+                Daemon(self.socket_path).start()
+
+    @patch('segmented_docstring.cli.read_config')
+    def test_runs_locally_without_a_daemon(self, mock_read_config):
+        mock_read_config.return_value = DEFAULT_CONFIG
+        output = os.path.join(self.temp_dir, 'out')
+        main(['--via-daemon', '--socket', self.socket_path, 'split', join(self.temp_dir, 'mod.py'), '-o', output])
+        self.assertTrue(os.path.exists(os.path.join(output, 'mod.docstring.py')))
+
+    def test_strip_daemon_options(self):
+        self.assertEqual(_strip_daemon_options(['-v', '--via-daemon', '--socket', 's', 'split', '--socket', 'x'],
+                                               'split'),
+                         ['-v', 'split', '--socket', 'x'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+# tests/test_discovery.py
+
+import unittest
+import os
+import tempfile
+import shutil
+import sys
+from os.path import abspath, dirname, join
+
+# Add the src directory to the Python path
+sys.path.insert(0, abspath(join(dirname(__file__), '..', 'src')))
+
+from segmented_docstring.config import DEFAULT_CONFIG
+from segmented_docstring.discovery import IgnoreRules, find_pairs, find_sources, output_directory_for
+
+class TestDiscovery(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _touch(self, *paths, content=''):
+        for path in paths:
+            full_path = os.path.join(self.temp_dir, path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+
+    def _sources(self, directory='', recursive=True, excludes=(), config=DEFAULT_CONFIG):
+        root = os.path.join(self.temp_dir, directory)
+        return [os.path.relpath(path, root).replace(os.sep, '/')
+                for path in find_sources(root, config, recursive, excludes)]
+
+    def test_skips_outputs_and_environment_directories(self):
+        self._touch('b.py', 'a.py', 'a.barecode.py', 'a.docstring.py', 'notes.txt',
+                    'pkg/mod.py', '.git/hooks/hook.py', 'node_modules/x/y.py', 'venv/lib/site.py',
+                    'env/pyvenv.cfg', 'env/lib/site.py', 'pkg/__pycache__/mod.py')
+        self.assertEqual(self._sources(), ['a.py', 'b.py', 'pkg/mod.py'])
+        self.assertEqual(self._sources(recursive=False), ['a.py', 'b.py'])
+
+    def test_gitignore_and_excludes(self):
+        self._touch('keep.py', 'gen_a.py', 'gen_keep.py', 'build/out.py', 'docs/conf.py',
+                    'pkg/local.py', 'pkg/deep/skip.py', 'pkg/deep/keep.py')
+        self._touch('.gitignore', content='# generated\ngen_*.py\n!gen_keep.py\nbuild/\n/docs\n')
+        self._touch('pkg/.gitignore', content='deep/skip.py\n')
+        self.assertEqual(self._sources(), ['gen_keep.py', 'keep.py', 'pkg/local.py', 'pkg/deep/keep.py'])
+        self.assertEqual(self._sources(excludes=['pkg/**', '!pkg/local.py']), ['gen_keep.py', 'keep.py', 'pkg/local.py'])
+        config = dict(DEFAULT_CONFIG, exclude=['keep.py'])
+        self.assertEqual(self._sources(config=config), ['gen_keep.py', 'pkg/local.py'])
+
+    def test_ancestor_gitignore_applies_inside_repository(self):
+        self._touch('.git/HEAD', '.gitignore', content='src/legacy/\n')
+        self._touch('src/new.py', 'src/legacy/old.py')
+        self.assertEqual(self._sources('src'), ['new.py'])
+        self.assertEqual(self._sources('src', excludes=['new.py']), [])
+
+    def test_find_pairs_from_one_listing(self):
+        self._touch('a.barecode.py', 'a.docstring.py', 'b.barecode.py', 'c.docstring.py',
+                    'sub/d.barecode.py', 'sub/d.docstring.py')
+        pairs = [(os.path.relpath(barecode, self.temp_dir), docstring and os.path.relpath(docstring, self.temp_dir))
+                 for barecode, docstring in find_pairs(self.temp_dir, DEFAULT_CONFIG)]
+        self.assertEqual(pairs, [('a.barecode.py', 'a.docstring.py'), ('b.barecode.py', None),
+                                 (join('sub', 'd.barecode.py'), join('sub', 'd.docstring.py'))])
+
+    def test_output_directory_for(self):
+        path = join('src', 'pkg', 'mod.py')
+        self.assertEqual(output_directory_for(path, 'src', 'out'), 'out')
+        self.assertEqual(output_directory_for(path, 'src', 'out', 'mirror'), join('out', 'pkg'))
+        self.assertEqual(output_directory_for(join('src', 'top.py'), 'src', 'out', 'mirror'), 'out')
+        with self.assertRaises(ValueError):
+            output_directory_for(path, 'src', 'out', 'nested')
+
+    def test_ignore_rules(self):
+        rules = IgnoreRules(['*.log', '!keep.log', 'tmp/', 'a/**/z', r'\#hash', 'dir/*.py'], base='pkg')
+        self.assertIsNone(rules.match('other/x.log', False))
+        self.assertTrue(rules.match('pkg/x/y.log', False))
+        self.assertFalse(rules.match('pkg/keep.log', False))
+        self.assertTrue(rules.match('pkg/tmp', True))
+        self.assertIsNone(rules.match('pkg/tmp', False))
+        self.assertTrue(rules.match('pkg/a/z', False))
+        self.assertTrue(rules.match('pkg/a/b/c/z', False))
+        self.assertTrue(rules.match('pkg/#hash', False))
+        self.assertTrue(rules.match('pkg/dir/m.py', False))
+        self.assertIsNone(rules.match('pkg/sub/dir/m.py', False))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+# tests/test_gitfilter.py
+
+import unittest
+import os
+import tempfile
+import shutil
+import sys
+from io import BytesIO
+from os.path import abspath, dirname, join
+
+# Add the src directory to the Python path
+sys.path.insert(0, abspath(join(dirname(__file__), '..', 'src')))
+
+from segmented_docstring.config import DEFAULT_CONFIG
+from segmented_docstring.gitfilter import GitFilter, GitFilterError, PktLineStream
+
+def pkt_text(*lines):
+    out = b''
+    for line in lines:
+        payload = f"{line}\n".encode('utf-8')
+        out += b'%04x' % (len(payload) + 4) + payload
+    return out + b'0000'
+
+def pkt_content(content):
+    return b'%04x' % (len(content) + 4) + content + b'0000' if content else b'0000'
+
+def read_all(data):
+    stream = PktLineStream(BytesIO(data), BytesIO())
+    packets = []
+    while True:
+        try:
+            packets.append(stream.read_packet())
+        except EOFError:
+            return packets
+
+HANDSHAKE = (pkt_text('git-filter-client', 'version=2')
+             + pkt_text('capability=clean', 'capability=smudge', 'capability=delay'))
+
+SOURCE = b'def func():\n    """Function docstring."""\n    return 1\n'
+BARECODE = b'def func():\n    return 1\n'
+
+class TestGitFilter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.old_cwd = os.getcwd()
+        os.chdir(self.temp_dir)
+
+    def tearDown(self):
+        os.chdir(self.old_cwd)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _run(self, requests):
+        writer = BytesIO()
+        GitFilter(DEFAULT_CONFIG, BytesIO(HANDSHAKE + requests), writer).run()
+        return read_all(writer.getvalue())
+
+    def test_handshake_negotiates_clean_and_smudge(self):
+        packets = self._run(b'')
+        self.assertEqual(packets, [b'git-filter-server\n', b'version=2\n', None,
+                                   b'capability=clean\n', b'capability=smudge\n', None])
+
+    def test_clean_writes_sidecar_and_returns_barecode(self):
+        packets = self._run(pkt_text('command=clean', 'pathname=mod.py') + pkt_content(SOURCE))
+        self.assertEqual(packets[6:], [b'status=success\n', None, BARECODE, None, None])
+        self.assertTrue(os.path.exists('mod.docstring.py'))
+
+    def test_smudge_combines_with_sidecar(self):
+        self._run(pkt_text('command=clean', 'pathname=mod.py') + pkt_content(SOURCE))
+        packets = self._run(pkt_text('command=smudge', 'pathname=mod.py') + pkt_content(BARECODE))
+        self.assertEqual(packets[6:], [b'status=success\n', None, SOURCE, None, None])
+
+    def test_invalid_source_reports_error(self):
+        packets = self._run(pkt_text('command=clean', 'pathname=bad.py') + pkt_content(b'def (:\n'))
+        self.assertEqual(packets[6:], [b'status=error\n', None])
+
+    def test_sidecars_pass_through(self):
+        packets = self._run(pkt_text('command=clean', 'pathname=mod.docstring.py') + pkt_content(b'{}'))
+        self.assertEqual(packets[6:], [b'status=success\n', None, b'{}', None, None])
+
+    def test_unsupported_handshake(self):
+        with self.assertRaises(GitFilterError):
+            GitFilter(DEFAULT_CONFIG, BytesIO(pkt_text('git-filter-client', 'version=1')), BytesIO()).run()
+
+    def test_large_content_is_split_into_packets(self):
+        stream = PktLineStream(BytesIO(), BytesIO())
+        content = b'x' * 70000
+        stream.write_content(content)
+        packets = read_all(stream.writer.getvalue())
+        self.assertEqual(len(packets), 3)
+        self.assertEqual(b''.join(packets[:2]), content)
+
+if __name__ == '__main__':
+    unittest.main()
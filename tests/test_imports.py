@@ -0,0 +1,44 @@
+# tests/test_imports.py
+
+import unittest
+import json
+import subprocess
+import sys
+from os.path import abspath, dirname, join
+
+SRC_DIR = abspath(join(dirname(__file__), '..', 'src'))
+
+# Modules that are only needed once a command actually runs.
+HEAVY_MODULES = ('ast', 'toml', 'concurrent.futures', 'colored_custom_logger', 'subprocess',
+                 'segmented_docstring.splitter', 'segmented_docstring.combiner',
+                 'segmented_docstring.gitfilter', 'segmented_docstring.watcher')
+
+def loaded_heavy_modules(code):
+    """Run ``code`` in a fresh interpreter and return the heavy modules it imported."""
+    script = (f"import sys\nsys.path.insert(0, {SRC_DIR!r})\n{code}\n"
+              f"import json\nprint(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))")
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+class TestImports(unittest.TestCase):
+    def test_package_import_is_lazy(self):
+        self.assertEqual(loaded_heavy_modules("import segmented_docstring"), [])
+
+    def test_cli_import_is_lazy(self):
+        self.assertEqual(loaded_heavy_modules("import segmented_docstring.cli"), [])
+
+    def test_help_does_not_load_engine(self):
+        code = ("from segmented_docstring.cli import main\n"
+                "try:\n    main(['--help'])\nexcept SystemExit:\n    pass")
+        self.assertEqual(loaded_heavy_modules(code), [])
+
+    def test_lazy_attributes_resolve(self):
+        import segmented_docstring
+        from segmented_docstring.splitter import split_source
+        self.assertIs(segmented_docstring.split_source, split_source)
+        self.assertIn('cli_main', dir(segmented_docstring))
+        with self.assertRaises(AttributeError):
+            segmented_docstring.missing_attribute
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+# tests/test_index.py
+
+import unittest
+import json
+import os
+import tempfile
+import shutil
+import sys
+from io import StringIO
+from unittest.mock import patch
+from os.path import abspath, dirname, join
+
+# Add the src directory to the Python path
+sys.path.insert(0, abspath(join(dirname(__file__), '..', 'src')))
+
+from segmented_docstring.cli import main
+from segmented_docstring.config import DEFAULT_CONFIG
+from segmented_docstring.index import DocstringIndex, SearchIndexError, open_index, read_sidecar, tokenize
+from segmented_docstring.splitter import split_source
+
+CLIENT = '''"""HTTP client helpers."""
+
+class Client:
+    """Talks to the remote service."""
+
+    def fetch(self, url):
+        """Download a resource over HTTP and return its body."""
+        return url
+
+    def close(self):
+        return None
+'''
+
+PARSER = '''def parse(text):
+    """Parse configuration text into a dictionary."""
+    return {}
+'''
+
+class TestIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.index_path = join(self.temp_dir, '.segmented-index')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _split(self, name, source):
+        barecode, docstrings = split_source(source)
+        paths = [join(self.temp_dir, f'{name}.barecode.py'), join(self.temp_dir, f'{name}.docstring.py')]
+        for path, text in zip(paths, (barecode, docstrings)):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+        return paths
+
+    def _update(self, index, *pairs):
+        changed, removed = index.changes(docstring for _, docstring in pairs)
+        barecode_for = {docstring: barecode for barecode, docstring in pairs}
+        for path in changed:
+            index.add(read_sidecar(path, barecode_for[path]))
+        for key in removed:
+            index.remove(key)
+        return changed, removed
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Client.fetch: split_file a URL"), ['client', 'fetch', 'split', 'file', 'url'])
+
+    def test_search_by_name_and_words(self):
+        client, parser = self._split('client', CLIENT), self._split('parser', PARSER)
+        index = DocstringIndex.load(self.index_path)
+        self._update(index, client, parser)
+
+        self.assertEqual([(r.qualname, r.line) for r in index.search('fetch')], [('Client.fetch', 5)])
+        self.assertEqual([r.qualname for r in index.search('client.FETCH', names_only=True)], ['Client.fetch'])
+        self.assertEqual([(r.qualname, r.kind) for r in index.search('http')],
+                         [('module', 'Module'), ('Client.fetch', 'FunctionDef')])
+        self.assertEqual(len(index.search('http', limit=1)), 1)
+        self.assertEqual([r.qualname for r in index.search('dictionary configuration')], ['parse'])
+        self.assertEqual(index.search('download dictionary'), [])
+        self.assertEqual(index.search('close'), [])
+        self.assertEqual(os.path.basename(index.search('parse')[0].path), 'parser.barecode.py')
+
+    def test_incremental_update_and_persistence(self):
+        client, parser = self._split('client', CLIENT), self._split('parser', PARSER)
+        index = DocstringIndex.load(self.index_path)
+        self._update(index, client, parser)
+        self.assertTrue(index.save())
+        self.assertFalse(index.save())
+
+        index = DocstringIndex.load(self.index_path)
+        self.assertEqual(self._update(index, client, parser), ([], []))
+        os.remove(parser[1])
+        self._split('client', CLIENT.replace('remote service', 'upstream mirror'))
+        os.utime(client[1], ns=(1, 1))
+        changed, removed = self._update(index, client)
+        self.assertEqual((changed, removed), ([client[1]], ['parser.docstring.py']))
+        self.assertEqual(index.search('parse'), [])
+        self.assertEqual([r.qualname for r in index.search('upstream')], ['Client'])
+        index.save()
+
+        reloaded = open_index(self.index_path)
+        self.assertIs(open_index(self.index_path), reloaded)
+        self.assertEqual(len(reloaded), 3)
+        self.assertEqual(index.search('remote'), [])
+        self.assertEqual([r.qualname for r in reloaded.search('upstream')], ['Client'])
+
+    def test_legacy_sidecars_and_errors(self):
+        legacy = join(self.temp_dir, 'old.docstring.py')
+        with open(legacy, 'w', encoding='utf-8') as f:
+            f.write("{'helper': 'Helps with legacy things.'}")
+        indexed = read_sidecar(legacy, join(self.temp_dir, 'old.barecode.py'))
+        self.assertEqual(indexed.entries, [('helper', None, None, 'Helps with legacy things.')])
+
+        with open(self.index_path, 'wb') as f:
+            f.write(b'not an index')
+        with self.assertRaises(SearchIndexError):
+            DocstringIndex.load(self.index_path)
+        with self.assertRaises(SearchIndexError):
+            read_sidecar(join(self.temp_dir, 'missing.docstring.py'), 'missing.barecode.py')
+
+    @patch('segmented_docstring.cli.read_config')
+    def test_cli_index_and_search(self, mock_read_config):
+        mock_read_config.return_value = DEFAULT_CONFIG
+        self._split('client', CLIENT)
+        self._split('parser', PARSER)
+        main(['index', self.temp_dir])
+        self.assertTrue(os.path.exists(self.index_path))
+
+        with patch('sys.stdout', new_callable=StringIO) as stdout:
+            main(['search', 'download', '--index', self.index_path])
+        self.assertIn("client.barecode.py:5: Client.fetch: Download a resource", stdout.getvalue())
+        with patch('sys.stdout', new_callable=StringIO) as stdout:
+            main(['search', 'parse', '--index', self.index_path, '--json'])
+        self.assertEqual([result['qualname'] for result in json.loads(stdout.getvalue())], ['parse'])
+
+        with patch('sys.stderr', new_callable=StringIO) as stderr, self.assertRaises(SystemExit):
+            main(['search', 'x', '--index', join(self.temp_dir, 'missing-index')])
+        self.assertIn("build it with", stderr.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+# tests/test_lowmem.py
+
+import unittest
+import io
+import os
+import tempfile
+import shutil
+import sys
+from os.path import abspath, dirname, join
+
+# Add the src directory to the Python path
+sys.path.insert(0, abspath(join(dirname(__file__), '..', 'src')))
+
+from segmented_docstring import sidecar
+from segmented_docstring.combiner import combine_bytes, combine_files, DocstringMismatchError
+from segmented_docstring.lowmem import barecode_entries, scan_docstring_spans, stripped_chunks
+from segmented_docstring.spans import find_docstring_spans, strip_docstrings
+from segmented_docstring.splitter import split_bytes, split_file, split_source, ParseError
+
+SOURCE = '''"""Module docstring."""
+
+import os
+
+@decorator
+class Outer(Base, metaclass=Meta):
+    """
+    Multi-line class docstring.
+    """
+
+    def method(self, value: Dict[str, int] = {'a': 1}) -> str:
+        "Single " 'quoted ' """concatenation."""
+        return f"{value}"
+
+    async def fetch(self):
+        async for item in self.items():
+            pass
+        return b"bytes"
+
+    @property
+    def bare(self):
+        return 1
+
+try:
+    import missing
+except ImportError:
+    def fallback(): """Inline docstring."""  # keep this comment
+else:
+    def fallback():
+        b"not a docstring"
+
+def outer():
+    def inner(): return "not a docstring".upper()
+    class Local:
+        r\'\'\'Raw docstring.\'\'\'; x = 1
+    return inner
+'''
+
+def scan(source):
+    return scan_docstring_spans(io.StringIO(source).readline)
+
+class TestLowMemory(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, name, content, newline=None):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'w', encoding='utf-8', newline=newline) as f:
+            f.write(content)
+        return path
+
+    def _read(self, name):
+        with open(os.path.join(self.temp_dir, name), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def _read_bytes(self, name):
+        with open(os.path.join(self.temp_dir, name), 'rb') as f:
+            return f.read()
+
+    def _split_bytes(self, name, source):
+        """Split ``source`` with the low-memory engine and check it against :func:`split_bytes`."""
+        path = os.path.join(self.temp_dir, name + '.py')
+        with open(path, 'wb') as f:
+            f.write(source)
+        split_file(path, self.temp_dir, '.bare.py', '.doc.py', low_memory=True)
+        barecode, docstrings = split_bytes(source)
+        self.assertEqual(self._read_bytes(name + '.bare.py'), barecode)
+        self.assertEqual(self._read(name + '.doc.py'), docstrings)
+
+        output = os.path.join(self.temp_dir, name + '.out.py')
+        combine_files(os.path.join(self.temp_dir, name + '.bare.py'),
+                      os.path.join(self.temp_dir, name + '.doc.py'), output, low_memory=True)
+        self.assertEqual(self._read_bytes(name + '.out.py'), combine_bytes(barecode, docstrings))
+        return barecode
+
+    def test_scan_matches_syntax_tree_spans(self):
+        expected = find_docstring_spans(SOURCE)
+        spans = scan(SOURCE)
+        self.assertEqual([(s.kind, s.qualname, s.lineno, s.indent, s.body_indent, s.docstring) for s in spans],
+                         [(s.kind, s.qualname, s.lineno, s.indent, s.body_indent, s.docstring) for s in expected])
+
+    def test_streamed_outputs_match_in_memory_split(self):
+        barecode, docstrings = split_source(SOURCE)
+        spans = scan(SOURCE)
+        self.assertEqual(''.join(stripped_chunks(io.StringIO(SOURCE).readline, spans)), barecode)
+        self.assertEqual(sidecar.dumps(barecode_entries(spans)), docstrings)
+        self.assertEqual(strip_docstrings(SOURCE, find_docstring_spans(SOURCE)), barecode)
+
+    def test_split_and_combine_files_round_trip(self):
+        path = self._write('mod.py', SOURCE, newline='\r\n')
+        split_file(path, self.temp_dir, '.bare.py', '.doc.py', low_memory=True)
+        self.assertEqual(self._read_bytes('mod.bare.py'),
+                         split_source(SOURCE)[0].replace('\n', '\r\n').encode('utf-8'))
+
+        combine_files(os.path.join(self.temp_dir, 'mod.bare.py'), os.path.join(self.temp_dir, 'mod.doc.py'),
+                      os.path.join(self.temp_dir, 'out.py'), low_memory=True)
+        combine_files(os.path.join(self.temp_dir, 'mod.bare.py'), os.path.join(self.temp_dir, 'mod.doc.py'),
+                      os.path.join(self.temp_dir, 'expected.py'))
+        self.assertEqual(self._read_bytes('out.py'), self._read_bytes('expected.py'))
+        self.assertEqual(self._read_bytes('out.py'), self._read_bytes('mod.py'))
+
+    def test_byte_order_mark(self):
+        source = b'\xef\xbb\xbf"""Module."""\ndef f():\n    """Doc f."""\n    return 1\n'
+        barecode = self._split_bytes('bom', source)
+        self.assertEqual(barecode, b'\xef\xbb\xbfdef f():\n    return 1\n')
+
+    def test_carriage_returns(self):
+        self._split_bytes('crlf', SOURCE.replace('\n', '\r\n').encode('utf-8'))
+        # Lone carriage returns become newlines, as with the in-memory engine.
+        barecode = self._split_bytes('cr', b'def f():\r    """Doc f."""\r    return 1\r')
+        self.assertEqual(barecode, b'def f():\n    return 1\n')
+
+    def test_continuation_after_separator(self):
+        source = (b'class A:\n    """Doc A.""";  \\\n      x = 1\n'
+                  b'def f(): "Doc f." \\\r\n  ; return 1\r\n')
+        self.assertEqual(self._split_bytes('continued', source),
+                         b'class A:\n    x = 1\ndef f(): return 1\r\n')
+        self.assertEqual(self._read_bytes('continued.out.py'), source)
+
+    def test_coding_cookie(self):
+        source = '# coding: latin-1\ndef f():\n    """Café."""\n    return "é"\n'.encode('latin-1')
+        self.assertNotIn('Café'.encode('latin-1'), self._split_bytes('latin', source))
+
+    def test_invalid_sources(self):
+        sources = [b'x = 1\x00\n', b'print "hi"\n', b'if x:\n\tpass\n        pass\n',
+                   b'x = ' + b'(' * 300 + b')' * 300 + b'\n']
+        for index, source in enumerate(sources):
+            with self.subTest(source=source[:20]):
+                path = os.path.join(self.temp_dir, f'bad{index}.py')
+                with open(path, 'wb') as f:
+                    f.write(source)
+                with self.assertRaises(ParseError):
+                    split_file(path, self.temp_dir, '.bare.py', '.doc.py', low_memory=True)
+                self.assertFalse(os.path.exists(os.path.join(self.temp_dir, f'bad{index}.bare.py')))
+
+    def test_empty_file(self):
+        path = self._write('empty.py', '')
+        split_file(path, self.temp_dir, '.bare.py', '.doc.py', low_memory=True)
+        self.assertEqual(self._read('empty.bare.py'), '')
+        self.assertEqual(self._read('empty.doc.py'), split_source('')[1])
+
+    def test_tokenize_error(self):
+        path = self._write('bad.py', 'def f(:\n')
+        with self.assertRaises(ParseError):
+            split_file(path, self.temp_dir, '.bare.py', '.doc.py', low_memory=True)
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, 'bad.bare.py')))
+
+    def test_combine_out_of_range_leaves_no_output(self):
+        bare = self._write('mod.bare.py', 'def func():\n    pass\n')
+        doc = self._write('mod.doc.py', sidecar.dumps([
+            sidecar.SidecarEntry('func', 'FunctionDef', 40, 0, 4, 'Docstring.')]))
+        output = os.path.join(self.temp_dir, 'out.py')
+        with self.assertRaises(DocstringMismatchError):
+            combine_files(bare, doc, output, low_memory=True)
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ['mod.bare.py', 'mod.doc.py'])
+
+if __name__ == '__main__':
+    unittest.main()
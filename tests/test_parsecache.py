@@ -0,0 +1,108 @@
+# tests/test_parsecache.py
+
+import unittest
+import os
+import tempfile
+import shutil
+import sys
+from unittest.mock import patch
+from os.path import abspath, dirname, join
+
+# Add the src directory to the Python path
+sys.path.insert(0, abspath(join(dirname(__file__), '..', 'src')))
+
+from segmented_docstring import parsecache
+from segmented_docstring.parsecache import ParseCache, enable_shared_cache, get_shared_cache, set_shared_cache
+from segmented_docstring.spans import find_docstring_spans
+from segmented_docstring.splitter import split_source
+
+SOURCE = 'def func():\n    """Function docstring."""\n    return 1\n'
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_tree_and_spans_are_parsed_once(self):
+        cache = ParseCache()
+        with patch('segmented_docstring.parsecache.ast.parse', wraps=parsecache.ast.parse) as parse:
+            tree = cache.tree(SOURCE)
+            spans = cache.spans(SOURCE)
+            self.assertIs(cache.tree(SOURCE), tree)
+            self.assertIs(cache.spans(SOURCE), spans)
+        parse.assert_called_once()
+        self.assertEqual(spans, find_docstring_spans(SOURCE))
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+
+    def test_spans_alone_do_not_keep_the_tree(self):
+        cache = ParseCache()
+        spans = cache.spans(SOURCE)
+        self.assertIs(cache.spans(SOURCE), spans)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertIsNone(cache._entries[cache.key(SOURCE)].tree)
+        self.assertEqual(cache._size, parsecache._spans_size(spans))
+
+    def test_shared_cache_is_off_by_default(self):
+        previous = get_shared_cache()
+        set_shared_cache(None)
+        try:
+            self.assertIsNone(get_shared_cache())
+            cache = enable_shared_cache()
+            self.assertIs(get_shared_cache(), cache)
+            self.assertIs(enable_shared_cache(), cache)
+        finally:
+            set_shared_cache(previous)
+
+    def test_raw_bytes_are_cached_apart_from_text(self):
+        cache = ParseCache()
+        source = 'def f():\n    """Ünïcode."""\n'
+        self.assertNotEqual(cache.key(source), cache.key(source.encode('utf-8')))
+        self.assertEqual(cache.spans(source.encode('utf-8'))[1].end, len(source.encode('utf-8')))
+        self.assertEqual(cache.spans(source)[1].end, len(source))
+
+    def test_size_based_eviction(self):
+        cache = ParseCache(max_bytes=len(SOURCE) * parsecache.TREE_SIZE_FACTOR * 2)
+        sources = [SOURCE + f"x = {i}\n" for i in range(3)]
+        for source in sources:
+            cache.tree(source)
+        self.assertEqual(len(cache), 1)
+        cache.tree(sources[-1])
+        self.assertEqual(cache.hits, 1)
+
+    def test_oversized_entries_are_not_cached(self):
+        cache = ParseCache(max_bytes=10)
+        cache.spans(SOURCE)
+        self.assertEqual(len(cache), 0)
+
+    def test_persisted_span_tables(self):
+        path = os.path.join(self.temp_dir, 'parse-cache')
+        cache = ParseCache(path=path)
+        spans = cache.spans(SOURCE)
+        cache.save()
+
+        loaded = ParseCache(path=path)
+        with patch('segmented_docstring.parsecache.ast.parse') as parse:
+            self.assertEqual(loaded.spans(SOURCE), spans)
+        parse.assert_not_called()
+
+    def test_unreadable_persisted_file_is_ignored(self):
+        path = os.path.join(self.temp_dir, 'parse-cache')
+        with open(path, 'wb') as f:
+            f.write(b'not a pickle')
+        self.assertEqual(len(ParseCache(path=path)), 0)
+
+    def test_split_source_uses_shared_cache(self):
+        previous = get_shared_cache()
+        cache = ParseCache()
+        set_shared_cache(cache)
+        try:
+            first = split_source(SOURCE)
+            self.assertEqual(split_source(SOURCE), first)
+            self.assertEqual(cache.hits, 1)
+        finally:
+            set_shared_cache(previous)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+# tests/test_profiling.py
+
+import unittest
+import json
+import os
+import tempfile
+import shutil
+import sys
+from io import StringIO
+from unittest.mock import patch
+from os.path import abspath, dirname, join
+
+# Add the src directory to the Python path
+sys.path.insert(0, abspath(join(dirname(__file__), '..', 'src')))
+
+from segmented_docstring.cli import main
+from segmented_docstring.config import DEFAULT_CONFIG
+from segmented_docstring.profiling import (Profiler, get_profiler, profile_file, profile_from_env,
+                                           profile_phase, set_profiler)
+from segmented_docstring.splitter import split_file
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        set_profiler(None)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write_source(self, name, body='return 1'):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f'def {name[:-3]}():\n    """Docstring of {name}."""\n    {body}\n')
+        return path
+
+    def test_disabled_by_default(self):
+        self.assertIsNone(get_profiler())
+        with profile_file('a.py'), profile_phase('read'):
+            pass
+
+    def test_records_and_reports(self):
+        profiler = Profiler()
+        set_profiler(profiler)
+        with profile_file('a.py'):
+            with profile_phase('read'):
+                pass
+            with profile_phase('write'):
+                pass
+        with profile_phase('walk'):
+            pass
+
+        self.assertEqual([(r.path, r.phase) for r in profiler.records],
+                         [('a.py', 'read'), ('a.py', 'write'), (None, 'walk')])
+        self.assertEqual(list(profiler.phase_totals()), ['read', 'write', 'walk'])
+        self.assertEqual(set(profiler.file_totals()['a.py']), {'read', 'write'})
+        self.assertIn("Profile: 1 file(s)", profiler.summary())
+        self.assertIn("a.py (read", profiler.summary())
+
+        profiler.save(os.path.join(self.temp_dir, 'trace.json'), 'chrome')
+        with open(os.path.join(self.temp_dir, 'trace.json'), encoding='utf-8') as f:
+            events = json.load(f)['traceEvents']
+        self.assertEqual([event['name'] for event in events], ['read', 'write', 'walk'])
+        self.assertEqual(events[0]['ph'], 'X')
+        with self.assertRaises(ValueError):
+            profiler.save(os.path.join(self.temp_dir, 'trace.txt'), 'text')
+
+    def test_split_file_phases(self):
+        path = self._write_source('phases.py', body='return "unique to test_split_file_phases"')
+        profiler = Profiler()
+        set_profiler(profiler)
+        split_file(path, self.temp_dir, '.barecode.py', '.docstring.py')
+        phases = profiler.file_totals()[path]
+        self.assertEqual(list(phases), ['read', 'parse', 'visit', 'filter', 'write'])
+
+    def test_profile_from_env(self):
+        for value, expected in (('', (False, None)), ('0', (False, None)), ('1', (True, None)),
+                                ('out.json', (True, 'out.json'))):
+            with patch.dict(os.environ, {'SEGMENTED_PROFILE': value}):
+                self.assertEqual(profile_from_env(), expected)
+
+    @patch('segmented_docstring.cli.read_config')
+    def test_cli_profile(self, mock_read_config):
+        mock_read_config.return_value = DEFAULT_CONFIG
+        source = os.path.join(self.temp_dir, 'src')
+        os.mkdir(source)
+        for name in ('a.py', 'b.py'):
+            os.rename(self._write_source(name), os.path.join(source, name))
+        output = os.path.join(self.temp_dir, 'out')
+        os.mkdir(output)
+        report = os.path.join(self.temp_dir, 'profile.json')
+
+        with patch('sys.stderr', new_callable=StringIO) as stderr:
+            main(['split', source, '-o', output, '--no-cache',
+                  '--profile-output', report])
+        self.assertIn("Profile: 2 file(s)", stderr.getvalue())
+        self.assertIn("walk", stderr.getvalue())
+        self.assertIsNone(get_profiler())
+        with open(report, encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(sorted(data['files']), sorted(['<none>', os.path.join(source, 'a.py'),
+                                                        os.path.join(source, 'b.py')]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+# tests/test_report.py
+
+import unittest
+import json
+import os
+import tempfile
+import shutil
+import sys
+from io import StringIO
+from unittest.mock import patch
+from os.path import abspath, dirname, join
+
+# Add the src directory to the Python path
+sys.path.insert(0, abspath(join(dirname(__file__), '..', 'src')))
+
+from segmented_docstring.cli import main
+from segmented_docstring.combiner import combine_files
+from segmented_docstring.config import DEFAULT_CONFIG
+from segmented_docstring.report import FileStats, ProgressBar, Reporter
+from segmented_docstring.splitter import split_file
+
+SOURCE = 'def func():\n    """Function docstring."""\n    return 1\n'
+
+class _Terminal(StringIO):
+    def isatty(self):
+        return True
+
+class TestReport(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_ndjson_streams_records(self):
+        stream = StringIO()
+        reporter = Reporter('split', 'ndjson', stream)
+        reporter.record('a.py', 'ok', 0.5, FileStats(2, 100, 120, 2))
+        self.assertEqual(json.loads(stream.getvalue()),
+                         {'type': 'file', 'path': 'a.py', 'status': 'ok', 'seconds': 0.5,
+                          'docstrings': 2, 'bytes_in': 100, 'bytes_out': 120})
+        reporter.record('b.py', 'failed', 0.1, error='boom')
+        reporter.record('c.py', 'skipped')
+        reporter.finish()
+
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(lines[1]['error'], 'boom')
+        summary = lines[-1]
+        self.assertEqual(summary['type'], 'summary')
+        self.assertEqual((summary['files'], summary['ok'], summary['failed'], summary['skipped']), (3, 1, 1, 1))
+        self.assertEqual((summary['docstrings'], summary['bytes_in'], summary['bytes_out']), (2, 100, 120))
+
+    def test_json_writes_one_document(self):
+        stream = StringIO()
+        reporter = Reporter('combine', 'json', stream)
+        reporter.record('a.barecode.py', 'unchanged', 0.2, FileStats(1, 10, 12, 0))
+        self.assertEqual(stream.getvalue(), '')
+        reporter.finish()
+        data = json.loads(stream.getvalue())
+        self.assertEqual(data['action'], 'combine')
+        self.assertEqual([record['status'] for record in data['files']], ['unchanged'])
+        self.assertEqual(data['summary']['unchanged'], 1)
+        with self.assertRaises(ValueError):
+            Reporter('split', 'xml', stream)
+
+    def test_progress_bar_only_on_terminals(self):
+        stream = StringIO()
+        bar = ProgressBar(2, stream=stream)
+        bar.update()
+        bar.close()
+        self.assertEqual(stream.getvalue(), '')
+
+        terminal = _Terminal()
+        bar = ProgressBar(2, 'split ', stream=terminal, width=4, interval=0)
+        bar.update()
+        bar.update()
+        bar.close()
+        self.assertEqual(terminal.getvalue(), '\rsplit [##--] 1/2\rsplit [####] 2/2\n')
+
+    def test_split_and_combine_return_stats(self):
+        path = os.path.join(self.temp_dir, 'mod.py')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(SOURCE)
+        output = os.path.join(self.temp_dir, 'out')
+        os.mkdir(output)
+
+        stats = split_file(path, output, '.bare.py', '.doc.py')
+        self.assertEqual((stats.docstrings, stats.bytes_in, stats.written), (1, len(SOURCE), 2))
+        self.assertEqual(split_file(path, output, '.bare.py', '.doc.py').written, 0)
+
+        stats = combine_files(os.path.join(output, 'mod.bare.py'), os.path.join(output, 'mod.doc.py'),
+                              os.path.join(self.temp_dir, 'combined.py'), low_memory=True)
+        self.assertEqual((stats.docstrings, stats.bytes_out, stats.written), (1, len(SOURCE), 1))
+
+    @patch('segmented_docstring.cli.read_config')
+    def test_cli_ndjson_report(self, mock_read_config):
+        mock_read_config.return_value = DEFAULT_CONFIG
+        source = os.path.join(self.temp_dir, 'src')
+        output = os.path.join(self.temp_dir, 'out')
+        os.mkdir(source)
+        os.mkdir(output)
+        for name in ('a.py', 'b.py', 'broken.py'):
+            with open(os.path.join(source, name), 'w', encoding='utf-8') as f:
+                f.write('def broken(:\n' if name == 'broken.py' else SOURCE)
+
+        with patch('sys.stdout', new_callable=StringIO) as stdout, patch('sys.stderr', new_callable=StringIO):
+            with self.assertRaises(SystemExit):
+                main(['split', source, '-o', output, '--report', 'ndjson'])
+        lines = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        statuses = {os.path.basename(line['path']): line['status'] for line in lines[:-1]}
+        self.assertEqual(statuses, {'a.py': 'ok', 'b.py': 'ok', 'broken.py': 'failed'})
+        self.assertEqual((lines[-1]['ok'], lines[-1]['failed']), (2, 1))
+
+        os.remove(os.path.join(source, 'broken.py'))
+        with patch('sys.stdout', new_callable=StringIO) as stdout:
+            main(['split', source, '-o', output, '--report', 'json'])
+        self.assertEqual(json.loads(stdout.getvalue())['summary']['skipped'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
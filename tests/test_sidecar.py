@@ -0,0 +1,88 @@
+# tests/test_sidecar.py
+
+import unittest
+import ast
+import json
+import sys
+from os.path import abspath, dirname, join
+
+# Add the src directory to the Python path
+sys.path.insert(0, abspath(join(dirname(__file__), '..', 'src')))
+
+from segmented_docstring.sidecar import (SidecarEntry, SidecarError, SIDECAR_VERSION,
+                                         dumps, loads, entries_from_spans, render_docstring)
+from segmented_docstring.spans import find_docstring_spans
+
+class TestSidecar(unittest.TestCase):
+    def test_round_trip(self):
+        entries = [SidecarEntry('A.__init__', 'FunctionDef', 3, 0, 8, 'Init A.'),
+                   SidecarEntry('B.__init__', 'FunctionDef', 7, 0, 8, None)]
+        self.assertEqual(loads(dumps(entries)), entries)
+
+    def test_legacy_dict_literal(self):
+        self.assertEqual(loads("{'func': 'Function docstring.'}"), {'func': 'Function docstring.'})
+        self.assertEqual(loads('{"func": "Function docstring."}'), {'func': 'Function docstring.'})
+
+    def test_unsupported_version(self):
+        text = json.dumps({'format': 'segmented-docstring', 'version': SIDECAR_VERSION + 1, 'docstrings': []})
+        with self.assertRaises(SidecarError):
+            loads(text)
+
+    def test_invalid_text(self):
+        with self.assertRaises(SidecarError):
+            loads("This is not a sidecar")
+        with self.assertRaises(SidecarError):
+            loads("[1, 2, 3]")
+
+    def test_entries_anchor_to_barecode_lines(self):
+        source = 'class A:\n    """Doc A.\n\n    More.\n    """\n    def f(self):\n        """Doc f."""\n        pass\n'
+        entries = entries_from_spans(source, find_docstring_spans(source))
+        self.assertEqual([(e.qualname, e.line, e.column, e.indent) for e in entries],
+                         [('module', 1, 0, 0), ('A', 2, 0, 4), ('A.f', 3, 0, 8)])
+
+    def test_entries_record_formatting(self):
+        source = ("class A:\n    r'''\n    Doc A.\n    '''\n    def f(self): 'Doc f.'\n"
+                  '    def g(self):\n        """Doc g."""\n    def h(self):\n        """ Doc h."""\n')
+        entries = entries_from_spans(source, find_docstring_spans(source))
+        self.assertEqual([(e.quote, e.layout, e.raw) for e in entries[1:]],
+                         [("r'''", 'block', None), ("'", None, None), (None, None, None),
+                          (None, None, '        """ Doc h."""\n')])
+        self.assertEqual([render_docstring(e) for e in entries[1:]],
+                         ["    r'''\n    Doc A.\n    '''\n", "'Doc f.'", '        """Doc g."""\n',
+                          '        """ Doc h."""\n'])
+        self.assertNotIn('"raw"', dumps(entries[:4]))
+        self.assertEqual(loads(dumps(entries)), entries)
+
+    def test_render_edited_docstring(self):
+        # The original text no longer holds the docstring, and it does not fit single quotes.
+        entry = SidecarEntry('f', 'FunctionDef', 2, 0, 4, 'New "text".\n\nMore.', "'", None, "    'Old.'\n")
+        self.assertEqual(render_docstring(entry), "    '''New \"text\".\n\n    More.'''\n")
+        self.assertEqual(render_docstring(entry._replace(layout='close'), '\r\n'),
+                         "    '''New \"text\".\r\n\r\n    More.\r\n    '''\r\n")
+
+    def test_render_escapes_edited_text(self):
+        docstrings = ['see C:\\new\\table', 'ends\\', 'both """ and \'\'\'', 'say \\"hi\\"', 'ends with "',
+                      'a\rb\x00', 'two\n\nlines \\d']
+        for docstring in docstrings:
+            for quote in (None, "'", 'r"""', "r'", "u'''"):
+                for layout in (None, 'open', 'close', 'block'):
+                    for column in (0, 13):
+                        entry = SidecarEntry('f', 'FunctionDef', 2, column, 4, docstring, quote, layout)
+                        text = render_docstring(entry)
+                        with self.subTest(text=text):
+                            tree = ast.parse(f'def f():\n{text}' if column == 0 else f'def f(): {text}')
+                            self.assertEqual(ast.get_docstring(tree.body[0]), docstring)
+        # Text that can be written raw keeps the prefix; escapes are only added without it.
+        entry = SidecarEntry('f', 'FunctionDef', 2, 0, 4, 'Match \\d+.', "r'''")
+        self.assertEqual(render_docstring(entry), "    r'''Match \\d+.'''\n")
+        self.assertEqual(render_docstring(entry._replace(docstring='Match \\d+\\')), "    '''Match \\\\d+\\\\'''\n")
+        self.assertEqual(render_docstring(entry._replace(docstring='Costs €5.'), encoding='latin-1'),
+                         "    '''Costs \\u20ac5.'''\n")
+
+    def test_reads_version_2(self):
+        text = json.dumps({'format': 'segmented-docstring', 'version': 2, 'docstrings': [
+            {'qualname': 'f', 'kind': 'FunctionDef', 'line': 2, 'column': 0, 'indent': 4, 'docstring': 'Doc.'}]})
+        self.assertEqual(loads(text), [SidecarEntry('f', 'FunctionDef', 2, 0, 4, 'Doc.')])
+
+if __name__ == '__main__':
+    unittest.main()
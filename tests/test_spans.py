@@ -0,0 +1,120 @@
+# tests/test_spans.py
+
+import unittest
+import ast
+import sys
+from os.path import abspath, dirname, join
+
+# Add the src directory to the Python path
+sys.path.insert(0, abspath(join(dirname(__file__), '..', 'src')))
+
+from segmented_docstring.spans import barecode_anchors, find_docstring_spans, strip_docstrings, line_offsets
+
+SOURCE = '''"""Module docstring."""
+
+import os
+
+class Outer:
+    """
+    Multi-line class docstring.
+
+    With a blank line.
+    """
+
+    def method(self):
+        """Method docstring."""
+        text = """
+not a docstring
+"""
+        return text
+
+    async def fetch(self):
+        \'\'\'Async docstring.\'\'\'
+        return None
+
+def bare():
+    return 1
+
+def inline(): """Inline docstring."""  # keep this comment
+'''
+
+class TestSpans(unittest.TestCase):
+    def test_line_offsets(self):
+        self.assertEqual(line_offsets("a\nbc\n"), [0, 2, 5])
+        self.assertEqual(line_offsets("a\nbc"), [0, 2, 4])
+
+    def test_definitions_in_source_order(self):
+        spans = find_docstring_spans(SOURCE)
+        self.assertEqual([s.qualname for s in spans],
+                         ['module', 'Outer', 'Outer.method', 'Outer.fetch', 'bare', 'inline'])
+        self.assertEqual(spans[3].kind, 'AsyncFunctionDef')
+        self.assertEqual(spans[2].lineno, 12)
+        self.assertEqual(spans[2].indent, 4)
+        self.assertIsNone(spans[4].docstring)
+        self.assertEqual(spans[1].docstring, "Multi-line class docstring.\n\nWith a blank line.")
+
+    def test_strip_docstrings(self):
+        barecode = strip_docstrings(SOURCE, find_docstring_spans(SOURCE))
+        self.assertNotIn('docstring.', barecode.replace('not a docstring', ''))
+        self.assertIn('not a docstring', barecode)
+        self.assertIn('def inline():   # keep this comment', barecode)
+        self.assertIn('class Outer:\n\n    def method(self):\n        text = """', barecode)
+
+    def test_spans_are_exactly_reversible(self):
+        spans = find_docstring_spans(SOURCE)
+        barecode = strip_docstrings(SOURCE, spans)
+        rebuilt = barecode
+        # Re-inserting removed regions in source order restores original offsets as we go.
+        for span in spans:
+            removed = SOURCE[span.start:span.end]
+            rebuilt = rebuilt[:span.start] + removed + rebuilt[span.start:]
+        self.assertEqual(rebuilt, SOURCE)
+
+    def test_statement_separator_is_removed(self):
+        source = 'def f(): """Doc f."""; return 1\nclass A:\n    "Doc A." ;  x = 1\n'
+        barecode = strip_docstrings(source, find_docstring_spans(source))
+        self.assertEqual(barecode, 'def f(): return 1\nclass A:\n    x = 1\n')
+        ast.parse(barecode)
+        spans = find_docstring_spans(source.encode('utf-8'))
+        self.assertEqual(strip_docstrings(source.encode('utf-8'), spans), barecode.encode('utf-8'))
+
+    def test_continuation_after_separator_is_removed(self):
+        source = ('class A:\n    """Doc A.""";  \\\n      x = 1\n'
+                  'def f():\n    "Doc f." \\\n    ; return 1\n')
+        barecode = strip_docstrings(source, find_docstring_spans(source))
+        self.assertEqual(barecode, 'class A:\n    x = 1\ndef f():\n    return 1\n')
+        anchors = barecode_anchors(source, find_docstring_spans(source))
+        self.assertEqual(anchors[1:], [(2, 4), (4, 4)])
+
+    def test_non_ascii_columns(self):
+        source = 'x = "é"; y = 1\ndef f(): """Doc é."""\n'
+        spans = find_docstring_spans(source)
+        self.assertEqual(strip_docstrings(source, spans), 'x = "é"; y = 1\ndef f(): \n')
+
+    def test_raw_bytes_use_byte_offsets(self):
+        source = '# coding: koi8-r\ndef f(x="Ж"): """Док."""; return x\n'
+        data = source.encode('koi8-r')
+        spans = find_docstring_spans(data)
+        self.assertEqual(data[spans[1].start:spans[1].end], '"""Док."""; '.encode('koi8-r'))
+        self.assertEqual(spans[1].docstring, 'Док.')
+        self.assertEqual(strip_docstrings(data, spans), strip_docstrings(source, find_docstring_spans(source))
+                         .encode('koi8-r'))
+        self.assertEqual(barecode_anchors(data, spans), barecode_anchors(source, find_docstring_spans(source)))
+
+        with_bom = b'\xef\xbb\xbf"""Doc."""\nx = 1\n'
+        self.assertEqual(line_offsets(with_bom), [3, 14, 20])
+        self.assertEqual(strip_docstrings(with_bom, find_docstring_spans(with_bom)), b'\xef\xbb\xbfx = 1\n')
+        with self.assertRaises(SyntaxError):
+            find_docstring_spans(b'# coding: no-such-codec\n')
+
+    def test_try_handlers_precede_else(self):
+        source = 'try:\n    import x\nexcept ImportError:\n    def a(): pass\nelse:\n    def b(): pass\n'
+        self.assertEqual([s.qualname for s in find_docstring_spans(source)], ['module', 'a', 'b'])
+
+    def test_missing_docstring_anchors_before_decorators(self):
+        source = 'class A:\n    @property\n    def value(self):\n        return 1\n'
+        span = find_docstring_spans(source)[1]
+        self.assertEqual(span.start, source.index('    @property'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 # tests/test_splitter.py
 
 import unittest
+import ast
 import os
 import tempfile
 import shutil
@@ -11,7 +12,20 @@ from os.path import abspath, dirname, join
 # Add the src directory to the Python path
 sys.path.insert(0, abspath(join(dirname(__file__), '..', 'src')))
 
-from segmented_docstring.splitter import split_file, FileReadError, FileSaveError, ParseError
+from segmented_docstring import sidecar
+from segmented_docstring.combiner import combine_bytes, combine_files, combine_source
+from segmented_docstring.splitter import (split_bytes, split_file, split_source, split_many, FileReadError, FileSaveError,
+                                          ParseError)
+
+def _normalized_dump(source):
+    """Dump the AST of ``source`` with every docstring replaced by its cleaned text."""
+    tree = ast.parse(source)
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            docstring = ast.get_docstring(node)
+            if docstring is not None:
+                node.body[0].value.value = docstring
+    return ast.dump(tree)
 
 class TestSplitter(unittest.TestCase):
     def setUp(self):
@@ -57,16 +71,134 @@ class TestClass:
     def method(self):
         return True
 '''
-        expected_docstrings = '''"""Module docstring."""
+        self.assertEqual(barecode.strip(), expected_barecode.strip())
+
+        entries = sidecar.loads(docstrings)
+        self.assertEqual([(e.qualname, e.kind, e.line, e.indent, e.docstring) for e in entries], [
+            ('module', 'Module', 1, 0, 'Module docstring.'),
+            ('func', 'FunctionDef', 3, 4, 'Function docstring.'),
+            ('TestClass', 'ClassDef', 6, 4, 'Class docstring.'),
+            ('TestClass.method', 'FunctionDef', 8, 8, 'Method docstring.'),
+        ])
+
+    def test_split_then_combine_round_trip(self):
+        input_content = '''"""Module docstring."""
 
-"""Function docstring."""
+class A:
+    def __init__(self):
+        """Init A.
 
-"""Class docstring."""
+        Details.
+        """
+        self.value = 1
 
-    """Method docstring."""
+class B:
+    def __init__(self):
+        """Init B."""
+        text = """not a docstring"""
+        self.text = text
+
+async def fetch():
+    """Fetch things."""
+    return None
 '''
-        self.assertEqual(barecode.strip(), expected_barecode.strip())
-        self.assertEqual(docstrings.strip(), expected_docstrings.strip())
+        with open(self.input_file, 'w', encoding='utf-8') as f:
+            f.write(input_content)
+
+        split_file(self.input_file, self.temp_dir, self.barecode_ext, self.docstring_ext)
+        output_file = os.path.join(self.temp_dir, "combined.py")
+        combine_files(os.path.join(self.temp_dir, "test_input" + self.barecode_ext),
+                      os.path.join(self.temp_dir, "test_input" + self.docstring_ext), output_file)
+
+        with open(output_file, 'r', encoding='utf-8') as f:
+            combined = f.read()
+        self.assertEqual(_normalized_dump(combined), _normalized_dump(input_content))
+
+    def test_split_source_in_memory(self):
+        source = 'def func():\n    """Function docstring."""\n    return 1\n'
+        barecode, docstrings = split_source(source)
+        self.assertEqual(barecode, 'def func():\n    return 1\n')
+        self.assertEqual(combine_source(barecode, docstrings), source)
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_split_source_invalid_python(self):
+        with self.assertRaises(ParseError):
+            split_source("This is not valid Python code")
+
+    def test_split_many_paths_and_sources(self):
+        source = 'def func():\n    """Function docstring."""\n    return 1\n'
+        with open(self.input_file, 'w', encoding='utf-8') as f:
+            f.write(source)
+        output_dir = os.path.join(self.temp_dir, "out")
+        config = {'barecode_extension': self.barecode_ext, 'docstring_extension': self.docstring_ext}
+
+        results = list(split_many([Path(self.input_file), ("memory.py", source), ("bad.py", "def (:")],
+                                  output_dir, config))
+
+        self.assertEqual([r.name for r in results], [self.input_file, "memory.py", "bad.py"])
+        self.assertEqual(results[0].barecode, b'def func():\n    return 1\n')
+        self.assertEqual(results[1][1:], (results[0].barecode.decode(),) + results[0][2:])
+        self.assertIsInstance(results[2].error, ParseError)
+        self.assertEqual(sorted(os.listdir(output_dir)), ["memory" + self.barecode_ext, "memory" + self.docstring_ext,
+                                                          "test_input" + self.barecode_ext,
+                                                          "test_input" + self.docstring_ext])
+
+    def test_split_many_keeps_the_source_encoding(self):
+        source = '# coding: latin-1\ndef f():\n    """Café."""\n    return "é"\n'.encode('latin-1')
+        with open(self.input_file, 'wb') as f:
+            f.write(source)
+        output_dir = os.path.join(self.temp_dir, "out")
+        results = list(split_many([self.input_file, ("bom.py", b'\xef\xbb\xbf"""Doc."""\nx = 1\n')], output_dir))
+        self.assertEqual(results[0].barecode, '# coding: latin-1\ndef f():\n    return "é"\n'.encode('latin-1'))
+        self.assertEqual(results[1].barecode, b'\xef\xbb\xbfx = 1\n')
+        self.assertEqual(combine_bytes(*results[0][1:3]), source)
+        with open(os.path.join(output_dir, "test_input.barecode.py"), 'rb') as f:
+            self.assertEqual(f.read(), results[0].barecode)
+
+    def test_split_many_in_memory_only(self):
+        results = list(split_many([("a.py", "x = 1\n"), os.path.join(self.temp_dir, "missing.py")]))
+        self.assertEqual(results[0].barecode, "x = 1\n")
+        self.assertIsInstance(results[1].error, FileReadError)
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_split_bytes_keeps_encoding_and_line_endings(self):
+        source = ('# -*- coding: cp1252 -*-\r\n"""Café module."""\r\n\r\n'
+                  'def f(x=\'é\'): """Inline é."""; return x\r\n')
+        barecode, docstrings = split_bytes(source.encode('cp1252'))
+        self.assertEqual(barecode, "# -*- coding: cp1252 -*-\r\n\r\ndef f(x='é'): return x\r\n".encode('cp1252'))
+        self.assertEqual([(entry.qualname, entry.line, entry.column, entry.docstring)
+                          for entry in sidecar.loads(docstrings)],
+                         [('module', 2, 0, 'Café module.'), ('f', 3, 14, 'Inline é.')])
+        self.assertEqual(combine_bytes(barecode, docstrings), source.encode('cp1252'))
+
+        with_bom = '\ufeff"""Doc."""\nx = 1\n'.encode('utf-8')
+        self.assertEqual(split_bytes(with_bom)[0], b'\xef\xbb\xbfx = 1\n')
+        self.assertEqual(split_bytes(b'"""Doc."""\rx = 1\r')[0], b'x = 1\n')
+        with self.assertRaises(ParseError):
+            split_bytes('"""Café."""\n'.encode('latin-1'))
+        with self.assertRaises(ParseError):
+            split_bytes(b'# coding: no-such-codec\n')
+
+    def test_split_source_lone_carriage_returns(self):
+        source = 'def f():\r    """Doc."""\r    return 1\r'
+        barecode, docstrings = split_source(source)
+        self.assertEqual(barecode, 'def f():\n    return 1\n')
+        self.assertEqual(combine_source(barecode, docstrings), 'def f():\n    """Doc."""\n    return 1\n')
+        self.assertEqual(combine_source(barecode.replace('\n', '\r'), docstrings),
+                         'def f():\n    """Doc."""\n    return 1\n')
+
+    def test_split_file_legacy_encoding(self):
+        source = '# coding: latin-1\ndef func():\n    """Retourne é."""\n    return 1\n'
+        with open(self.input_file, 'wb') as f:
+            f.write(source.encode('latin-1'))
+        split_file(self.input_file, self.temp_dir, self.barecode_ext, self.docstring_ext)
+        with open(os.path.join(self.temp_dir, "test_input" + self.barecode_ext), 'rb') as f:
+            self.assertEqual(f.read(), b'# coding: latin-1\ndef func():\n    return 1\n')
+        output_file = os.path.join(self.temp_dir, "combined.py")
+        combine_files(os.path.join(self.temp_dir, "test_input" + self.barecode_ext),
+                      os.path.join(self.temp_dir, "test_input" + self.docstring_ext), output_file)
+        with open(output_file, 'rb') as f:
+            self.assertEqual(f.read(), source.encode('latin-1'))
 
     def test_split_file_input_not_found(self):
         non_existent_file = os.path.join(self.temp_dir, "non_existent.py")
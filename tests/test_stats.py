@@ -0,0 +1,117 @@
+# tests/test_stats.py
+
+import unittest
+import json
+import logging
+import os
+import tempfile
+import shutil
+import sys
+from io import StringIO
+from unittest.mock import patch
+from os.path import abspath, dirname, join
+
+# Add the src directory to the Python path
+sys.path.insert(0, abspath(join(dirname(__file__), '..', 'src')))
+
+from segmented_docstring.cli import main
+from segmented_docstring.config import DEFAULT_CONFIG
+from segmented_docstring.stats import StatsError, file_coverage, source_coverage, summarize
+
+SOURCE = '''"""Module docstring."""
+
+class Shape:
+    """A shape with a rather longer docstring than the others."""
+
+    def area(self):
+        return 0
+
+def helper():
+    """Help."""
+    return 1
+'''
+
+class TestStats(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, path, content):
+        full_path = join(self.temp_dir, path)
+        os.makedirs(dirname(full_path), exist_ok=True)
+        with open(full_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return full_path
+
+    def test_source_coverage(self):
+        coverage = source_coverage(SOURCE, 'shapes.py')
+        self.assertEqual((coverage.definitions, coverage.documented, coverage.missing), (4, 3, ['Shape.area']))
+        self.assertEqual(coverage.bytes, len(SOURCE))
+        self.assertEqual(coverage.docstring_bytes, len('"""Module docstring."""\n')
+                         + len('    """A shape with a rather longer docstring than the others."""\n')
+                         + len('    """Help."""\n'))
+        self.assertEqual([(size.qualname, size.line) for size in coverage.largest],
+                         [('Shape', 3), ('module', 1), ('helper', 9)])
+        self.assertEqual(len(source_coverage(SOURCE, largest=1).largest), 1)
+
+        empty = source_coverage('\n')
+        self.assertEqual((empty.definitions, empty.documented), (0, 0))
+        with self.assertRaises(StatsError):
+            source_coverage('def broken(:\n')
+
+    def test_file_coverage_reads_declared_encoding(self):
+        for name, data in (('latin1.py', '# coding: latin-1\ndef f():\n    """Café."""\n'.encode('latin-1')),
+                           ('bom.py', '\ufeffdef f():\n    """Café."""\n'.encode('utf-8'))):
+            path = join(self.temp_dir, name)
+            with open(path, 'wb') as f:
+                f.write(data)
+            coverage = file_coverage(path)
+            self.assertEqual((coverage.definitions, coverage.documented), (2, 1))
+            self.assertEqual(coverage.docstring_bytes, len('    """Café."""\n'.encode('utf-8')))
+
+    def test_summarize_groups_packages(self):
+        top = file_coverage(self._write('shapes.py', SOURCE))
+        nested = file_coverage(self._write('pkg/bare.py', 'def f():\n    return 1\n'))
+        report = summarize([top, nested], self.temp_dir, largest=2, errors=[('bad.py', 'boom')])
+
+        self.assertEqual(report['summary']['definitions'], 6)
+        self.assertEqual(report['summary']['documented'], 3)
+        self.assertEqual(report['summary']['coverage'], 50.0)
+        self.assertEqual([(package['path'], package['coverage']) for package in report['packages']],
+                         [('.', 75.0), ('pkg', 0.0)])
+        self.assertEqual(report['files'][0]['missing'], ['module', 'f'])
+        self.assertEqual([size['qualname'] for size in report['largest']], ['Shape', 'module'])
+        self.assertEqual(report['errors'], [{'path': 'bad.py', 'error': 'boom'}])
+        with self.assertRaises(StatsError):
+            file_coverage(join(self.temp_dir, 'missing.py'))
+
+    @patch('segmented_docstring.cli.read_config')
+    def test_cli_stats(self, mock_read_config):
+        mock_read_config.return_value = DEFAULT_CONFIG
+        self._write('shapes.py', SOURCE)
+        self._write('pkg/bare.py', 'def f():\n    return 1\n')
+
+        # Verbose output stays off stdout, which only carries the JSON report.
+        self.addCleanup(logging.getLogger('cli').setLevel, logging.getLogger('cli').level)
+        with patch('sys.stdout', new_callable=StringIO) as stdout, patch('sys.stderr', new_callable=StringIO):
+            main(['-v', 'stats', self.temp_dir, '-r', '--largest', '1'])
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(report['summary']['files'], 2)
+        self.assertEqual(len(report['largest']), 1)
+        self.assertFalse(any(name.endswith(('.barecode.py', '.docstring.py')) for name in os.listdir(self.temp_dir)))
+
+        with patch('sys.stdout', new_callable=StringIO), patch('sys.stderr', new_callable=StringIO) as stderr, \
+                self.assertRaises(SystemExit):
+            main(['stats', self.temp_dir, '-r', '--fail-under', '80'])
+        self.assertIn("Docstring coverage 50.00% is below 80%", stderr.getvalue())
+
+        self._write('broken.py', 'def broken(:\n')
+        with patch('sys.stdout', new_callable=StringIO) as stdout, patch('sys.stderr', new_callable=StringIO), \
+                self.assertRaises(SystemExit):
+            main(['stats', self.temp_dir])
+        self.assertEqual(len(json.loads(stdout.getvalue())['errors']), 1)
+
+if __name__ == '__main__':
+    unittest.main()
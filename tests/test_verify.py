@@ -0,0 +1,136 @@
+# tests/test_verify.py
+
+import ast
+import unittest
+import os
+import tempfile
+import shutil
+import sys
+from io import StringIO
+from unittest.mock import patch
+from os.path import abspath, dirname, join
+
+# Add the src directory to the Python path
+sys.path.insert(0, abspath(join(dirname(__file__), '..', 'src')))
+
+from segmented_docstring.cli import main
+from segmented_docstring.config import DEFAULT_CONFIG
+from segmented_docstring.verify import ast_fingerprint, verify_bytes, verify_file, verify_source, VerifyError
+
+SOURCE = '''"""Module docstring."""
+
+import functools
+
+class Client:
+    """A client."""
+
+    @functools.lru_cache()
+    def fetch(self):
+        """Fetch once."""
+        return 1
+
+    async def close(self):
+        """Close the client."""
+
+def fallback():
+    """First definition."""
+
+def fallback():
+    """Second definition."""
+'''
+
+class TestVerify(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_fingerprint_ignores_formatting(self):
+        first = ast.parse('def f(a, b):\n    """  Doc.\n\n    More."""\n    return (a +\n            b)\n')
+        second = ast.parse("def f(a,b):\n    '''Doc.\n\n    More.'''\n    return a+b\n")
+        self.assertEqual(ast_fingerprint(first), ast_fingerprint(second))
+
+    def test_fingerprint_detects_changes(self):
+        base = ast_fingerprint(ast.parse('def f():\n    """Doc."""\n    return 1\n'))
+        self.assertNotEqual(base, ast_fingerprint(ast.parse('def f():\n    """Other."""\n    return 1\n')))
+        self.assertNotEqual(base, ast_fingerprint(ast.parse('def f():\n    """Doc."""\n    return 2\n')))
+        self.assertNotEqual(ast_fingerprint(ast.parse('x = ")"\n')), ast_fingerprint(ast.parse('x = "]"\n')))
+
+    def test_round_trip_is_lossless(self):
+        self.assertIsNone(verify_source(SOURCE))
+
+    def test_legacy_format_reports_lost_docstrings(self):
+        self.assertEqual(verify_source(SOURCE, legacy=True), "Docstring of fallback changed")
+
+    def test_exact_round_trip(self):
+        self.assertIsNone(verify_source(SOURCE, exact=True))
+        source = "def f():\n    r'''  Doc.'''\n    return 1\n"
+        self.assertIsNone(verify_source(source, legacy=True))
+        self.assertEqual(verify_source(source, legacy=True, exact=True), "Formatting of line 2 changed")
+
+    def test_invalid_source(self):
+        with self.assertRaises(VerifyError):
+            verify_source('def broken(:\n')
+
+    def test_verify_file(self):
+        path = os.path.join(self.temp_dir, 'module.py')
+        with open(path, 'w') as f:
+            f.write(SOURCE)
+        self.assertIsNone(verify_file(path))
+        with self.assertRaises(VerifyError):
+            verify_file(os.path.join(self.temp_dir, 'missing.py'))
+
+        # Files are read in the encoding they declare.
+        for data in ('# coding: latin-1\r\ndef f():\r\n    """Café."""\r\n'.encode('latin-1'),
+                     '\ufeffdef f():\n    """Café."""\n'.encode('utf-8')):
+            with open(path, 'wb') as f:
+                f.write(data)
+            self.assertIsNone(verify_file(path))
+            self.assertIsNone(verify_file(path, exact=True))
+        with open(path, 'wb') as f:
+            f.write(b'# coding: no-such-codec\nx = 1\n')
+        with self.assertRaises(VerifyError):
+            verify_file(path)
+
+    def test_verify_bytes_and_engines(self):
+        # The byte-level engine keeps line endings and the byte order mark; decoded text would not.
+        source = ('\ufeff# coding: utf-8\r\nclass A:\r\n    """Doc.\r\n\r\n    More."""\r\n'
+                  "    def f(self): 'Inline.'; return 1\r\n").encode('utf-8')
+        self.assertIsNone(verify_bytes(source, exact=True))
+        self.assertIsNone(verify_bytes(source, legacy=True))
+        self.assertEqual(verify_bytes(b'def f():\r    """Doc."""\r', exact=True), "Formatting of line 1 changed")
+        with self.assertRaises(VerifyError):
+            verify_bytes(b'x = 1\x00\n')
+
+        path = os.path.join(self.temp_dir, 'module.py')
+        for data in (source, SOURCE.encode('utf-8'), '# coding: latin-1\ndef f():\n    """Café."""\n'.encode('latin-1')):
+            with open(path, 'wb') as f:
+                f.write(data)
+            for low_memory in (False, True):
+                with self.subTest(data=data[:20], low_memory=low_memory):
+                    self.assertIsNone(verify_file(path, exact=True, low_memory=low_memory))
+        self.assertIsNone(verify_file(path, legacy=True, exact=True, low_memory=True))
+        with open(path, 'wb') as f:
+            f.write(b'print "hi"\n')
+        with self.assertRaises(VerifyError):
+            verify_file(path, low_memory=True)
+
+    @patch('segmented_docstring.cli.read_config')
+    def test_cli_verify(self, mock_read_config):
+        mock_read_config.return_value = DEFAULT_CONFIG
+        with open(os.path.join(self.temp_dir, 'module.py'), 'w') as f:
+            f.write(SOURCE)
+        main(['verify', self.temp_dir])
+
+        with patch('sys.stderr', new_callable=StringIO) as stderr, self.assertRaises(SystemExit):
+            main(['verify', self.temp_dir, '--legacy'])
+        self.assertIn("1 file(s) failed to verify", stderr.getvalue())
+
+        with open(os.path.join(self.temp_dir, 'crlf.py'), 'w', newline='\r\n') as f:
+            f.write(SOURCE)
+        main(['verify', self.temp_dir, '--exact'])
+        main(['verify', self.temp_dir, '--exact', '--low-memory'])
+
+if __name__ == '__main__':
+    unittest.main()
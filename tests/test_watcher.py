@@ -0,0 +1,109 @@
+# tests/test_watcher.py
+
+import unittest
+import os
+import tempfile
+import shutil
+import threading
+import time
+import sys
+from os.path import abspath, dirname, join
+
+# Add the src directory to the Python path
+sys.path.insert(0, abspath(join(dirname(__file__), '..', 'src')))
+
+from segmented_docstring.config import DEFAULT_CONFIG
+from segmented_docstring.watcher import Watcher, WatchError
+
+SOURCE = 'def func():\n    """Function docstring."""\n    return 1\n'
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.source_dir = os.path.join(self.temp_dir, 'src')
+        self.output_dir = os.path.join(self.temp_dir, 'out')
+        os.makedirs(os.path.join(self.source_dir, 'pkg'))
+        os.mkdir(self.output_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, path, content):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def test_invalid_directory(self):
+        with self.assertRaises(WatchError):
+            Watcher(os.path.join(self.temp_dir, 'missing'), self.output_dir, DEFAULT_CONFIG)
+
+    def test_snapshot_only_includes_inputs_for_mode(self):
+        self._write(os.path.join(self.source_dir, 'a.py'), SOURCE)
+        self._write(os.path.join(self.source_dir, 'pkg', 'b.py'), SOURCE)
+        self._write(os.path.join(self.source_dir, 'a.barecode.py'), SOURCE)
+        split_watcher = Watcher(self.source_dir, self.output_dir, DEFAULT_CONFIG)
+        self.assertEqual(sorted(os.path.basename(p) for p in split_watcher.snapshot()), ['a.py', 'b.py'])
+
+        combine_watcher = Watcher(self.source_dir, self.output_dir, DEFAULT_CONFIG, mode='combine',
+                                  recursive=False)
+        self.assertEqual([os.path.basename(p) for p in combine_watcher.snapshot()], ['a.barecode.py'])
+
+    def test_ignored_paths_are_not_watched(self):
+        for name in ('a.py', os.path.join('pkg', 'b.py'), os.path.join('build', 'c.py'),
+                     os.path.join('gen', 'd.py'), os.path.join('.venv', 'e.py'), 'skip_me.py'):
+            os.makedirs(os.path.dirname(os.path.join(self.source_dir, name)), exist_ok=True)
+            self._write(os.path.join(self.source_dir, name), SOURCE)
+        self._write(os.path.join(self.source_dir, '.gitignore'), 'build/\n')
+        self._write(os.path.join(self.source_dir, 'pkg', '.gitignore'), '*.py\n!b.py\n')
+        config = dict(DEFAULT_CONFIG, exclude=['gen/'])
+        watcher = Watcher(self.source_dir, self.output_dir, config, excludes=['skip_*.py'])
+        self.assertEqual(sorted(os.path.relpath(p, self.source_dir) for p in watcher.snapshot()),
+                         ['a.py', os.path.join('pkg', 'b.py')])
+
+        # Notifications are filtered by the same rules, including for deleted paths.
+        self.assertTrue(watcher.is_watched(os.path.join(self.source_dir, 'pkg', 'b.py')))
+        for name in (os.path.join('build', 'c.py'), os.path.join('build', 'new', 'x.py'),
+                     os.path.join('gen', 'd.py'), os.path.join('.venv', 'e.py'), 'skip_me.py',
+                     os.path.join('pkg', 'other.py'), os.path.join('..', 'outside.py')):
+            self.assertFalse(watcher.is_watched(os.path.join(self.source_dir, name)), name)
+        watcher.process([os.path.join(self.source_dir, 'build', 'c.py')])
+        self.assertEqual(os.listdir(self.output_dir), [])
+
+    def test_process_combines_pair_for_changed_docstring_file(self):
+        barecode = os.path.join(self.source_dir, 'mod.barecode.py')
+        self._write(barecode, 'def func():\n    return 1\n')
+        self._write(os.path.join(self.source_dir, 'mod.docstring.py'), '{"func": "Function docstring."}')
+        watcher = Watcher(self.source_dir, self.output_dir, DEFAULT_CONFIG, mode='combine')
+        watcher.process([os.path.join(self.source_dir, 'mod.docstring.py')])
+        with open(os.path.join(self.output_dir, 'mod.py'), 'r', encoding='utf-8') as f:
+            self.assertIn('"""Function docstring."""', f.read())
+
+    def test_mirror_layout(self):
+        path = os.path.join(self.source_dir, 'pkg', 'b.py')
+        self._write(path, SOURCE)
+        watcher = Watcher(self.source_dir, self.output_dir, DEFAULT_CONFIG, layout='mirror')
+        watcher.process([path])
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, 'pkg', 'b.barecode.py')))
+        with self.assertRaises(WatchError):
+            Watcher(self.source_dir, self.output_dir, DEFAULT_CONFIG, layout='nested')
+
+    def test_polling_splits_changed_file(self):
+        watcher = Watcher(self.source_dir, self.output_dir, DEFAULT_CONFIG, recursive=True,
+                          debounce=0.05, poll_interval=0.05, use_notifications=False)
+        stop = threading.Event()
+        thread = threading.Thread(target=watcher.run, args=(stop,))
+        thread.start()
+        try:
+            time.sleep(0.1)
+            self._write(os.path.join(self.source_dir, 'pkg', 'mod.py'), SOURCE)
+            barecode = os.path.join(self.output_dir, 'mod.barecode.py')
+            deadline = time.time() + 5
+            while not os.path.exists(barecode) and time.time() < deadline:
+                time.sleep(0.05)
+        finally:
+            stop.set()
+            thread.join()
+        with open(barecode, 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'def func():\n    return 1\n')
+
+if __name__ == '__main__':
+    unittest.main()
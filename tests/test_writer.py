@@ -0,0 +1,112 @@
+# tests/test_writer.py
+
+import unittest
+import os
+import stat
+import threading
+import tempfile
+import shutil
+import sys
+from unittest.mock import patch
+from os.path import abspath, dirname, join
+
+# Add the src directory to the Python path
+sys.path.insert(0, abspath(join(dirname(__file__), '..', 'src')))
+
+from segmented_docstring import writer
+from segmented_docstring.splitter import split_file
+from segmented_docstring.writer import write_file, write_files
+
+class TestWriter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "out.py")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_write_file_creates_and_skips_unchanged(self):
+        self.assertTrue(write_file(self.path, "x = 1\n"))
+        os.utime(self.path, ns=(1, 1))
+
+        self.assertFalse(write_file(self.path, "x = 1\n"))
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 1)
+
+        self.assertTrue(write_file(self.path, "x = 2\n"))
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), "x = 2\n")
+
+    def test_write_files_leaves_targets_untouched_on_failure(self):
+        write_file(self.path, "old\n")
+        blocked = os.path.join(self.temp_dir, "missing", "out.doc.py")
+
+        with self.assertRaises(OSError):
+            write_files([(self.path, "new\n"), (blocked, "new\n")])
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), "old\n")
+        self.assertEqual(os.listdir(self.temp_dir), ["out.py"])
+
+    @unittest.skipIf(os.name == 'nt', "POSIX permissions")
+    def test_rewrite_keeps_permissions(self):
+        write_file(self.path, "old\n")
+        umask = os.umask(0o022)
+        os.umask(umask)
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o666 & ~umask)
+        os.chmod(self.path, 0o755)
+        write_file(self.path, "new\n")
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o755)
+
+    @unittest.skipIf(os.name == 'nt', "POSIX permissions")
+    def test_umask_is_read_on_first_write(self):
+        previous = os.umask(0o027)
+        try:
+            with patch.object(writer, '_UMASK', None):
+                write_file(self.path, "new\n")
+                self.assertEqual(writer._UMASK, 0o027)
+        finally:
+            os.umask(previous)
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o640)
+
+    @unittest.skipUnless(hasattr(os, 'symlink'), "requires symbolic links")
+    def test_symlinked_output_is_written_through(self):
+        real = os.path.join(self.temp_dir, "real.py")
+        write_file(real, "old\n")
+        os.symlink(real, self.path)
+        self.assertTrue(write_file(self.path, "new\n"))
+        self.assertTrue(os.path.islink(self.path))
+        with open(real, 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), "new\n")
+
+    def test_concurrent_writers_use_their_own_temporary_files(self):
+        errors = []
+
+        def write(text):
+            try:
+                for _ in range(20):
+                    write_file(self.path, text)
+            except OSError as e:
+                errors.append(e)
+        threads = [threading.Thread(target=write, args=(f"x = {i}\n" * 1000,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(os.listdir(self.temp_dir), ["out.py"])
+
+    def test_split_file_does_not_touch_unchanged_outputs(self):
+        input_file = os.path.join(self.temp_dir, "mod.py")
+        with open(input_file, 'w', encoding='utf-8') as f:
+            f.write('def func():\n    """Docstring."""\n    return 1\n')
+        split_file(input_file, self.temp_dir, ".bare.py", ".doc.py")
+        outputs = [os.path.join(self.temp_dir, name) for name in ("mod.bare.py", "mod.doc.py")]
+        for path in outputs:
+            os.utime(path, ns=(1, 1))
+
+        split_file(input_file, self.temp_dir, ".bare.py", ".doc.py")
+
+        self.assertEqual([os.stat(path).st_mtime_ns for path in outputs], [1, 1])
+
+if __name__ == '__main__':
+    unittest.main()